@@ -1,6 +1,6 @@
-from flask import Flask, redirect, url_for, session, render_template, flash
+from flask import Flask, redirect, url_for, session, render_template, flash, request
 from config import Config
-from extensions import db, sess
+from extensions import db
 
 from controllers.cadastro_controller import cadastro_bp
 from controllers.login_controller import login_bp
@@ -12,17 +12,61 @@ from controllers.carteira_controller import carteira_bp
 from controllers.resgatarrecompensa_controller import resgatar_bp
 from controllers.criarrecompensa_controller import criarrecompensa_bp
 from controllers.melhorarplano_controller import melhorarplano_bp
+from services.migracoes import aplicar_migracoes, migrar_command
+from services.extrato import recalcular_carteiras_command, verificar_carteiras_command
+from services.resumo_familia import recalcular_resumos_command
+from services.conversao_ids import converter_ids_command
+from services.retencao_notificacoes import limpar_notificacoes_command
+from services.membro_atual import carregar_membro_atual
+from services.sessoes import configurar_sessao, purgar_sessoes_command
+from services.assets import configurar_assets, build_assets_command
+from services.imagens import miniatura
+from services.armazenamento import configurar_armazenamento
+from services.blobs import migrar_uploads_command
+from services.coleta_uploads import limpar_uploads_command
+from services.ingestao_fotos import reprocessar_fotos_command
+from services.fila import configurar_fila, worker_command, jobs_command
+from services.eventos import configurar_eventos
+from services.streak import recalcular_streaks_command
+from services.recorrentes import gerar_recorrentes_command
+from services.prazos import motor_prazos_command
 
 def create_app():
     app = Flask(__name__, static_folder="static", template_folder="views")
     app.config.from_object(Config)
 
     db.init_app(app)
-    sess.init_app(app)
+    configurar_sessao(app)
+    configurar_assets(app)
+    configurar_armazenamento(app)
+    configurar_fila(app)
+    configurar_eventos(app)
+    app.jinja_env.filters["miniatura"] = miniatura
 
     with app.app_context():
         from models import models
         db.create_all()
+        if app.config.get("AUTO_MIGRATE"):
+            aplicar_migracoes()
+
+    app.cli.add_command(migrar_command)
+    app.cli.add_command(recalcular_carteiras_command)
+    app.cli.add_command(verificar_carteiras_command)
+    app.cli.add_command(recalcular_resumos_command)
+    app.cli.add_command(converter_ids_command)
+    app.cli.add_command(limpar_notificacoes_command)
+    app.cli.add_command(purgar_sessoes_command)
+    app.cli.add_command(recalcular_streaks_command)
+    app.cli.add_command(gerar_recorrentes_command)
+    app.cli.add_command(motor_prazos_command)
+    app.cli.add_command(build_assets_command)
+    app.cli.add_command(migrar_uploads_command)
+    app.cli.add_command(limpar_uploads_command)
+    app.cli.add_command(reprocessar_fotos_command)
+    app.cli.add_command(worker_command)
+    app.cli.add_command(jobs_command)
+
+    app.before_request(carregar_membro_atual)
 
     app.register_blueprint(cadastro_bp)
     app.register_blueprint(login_bp)
@@ -48,6 +92,11 @@ def create_app():
 
         return redirect(url_for("login.login_page"))
 
+    @app.errorhandler(413)
+    def upload_grande_demais(e):
+        flash("Arquivo grande demais.", "error")
+        return redirect(request.referrer or url_for("root"))
+
     return app
 
 app = create_app()
@@ -0,0 +1,72 @@
+"""
+Benchmark das fotos de submissão: bytes servidos por página de avaliação
+antes (original do celular) x depois (miniatura 320w/640w do pipeline).
+
+Gera N fotos sintéticas no tamanho de câmera de celular (12 MP, JPEG q95,
+com EXIF de orientação), passa cada uma por services/imagens.processar e
+soma o que a fila de avaliação baixaria com `pendentes` itens na tela.
+
+Uso:  python benchmarks/bench_fotos.py [fotos] [pendentes]
+"""
+import io
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from PIL import Image, ImageDraw, ImageFilter  # noqa: E402
+from config import Config  # noqa: E402
+from services.imagens import processar  # noqa: E402
+
+CFG = {k: getattr(Config, k) for k in dir(Config) if k.startswith("FOTO_")}
+
+def foto_de_celular(semente, largura=4032, altura=3024):
+    """Cena com formas, gradiente e ruído (comprime como foto, não como cor lisa)."""
+    rnd = random.Random(semente)
+    img = Image.linear_gradient("L").resize((largura, altura)).convert("RGB")
+    desenho = ImageDraw.Draw(img)
+    for _ in range(60):
+        x, y = rnd.randrange(largura), rnd.randrange(altura)
+        r = rnd.randrange(50, 600)
+        cor = tuple(rnd.randrange(256) for _ in range(3))
+        desenho.ellipse((x - r, y - r, x + r, y + r), fill=cor)
+    img = img.filter(ImageFilter.GaussianBlur(3))
+    ruido = Image.effect_noise((largura, altura), 24).convert("RGB")
+    img = Image.blend(img, ruido, 0.15)
+
+    exif = Image.Exif()
+    exif[0x0112] = 6  # orientação: girar 90°
+    saida = io.BytesIO()
+    img.save(saida, "JPEG", quality=95, exif=exif)
+    return saida.getvalue()
+
+def main():
+    fotos = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    pendentes = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    originais, principais, minis = [], [], {l: [] for l in CFG["FOTO_MINIATURAS"]}
+    tempos = []
+    for i in range(fotos):
+        dados = foto_de_celular(i)
+        inicio = time.perf_counter()
+        _, principal, miniaturas = processar(io.BytesIO(dados), CFG)
+        tempos.append(time.perf_counter() - inicio)
+        originais.append(len(dados))
+        principais.append(len(principal))
+        for largura, mini in miniaturas.items():
+            minis[largura].append(len(mini))
+
+    media = lambda xs: sum(xs) / len(xs)
+    print(f"{fotos} foto(s) 4032x3024 q95; formato {CFG['FOTO_FORMATO']}, lado máx. {CFG['FOTO_LADO_MAX']}px")
+    print(f"processamento: {media(tempos) * 1000:,.0f} ms/foto (máx. {max(tempos) * 1000:,.0f} ms)")
+    print(f"{'arquivo':<22}{'KiB/foto':>10}{f'KiB/página ({pendentes})':>22}")
+    linhas = [("original (antes)", originais), ("principal guardada", principais)]
+    linhas += [(f"miniatura {l}w", v) for l, v in minis.items()]
+    for nome, tamanhos in linhas:
+        print(f"{nome:<22}{media(tamanhos) / 1024:>10,.0f}{media(tamanhos) * pendentes / 1024:>22,.0f}")
+    maior = max(CFG["FOTO_MINIATURAS"])
+    print(f"redução por página (tela 2x, {maior}w): {media(originais) / media(minis[maior]):,.1f}x")
+
+if __name__ == "__main__":
+    main()
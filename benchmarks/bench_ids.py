@@ -0,0 +1,80 @@
+"""
+Benchmark de ids: uuid4 em texto (atual) x uuid7 em texto x uuid7 binário.
+
+Simula a tabela `notificacao` (a mais escrita): PK + FK indexada para o
+usuário + índice (usuario_id, lidaEm, enviadaEm). Mede inserts/s em lotes
+com commit (como as rotas fazem) e o tamanho de cada índice via dbstat.
+
+Uso:  python benchmarks/bench_ids.py [linhas] [lote]
+"""
+import os
+import sys
+import time
+import uuid
+import random
+import sqlite3
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.tipos import uuid7  # noqa: E402
+
+DDL = """
+CREATE TABLE notificacao (
+    id {tipo} NOT NULL PRIMARY KEY,
+    tipo VARCHAR(50) NOT NULL,
+    mensagem VARCHAR(255) NOT NULL,
+    enviadaEm DATETIME NOT NULL,
+    lidaEm DATETIME,
+    usuario_id {tipo} NOT NULL
+);
+CREATE INDEX ix_notificacao_usuario_lida_enviada ON notificacao (usuario_id, lidaEm, enviadaEm);
+"""
+
+VARIANTES = {
+    "uuid4 texto":   ("VARCHAR(36)", lambda: str(uuid.uuid4())),
+    "uuid7 texto":   ("VARCHAR(36)", lambda: str(uuid7())),
+    "uuid7 binario": ("BLOB",        lambda: uuid7().bytes),
+}
+
+def rodar(nome, linhas, lote, usuarios):
+    tipo, gerar = VARIANTES[nome]
+    converter_usuario = (lambda u: u.bytes) if tipo == "BLOB" else str
+    ids_usuarios = [converter_usuario(u) for u in usuarios]
+
+    caminho = os.path.join(tempfile.mkdtemp(), "bench.db")
+    conn = sqlite3.connect(caminho)
+    conn.executescript(DDL.format(tipo=tipo))
+
+    inicio = time.perf_counter()
+    for i in range(0, linhas, lote):
+        conn.executemany(
+            "INSERT INTO notificacao (id, tipo, mensagem, enviadaEm, usuario_id) VALUES (?, ?, ?, datetime('now'), ?)",
+            [(gerar(), "TAREFA_PENDENTE", "Filho marcou 'Arrumar a cama' como feita.", random.choice(ids_usuarios))
+             for _ in range(min(lote, linhas - i))],
+        )
+        conn.commit()
+    duracao = time.perf_counter() - inicio
+
+    tamanhos = dict(conn.execute(
+        "SELECT name, SUM(pgsize) FROM dbstat GROUP BY name"
+    ).fetchall())
+    conn.close()
+    arquivo = os.path.getsize(caminho)
+    os.remove(caminho)
+    return linhas / duracao, tamanhos, arquivo
+
+def main():
+    linhas = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    lote = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    usuarios = [uuid.uuid4() for _ in range(2_000)]
+
+    print(f"{linhas} linhas, commit a cada {lote}")
+    print(f"{'variante':<15}{'inserts/s':>12}{'PK (KiB)':>12}{'ix usuario (KiB)':>18}{'arquivo (KiB)':>15}")
+    for nome in VARIANTES:
+        taxa, tamanhos, arquivo = rodar(nome, linhas, lote, usuarios)
+        pk = tamanhos.get("sqlite_autoindex_notificacao_1", 0)
+        ix = tamanhos.get("ix_notificacao_usuario_lida_enviada", 0)
+        print(f"{nome:<15}{taxa:>12,.0f}{pk / 1024:>12,.0f}{ix / 1024:>18,.0f}{arquivo / 1024:>15,.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,22 @@
 import os
+from datetime import timedelta
 
 basedir = os.path.abspath(os.path.dirname(__file__))
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'voce-precisa-mudar-este-segredo'
     
-    # --- Ajuste da Sessão ---
+    # --- Ajuste da Sessão (ver services/sessoes.py) ---
     SESSION_PERMANENT = False
-    # No Render, "filesystem" apaga os logins quando o app reinicia.
-    # Por enquanto vamos manter, mas saiba que você será deslogado a cada deploy.
-    SESSION_TYPE = "filesystem" 
+    # "cookie":     cookie assinado com SECRET_KEY, sem I/O no servidor (padrão).
+    # "banco":      tabela `sessao` no mesmo banco do app (1 SELECT por chave única).
+    # "filesystem": o comportamento antigo (arquivos locais, some a cada deploy).
+    SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'cookie')
+    SESSION_SQLALCHEMY_TABLE = "sessao"
+    SESSION_CLEANUP_N_REQUESTS = None        # expiradas saem via `flask purgar-sessoes`
+    PERMANENT_SESSION_LIFETIME = timedelta(days=int(os.environ.get('SESSION_DIAS', 7)))
+    SESSION_COOKIE_SAMESITE = "Lax"
+    SESSION_COOKIE_SECURE = os.environ.get('SESSION_COOKIE_SECURE', '0') == '1'
     
     # --- Ajuste do Banco de Dados ---
     # Tenta pegar a URL do Render (Postgres). Se não existir, usa seu SQLite local.
@@ -18,4 +25,114 @@ class Config:
         _db_url = _db_url.replace("postgres://", "postgresql://", 1)
     
     SQLALCHEMY_DATABASE_URI = _db_url or 'sqlite:///' + os.path.join(basedir, 'app.db')
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # --- Migrações ---
+    # Aplica as migrações pendentes (services/migracoes.py) ao subir o app.
+    # Desligue (AUTO_MIGRATE=0) para rodar só via `flask migrar` no deploy.
+    AUTO_MIGRATE = os.environ.get('AUTO_MIGRATE', '1') == '1'
+
+    # --- IDs (ver models/tipos.py) ---
+    # "uuid7" gera ids ordenados por tempo: inserts no fim do índice em vez de
+    # espalhados pela B-tree. "binario" guarda o id em 16 bytes em vez de 36
+    # caracteres; para um banco existente rode antes `flask converter-ids`.
+    ID_ESTRATEGIA = os.environ.get('ID_ESTRATEGIA', 'uuid4')
+    ID_ARMAZENAMENTO = os.environ.get('ID_ARMAZENAMENTO', 'texto')
+
+    # --- Retenção de notificações (flask limpar-notificacoes) ---
+    NOTIF_RETENCAO_DIAS = int(os.environ.get('NOTIF_RETENCAO_DIAS', 90))     # lidas mais velhas que isso saem
+    NOTIF_RESUMO_DIAS = int(os.environ.get('NOTIF_RESUMO_DIAS', 180))        # não lidas viram um resumo
+    NOTIF_LIMPEZA_MODO = os.environ.get('NOTIF_LIMPEZA_MODO', 'arquivar')    # 'arquivar' | 'apagar'
+    NOTIF_LIMPEZA_LOTE = int(os.environ.get('NOTIF_LIMPEZA_LOTE', 500))
+    NOTIF_LIMITE_FEED = int(os.environ.get('NOTIF_LIMITE_FEED', 50))         # máx. no feed das homes
+
+    # --- Motor de prazos (flask motor-prazos) ---
+    PRAZO_LEMBRETE_HORAS = float(os.environ.get('PRAZO_LEMBRETE_HORAS', 2))  # lembrete N horas antes
+    PRAZO_JANELA_HORAS = float(os.environ.get('PRAZO_JANELA_HORAS', 6))      # prazos mantidos no heap
+    PRAZO_RECARGA_MIN = float(os.environ.get('PRAZO_RECARGA_MIN', 5))        # recarga da janela
+
+    # --- Cache do catálogo de recompensas (services/catalogo.py) ---
+    CATALOGO_CACHE_TTL = float(os.environ.get('CATALOGO_CACHE_TTL', 60))   # segundos
+    CATALOGO_CACHE_MAX = int(os.environ.get('CATALOGO_CACHE_MAX', 1024))   # famílias em memória
+
+    # --- Cache do diretório da família (services/diretorio.py) ---
+    DIRETORIO_CACHE_TTL = float(os.environ.get('DIRETORIO_CACHE_TTL', 300))  # segundos
+    DIRETORIO_CACHE_MAX = int(os.environ.get('DIRETORIO_CACHE_MAX', 1024))   # famílias em memória
+
+    # --- ETag dos dashboards (services/versao_familia.py) ---
+    # Entra no ETag para que um deploy com templates novos não devolva 304 velho.
+    ETAG_VERSAO_APP = os.environ.get('ETAG_VERSAO_APP') or os.environ.get('RENDER_GIT_COMMIT', 'dev')
+
+    # --- Assets estáticos (services/assets.py) ---
+    # Gera static/dist no start (rápido e idempotente); desligue se o deploy já roda `flask build-assets`.
+    ASSETS_BUILD_AO_INICIAR = os.environ.get('ASSETS_BUILD_AO_INICIAR', '1') == '1'
+
+    # --- Fotos das submissões (services/imagens.py) ---
+    FOTO_MAX_PIXELS = int(os.environ.get('FOTO_MAX_PIXELS', 50_000_000))   # recusa acima disso (decodificado)
+    FOTO_LADO_MAX = int(os.environ.get('FOTO_LADO_MAX', 1600))             # maior lado da foto guardada
+    FOTO_FORMATO = os.environ.get('FOTO_FORMATO', 'JPEG')                  # 'JPEG' | 'WEBP'
+    FOTO_QUALIDADE = int(os.environ.get('FOTO_QUALIDADE', 82))
+    FOTO_BYTES_MAX = int(os.environ.get('FOTO_BYTES_MAX', 400 * 1024))     # teto da foto principal
+    FOTO_MINIATURAS = (320, 640)                                           # larguras (1x/2x do card de avaliação)
+
+    # --- Limites de upload (services/blobs.py) ---
+    # Teto global do corpo da requisição; cada endpoint de upload baixa o seu
+    # antes de ler o formulário. Acima do limite o Flask responde 413.
+    MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))
+    UPLOAD_LIMITE_FOTO = int(os.environ.get('UPLOAD_LIMITE_FOTO', 12 * 1024 * 1024))    # foto da tarefa (bruta)
+    UPLOAD_LIMITE_AVATAR = int(os.environ.get('UPLOAD_LIMITE_AVATAR', 4 * 1024 * 1024))  # foto de perfil
+
+    # --- Coleta de uploads órfãos (services/coleta_uploads.py) ---
+    UPLOAD_GC_CARENCIA_HORAS = float(os.environ.get('UPLOAD_GC_CARENCIA_HORAS', 24))  # arquivos mais novos ficam
+    UPLOAD_GC_MODO = os.environ.get('UPLOAD_GC_MODO', 'quarentena')                   # 'quarentena' | 'apagar'
+    UPLOAD_GC_LOTE = int(os.environ.get('UPLOAD_GC_LOTE', 500))                       # arquivos por consulta
+    UPLOAD_QUARENTENA = os.environ.get('UPLOAD_QUARENTENA') or os.path.join(basedir, 'uploads_quarentena')
+    # .part dos uploads em andamento: fora de static/ (o Flask serve tudo que estiver lá)
+    UPLOAD_TEMPORARIOS = os.environ.get('UPLOAD_TEMPORARIOS') or os.path.join(basedir, 'instance', 'tmp')
+    # Uploads brutos (uploads/entrada/) do backend local até o worker processar: idem
+    UPLOAD_ENTRADA = os.environ.get('UPLOAD_ENTRADA') or os.path.join(basedir, 'instance', 'entrada')
+
+    # --- Armazenamento dos uploads (services/armazenamento.py) ---
+    # 'local' grava em static/; 's3' usa um bucket (AWS, MinIO...) com as credenciais padrão (AWS_*).
+    ARMAZENAMENTO = os.environ.get('ARMAZENAMENTO', 'local')
+    ARMAZENAMENTO_S3_BUCKET = os.environ.get('ARMAZENAMENTO_S3_BUCKET')
+    ARMAZENAMENTO_S3_ENDPOINT = os.environ.get('ARMAZENAMENTO_S3_ENDPOINT')      # MinIO/compatível; vazio = AWS
+    ARMAZENAMENTO_S3_REGIAO = os.environ.get('ARMAZENAMENTO_S3_REGIAO')
+    ARMAZENAMENTO_S3_URL_PUBLICA = os.environ.get('ARMAZENAMENTO_S3_URL_PUBLICA')  # CDN/bucket público; vazio = URL assinada
+    ARMAZENAMENTO_URL_EXPIRA = int(os.environ.get('ARMAZENAMENTO_URL_EXPIRA', 3600))  # validade das URLs assinadas (s)
+    ARMAZENAMENTO_ENVIO_DIRETO = os.environ.get('ARMAZENAMENTO_ENVIO_DIRETO', '1') == '1'  # navegador -> bucket
+
+    # --- Fila de jobs (services/fila.py) ---
+    # 'embutido': cada processo web sobe JOBS_CONCORRENCIA threads de worker (padrão:
+    #             funciona com o deploy de um serviço só, `gunicorn app:app`);
+    # 'worker':   jobs rodam só no processo `flask --app app worker` (opt-in). O deploy
+    #             passa a ter dois processos sempre no ar; sem o worker as fotos ficam
+    #             em "Processando foto..." e o web acusa no log (JOBS_ALERTA_SEG);
+    # 'sincrono': roda no fim da própria requisição (dev sem worker, testes).
+    JOBS_MODO = os.environ.get('JOBS_MODO', 'embutido')
+    JOBS_CONCORRENCIA = int(os.environ.get('JOBS_CONCORRENCIA', 2))        # threads por worker
+    JOBS_TENTATIVAS = int(os.environ.get('JOBS_TENTATIVAS', 5))            # depois disso: MORTO
+    JOBS_BACKOFF_BASE = float(os.environ.get('JOBS_BACKOFF_BASE', 10))     # s; dobra a cada tentativa
+    JOBS_BACKOFF_MAX = float(os.environ.get('JOBS_BACKOFF_MAX', 3600))     # teto da espera (s)
+    JOBS_TIMEOUT = int(os.environ.get('JOBS_TIMEOUT', 600))                # EXECUTANDO há mais que isso volta à fila (s)
+    JOBS_INTERVALO = float(os.environ.get('JOBS_INTERVALO', 1.0))          # espera com a fila vazia (s)
+    JOBS_METRICAS_SEG = float(os.environ.get('JOBS_METRICAS_SEG', 60))     # relatório de throughput
+    JOBS_RETENCAO_HORAS = float(os.environ.get('JOBS_RETENCAO_HORAS', 24)) # FEITOS mais velhos saem
+    JOBS_ALERTA_SEG = float(os.environ.get('JOBS_ALERTA_SEG', 300))        # modo 'worker': job pronto parado há mais que isso = erro no log
+
+    # --- Notificações ao vivo (services/eventos.py, GET /home/eventos) ---
+    # Desligado por padrão: cada conexão prende uma thread do servidor por até
+    # EVENTOS_DURACAO_MAX s. Só ligue com worker de threads, ex.:
+    #   gunicorn -k gthread --threads 50 app:app
+    # (no worker sync padrão, cada aba aberta trava um processo inteiro).
+    EVENTOS_AO_VIVO = os.environ.get('EVENTOS_AO_VIVO', '0') == '1'
+    # 'auto' | 'memoria' (um processo) | 'banco' (vários processos, qualquer banco) | 'postgres' (LISTEN/NOTIFY)
+    # 'auto' = postgres no Postgres; fora dele, banco se houver mais de um processo
+    # (WEB_CONCURRENCY > 1 ou JOBS_MODO 'worker') e memoria só com tudo num processo.
+    # 'memoria' com mais de um processo e ao vivo ligado é recusado ao subir.
+    EVENTOS_BACKEND = os.environ.get('EVENTOS_BACKEND', 'auto')
+    WEB_PROCESSOS = int(os.environ.get('WEB_CONCURRENCY', 1))               # workers do gunicorn (ele lê a mesma variável)
+    EVENTOS_INTERVALO = float(os.environ.get('EVENTOS_INTERVALO', 2))        # backend 'banco': consulta a cada N s
+    EVENTOS_HEARTBEAT = float(os.environ.get('EVENTOS_HEARTBEAT', 25))       # comentário ": ping" (s)
+    EVENTOS_DURACAO_MAX = float(os.environ.get('EVENTOS_DURACAO_MAX', 300))  # o servidor fecha; o navegador reconecta
+    EVENTOS_RETRY_MS = int(os.environ.get('EVENTOS_RETRY_MS', 3000))         # espera do navegador para reconectar
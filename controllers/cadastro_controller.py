@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash
 from werkzeug.security import generate_password_hash
 from extensions import db
 from models.models import Usuario, Familia, Membro, Role
+from services import resumo_familia, diretorio
 
 cadastro_bp = Blueprint("cadastro", __name__, url_prefix="/cadastro")
 
@@ -69,12 +70,14 @@ def register_submit():
             
             db.session.add(novo_usuario)
             db.session.add(novo_membro)
+            resumo_familia.recalcular(parent_membro.familia_id)
         
         else:
             flash("Tipo de conta inválido.", "error")
             return redirect(url_for("cadastro.register_page"))
 
         db.session.commit()
+        diretorio.invalidar(novo_membro.familia_id)
 
     except Exception as e:
         db.session.rollback() 
@@ -1,34 +1,27 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash, current_app
-from sqlalchemy.sql import func
-from datetime import datetime, timedelta
+from flask import Blueprint, render_template, request, redirect, url_for, flash, g, current_app, jsonify
 from decimal import Decimal
-import os
-from werkzeug.utils import secure_filename
 from extensions import db
 from models.models import (
     Membro, Role, Carteira, Progresso, Transacao, TransactionType, 
-    Submissao, SubmissionStatus, Usuario, Notificacao
+    Submissao, SubmissionStatus, Usuario
 )
+from services import extrato, notificacoes, streak, diretorio, versao_familia, blobs, armazenamento, ingestao_fotos
+from services.membro_atual import exige_papel
 
 carteira_bp = Blueprint("carteira", __name__, url_prefix="/wallet")
 
-def _get_current_member():
-    uid = session.get("user_id")
-    role = session.get("role")
-    if not uid or not role: return None
-    return Membro.query.filter_by(usuario_id=uid, role=role).first()
+FOLGA_MULTIPART = 64 * 1024  # cabeçalhos do multipart e campo do nome
 
 # ==========================================================
 # VCP09 - CONSULTAR SALDO E PERFIL (Geral)
 # ==========================================================
 @carteira_bp.get("/profile")
+@exige_papel()
 def profile_page():
     """
     Rota inteligente: detecta se é PAI ou FILHO e mostra o perfil correto.
     """
-    membro = _get_current_member()
-    if not membro:
-        return redirect(url_for("login.login_page"))
+    membro = g.membro
 
     if membro.role == Role.CHILD:
         progresso = membro.progresso or Progresso(membro_id=membro.id)
@@ -38,29 +31,7 @@ def profile_page():
         if not membro.carteira: db.session.add(carteira)
         db.session.commit()
 
-        is_streak_active = False
-        streak_dias = 0
-        submissoes_aprovadas = db.session.query(Submissao.aprovadaEm).join(Submissao.tarefa).filter(
-            Submissao.tarefa.has(executor_id=membro.id),
-            Submissao.status == SubmissionStatus.APPROVED
-        ).order_by(Submissao.aprovadaEm.desc()).all()
-        
-        datas_unicas = sorted(list(set([s.aprovadaEm.date() for s in submissoes_aprovadas if s.aprovadaEm])), reverse=True)
-        if datas_unicas:
-            hoje = datetime.utcnow().date()
-            ontem = hoje - timedelta(days=1)
-            ultima_data = datas_unicas[0]
-            if ultima_data == hoje or ultima_data == ontem:
-                is_streak_active = True
-                streak_dias = 1
-                data_referencia = ultima_data
-                for i in range(1, len(datas_unicas)):
-                    proxima_data = datas_unicas[i]
-                    if (data_referencia - proxima_data).days == 1:
-                        streak_dias += 1
-                        data_referencia = proxima_data
-                    elif (data_referencia - proxima_data).days > 1:
-                        break
+        is_streak_active, streak_dias = streak.streak_vigente(progresso, streak.fuso(membro.familia.fusoHorario))
 
         current_xp = progresso.xp
         max_xp = 1000
@@ -87,30 +58,37 @@ def profile_page():
         )
 
     else:
-        filhos = Membro.query.filter_by(familia_id=membro.familia_id, role=Role.CHILD).all()
+        filhos = diretorio.filhos(membro.familia_id)
+        filhos_ids = [f["id"] for f in filhos]
         filhos_data = [] 
+        tz = streak.fuso(membro.familia.fusoHorario)
+
+        # Carteiras e progressos da família de uma vez (nome/avatar vêm do diretório)
+        carteiras = {c.membro_id: c for c in Carteira.query.filter(Carteira.membro_id.in_(filhos_ids))} if filhos_ids else {}
+        progressos = {p.membro_id: p for p in Progresso.query.filter(Progresso.membro_id.in_(filhos_ids))} if filhos_ids else {}
         
         for filho in filhos:
-            carteira_f = filho.carteira or Carteira(membro_id=filho.id, saldo=0)
-            if not filho.carteira: db.session.add(carteira_f)
+            carteira_f = carteiras.get(filho["id"])
+            if carteira_f is None:
+                carteira_f = Carteira(membro_id=filho["id"], saldo=0)
+                db.session.add(carteira_f)
             
             concluidas = Submissao.query.join(Submissao.tarefa).filter(
-                Submissao.tarefa.has(executor_id=filho.id),
+                Submissao.tarefa.has(executor_id=filho["id"]),
                 Submissao.status == SubmissionStatus.APPROVED
             ).count()
             
-            total_ganho = db.session.query(func.sum(Transacao.valor)).filter(
-                Transacao.carteira_id == carteira_f.id,
-                Transacao.tipo.in_([TransactionType.CREDIT_TASK, TransactionType.CREDIT_ALLOWANCE])
-            ).scalar() or 0.0
+            total_ganho = extrato.total_ganho(carteira_f)
 
-            is_streak = False 
+            is_streak_active, streak_dias = streak.streak_vigente(progressos.get(filho["id"]), tz)
             
             filhos_data.append({
                 "membro": filho,
                 "tarefas_concluidas": concluidas,
                 "saldo": carteira_f.saldo,
-                "total_ganho": total_ganho
+                "total_ganho": total_ganho,
+                "is_streak_active": is_streak_active,
+                "streak_dias": streak_dias
             })
         
         db.session.commit()
@@ -125,11 +103,10 @@ def profile_page():
 
 
 @carteira_bp.get("/details/<child_id>")
+@exige_papel(Role.PARENT)
 def child_detail(child_id):
     """Exibe o extrato detalhado de um filho específico para o PAI."""
-    parent = _get_current_member()
-    if not parent or parent.role != Role.PARENT:
-        return redirect(url_for("login.login_page"))
+    parent = g.membro
 
     filho = Membro.query.get(child_id)
     if not filho or filho.familia_id != parent.familia_id:
@@ -142,15 +119,8 @@ def child_detail(child_id):
         db.session.add(carteira)
         db.session.commit()
 
-    total_ganho = db.session.query(func.sum(Transacao.valor)).filter(
-        Transacao.carteira_id == carteira.id,
-        Transacao.tipo.in_([TransactionType.CREDIT_TASK, TransactionType.CREDIT_ALLOWANCE])
-    ).scalar() or 0.0
-
-    total_pago_historico = db.session.query(func.sum(Transacao.valor)).filter(
-        Transacao.carteira_id == carteira.id,
-        Transacao.tipo == 'DEBIT_PAYMENT' 
-    ).scalar() or 0.0
+    total_ganho = extrato.total_ganho(carteira)
+    total_pago_historico = carteira.totalPago or 0
 
     saldo_devedor = carteira.saldo
 
@@ -168,10 +138,9 @@ def child_detail(child_id):
     )
 
 @carteira_bp.post("/pay/<child_id>")
+@exige_papel(Role.PARENT)
 def pay_child_submit(child_id):
-    parent = _get_current_member()
-    if not parent or parent.role != Role.PARENT:
-        return redirect(url_for("login.login_page"))
+    parent = g.membro
 
     filho = Membro.query.get(child_id)
     if not filho or filho.familia_id != parent.familia_id:
@@ -191,65 +160,84 @@ def pay_child_submit(child_id):
     elif valor_pagar > carteira.saldo:
         flash(f"Você não pode pagar mais do que deve (R$ {carteira.saldo}).", "error")
     else:
-        carteira.saldo -= valor_pagar
-        transacao = Transacao(
-            tipo='DEBIT_PAYMENT',
-            valor=valor_pagar,
-            descricao="Pagamento (Saque)",
-            carteira_id=carteira.id
-        )
-        db.session.add(transacao)
+        extrato.lancar(carteira, TransactionType.DEBIT_PAYMENT, valor_pagar, descricao="Pagamento (Saque)")
 
-        notif = Notificacao(
+        notificacoes.notificar_usuario(
             tipo="PAGAMENTO_RECEBIDO",
             mensagem=f"Pagamento recebido: R$ {valor_pagar:.2f}!",
             usuario_id=filho.usuario_id
         )
-        db.session.add(notif)
         db.session.commit()
         flash(f"Pagamento de R$ {valor_pagar:.2f} registrado!", "success")
 
     return redirect(url_for("carteira.child_detail", child_id=child_id))
 
 @carteira_bp.get("/edit")
+@exige_papel()
 def edit_profile_page():
     """Exibe tela de edição de perfil."""
-    membro = _get_current_member()
-    if not membro: return redirect(url_for("login.login_page"))
+    membro = g.membro
 
     template = "child/edit_profile.html" if membro.role == Role.CHILD else "parent/edit_profile.html"
     return render_template(template, membro=membro)
 
+@carteira_bp.get("/upload_url")
+@exige_papel()
+def avatar_upload_url():
+    """POST pré-assinado para o avatar ir direto ao bucket (envio direto)."""
+    return jsonify(armazenamento.preparar_envio(g.membro.id, current_app.config["UPLOAD_LIMITE_AVATAR"]))
+
 @carteira_bp.post("/edit")
+@exige_papel()
 def edit_profile_submit():
     """Processa upload de foto e mudança de nome."""
-    membro = _get_current_member()
-    if not membro: return redirect(url_for("login.login_page"))
+    membro = g.membro
     
     usuario = membro.usuario
 
+    # Limite deste endpoint antes de o corpo ser lido (acima disso: 413)
+    limite = current_app.config["UPLOAD_LIMITE_AVATAR"]
+    request.max_content_length = limite + FOLGA_MULTIPART
+
+    sucesso = []
     novo_nome = request.form.get("nome")
     if novo_nome and novo_nome.strip() != usuario.nome:
         usuario.nome = novo_nome.strip()
-        flash("Nome atualizado!", "success")
+        sucesso.append("Nome atualizado!")
 
+    lote = blobs.Lote()
     foto = request.files.get('foto_perfil')
-    if foto and foto.filename != '':
-        try:
-            nome_seguro = secure_filename(foto.filename)
-            nome_final = f"avatar_{usuario.id}_{nome_seguro}"
-            
-            caminho_dir = os.path.join(current_app.static_folder, 'uploads', 'avatars')
-            os.makedirs(caminho_dir, exist_ok=True)
-            foto.save(os.path.join(caminho_dir, nome_final))
-            
-            if usuario.avatarUrl:
-                pass 
-
-            usuario.avatarUrl = os.path.join('uploads', 'avatars', nome_final).replace("\\", "/")
-            flash("Foto atualizada!", "success")
-        except Exception as e:
-            flash(f"Erro na foto: {e}", "error")
-
-    db.session.commit()
+    chave = request.form.get(armazenamento.CAMPO_CHAVE)
+    try:
+        if chave:
+            # Envio direto ao bucket: aqui só chave e tamanho; o worker confere e aplica
+            entrada = ingestao_fotos.receber(None, chave, membro.id, limite)
+            if entrada:
+                usuario.avatarEntrada = entrada
+                ingestao_fotos.enfileirar_avatar(usuario.id)
+                sucesso.append("Foto recebida! Ela aparece no perfil em instantes.")
+        elif foto and foto.filename:
+            # Tipo conferido pelo conteúdo; mesmo arquivo de antes não ocupa disco de novo
+            recebido = blobs.receber(foto.stream, limite)
+            blob = blobs.guardar(lote, recebido)
+            usuario.avatarUrl = blob.caminho
+            usuario.avatarEntrada = None  # um envio direto anterior ainda na fila não sobrescreve este
+            blobs.referenciar(blob, blobs.AVATAR, usuario.id)
+            sucesso.append("Foto atualizada!")
+    except blobs.UploadInvalido as e:
+        flash(str(e), "error")
+
+    familias = {m.familia_id for m in usuario.membros}
+    try:
+        versao_familia.tocar(*familias)
+        with lote:
+            db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        flash(f"Erro ao salvar o perfil: {e}", "error")
+        return redirect(url_for("carteira.edit_profile_page"))
+
+    for mensagem in sucesso:
+        flash(mensagem, "success")
+    diretorio.invalidar(*familias)
     return redirect(url_for("carteira.profile_page"))
\ No newline at end of file
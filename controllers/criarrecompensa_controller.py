@@ -1,36 +1,26 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash
-from uuid import uuid4
+from flask import Blueprint, render_template, request, redirect, url_for, flash, g
 from extensions import db
-from models.models import Membro, Role, Recompensa, Notificacao
+from models.models import Role, Recompensa
+from services import notificacoes, catalogo
+from services.membro_atual import exige_papel
 
 criarrecompensa_bp = Blueprint("criarrecompensa", __name__, url_prefix="/rewards")
 
-def _get_parent_member():
-    uid = session.get("user_id")
-    role = session.get("role")
-    if not uid or role != Role.PARENT: return None
-    return Membro.query.filter_by(usuario_id=uid, role=Role.PARENT).first()
-
 # ==========================================================
 # VCP13 - CRIAR RECOMPENSA (Ação exclusiva do Pai)
 # ==========================================================
 
 @criarrecompensa_bp.get("/new")
+@exige_papel(Role.PARENT, mensagem="Acesso negado.")
 def new_reward_page():
     """Exibe o formulário para cadastrar uma nova recompensa."""
-    parent_member = _get_parent_member()
-    if not parent_member:
-        flash("Acesso negado.", "error")
-        return redirect(url_for("login.login_page"))
-        
     return render_template("parent/new_reward.html")
 
 @criarrecompensa_bp.post("/new")
+@exige_papel(Role.PARENT)
 def create_reward():
     """Processa a criação da recompensa e notifica os filhos."""
-    parent_member = _get_parent_member()
-    if not parent_member:
-        return redirect(url_for("login.login_page"))
+    parent_member = g.membro
     
     titulo = (request.form.get("titulo") or "").strip()
     descricao = (request.form.get("descricao") or "").strip()
@@ -47,7 +37,6 @@ def create_reward():
         
     try:
         recompensa = Recompensa(
-            id=str(uuid4()), 
             titulo=titulo,
             descricao=descricao,
             custoXP=custoXP,
@@ -57,16 +46,14 @@ def create_reward():
         )
         db.session.add(recompensa)
         
-        filhos = Membro.query.filter_by(familia_id=parent_member.familia_id, role=Role.CHILD).all()
-        for f in filhos:
-            notif = Notificacao(
-                tipo="NOVA_RECOMPENSA",
-                mensagem=f"Nova recompensa disponível: {recompensa.titulo} ({recompensa.custoXP} XP)",
-                usuario_id=f.usuario_id
-            )
-            db.session.add(notif)
+        notificacoes.notificar_familia(
+            parent_member.familia_id, Role.CHILD,
+            tipo="NOVA_RECOMPENSA",
+            mensagem=f"Nova recompensa disponível: {recompensa.titulo} ({recompensa.custoXP} XP)"
+        )
             
         db.session.commit()
+        catalogo.invalidar(parent_member.familia_id)
         flash("Recompensa criada com sucesso!", "success")
         
     except Exception as e:
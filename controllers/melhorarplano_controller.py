@@ -1,45 +1,38 @@
-from flask import Blueprint, render_template, redirect, url_for, session, flash
+from flask import Blueprint, render_template, redirect, url_for, flash, g
 from extensions import db
-from models.models import Membro, Role
+from models.models import Role
+from services import versao_familia
+from services.membro_atual import exige_papel
 
 melhorarplano_bp = Blueprint("melhorarplano", __name__, url_prefix="/plans")
 
-def _get_parent_member():
-    """Garante que quem está acessando é um PAI."""
-    uid = session.get("user_id")
-    role = session.get("role")
-    if not uid or role != Role.PARENT: return None
-    return Membro.query.filter_by(usuario_id=uid, role=Role.PARENT).first()
-
 # ==========================================================
 # VCP12 - MELHORAR PLANO (Upgrade para PRO)
 # ==========================================================
 
 @melhorarplano_bp.get("/")
+@exige_papel(Role.PARENT, mensagem="Acesso negado.")
 def plans_page():
     """
     Exibe a tela de comparação de planos (Free vs Pro).
     Mostra o plano atual da família.
     """
-    parent_member = _get_parent_member()
-    if not parent_member:
-        flash("Acesso negado.", "error")
-        return redirect(url_for("login.login_page"))
+    parent_member = g.membro
     
     plano_atual = parent_member.familia.plano
     
     return render_template("parent/plans.html", plano_atual=plano_atual)
 
 @melhorarplano_bp.post("/subscribe")
+@exige_papel(Role.PARENT)
 def subscribe_pro():
-    parent_member = _get_parent_member()
-    if not parent_member:
-        return redirect(url_for("login.login_page"))
+    parent_member = g.membro
     
     familia = parent_member.familia
     
     try:
         familia.plano = "PRO"
+        versao_familia.tocar(familia.id)
         db.session.commit()
         
         flash("Pagamento confirmado! Bem-vindo ao TaskPay PRO!", "success")
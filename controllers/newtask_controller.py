@@ -1,16 +1,14 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, g, jsonify
 from decimal import Decimal
 from datetime import datetime
 from extensions import db
-from models.models import Membro, Role, Tarefa, TaskStatus, Notificacao
+from models.models import Role, TarefaRecorrente, Recorrencia
+from services import tarefas, recorrentes, diretorio
+from services.membro_atual import exige_papel
 
 newtask_bp = Blueprint("newtask", __name__, url_prefix="/tasks")
 
-def _get_parent_member():
-    uid = session.get("user_id")
-    if not uid: return None
-    if session.get("role") != Role.PARENT: return None
-    return Membro.query.filter_by(usuario_id=uid, role=Role.PARENT).first()
+TAREFAS_POR_REQUISICAO = 1000
 
 # ==========================================================
 # VCP04 - Criar Tarefa
@@ -19,56 +17,41 @@ def _get_parent_member():
 # VCP04 - Criar Tarefa: 
 # Recebe dados do formulário, valida, cria Tarefa e envia notificação ao filho.
 @newtask_bp.get("/new")
+@exige_papel(Role.PARENT, mensagem="Sessão inválida ou acesso negado.")
 def new_task_page():
     """Exibe o formulário de criação de tarefa."""
-    parent_member = _get_parent_member()
-    if not parent_member:
-        flash("Sessão inválida ou acesso negado.", "error")
-        return redirect(url_for("login.login_page"))
+    parent_member = g.membro
 
     # Busca os filhos para preencher o <select> (VCP 05)
-    filhos = Membro.query.filter_by(familia_id=parent_member.familia_id, role=Role.CHILD).all()
+    filhos = diretorio.filhos(parent_member.familia_id)
+    recorrentes_ativas = TarefaRecorrente.query.filter_by(
+        familia_id=parent_member.familia_id, ativa=True
+    ).order_by(TarefaRecorrente.criadoEm).all()
     
-    return render_template("parent/new_task.html", filhos=filhos)
+    return render_template(
+        "parent/new_task.html",
+        filhos=filhos,
+        recorrentes=recorrentes_ativas,
+        dias_semana=DIAS_SEMANA
+    )
 
-@newtask_bp.post("/new")
-def create_task():
-    """Processa o formulário de criação."""
-    parent_member = _get_parent_member()
-    if not parent_member:
-        flash("Sessão inválida.", "error")
-        return redirect(url_for("login.login_page"))
-    
-    titulo = (request.form.get("titulo") or "").strip()
-    descricao = (request.form.get("descricao") or "").strip()
-    valor = request.form.get("valor") or "0"
-    exige_foto = True if request.form.get("exige_foto") == "on" else False
-    prazo_str = (request.form.get("prazo") or "").strip()
-    prioridade = request.form.get("prioridade") or None
-    icone = request.form.get("icone") or None
-    
-    # VCP05 - O ID do executor define para quem a tarefa vai
-    executor_id = request.form.get("executor_id") or None 
+def _campos_tarefa(fonte):
+    """Campos comuns da Tarefa a partir do form ou de um item JSON. Retorna (campos, erros)."""
+    titulo = str(fonte.get("titulo") or "").strip()
+    descricao = str(fonte.get("descricao") or "").strip()
+    valor = str(fonte.get("valor") or "0")
+    exige_foto = fonte.get("exige_foto") in ("on", True)
+    prazo_str = str(fonte.get("prazo") or "").strip()
+    prioridade = fonte.get("prioridade") or None
+    icone = fonte.get("icone") or None
 
-    has_error = False
+    erros = []
     if not titulo:
-        flash("Informe o nome da tarefa.", "error")
-        has_error = True
-    
-    if not executor_id:
-        flash("Selecione um filho para a tarefa.", "error")
-        has_error = True
-
+        erros.append("Informe o nome da tarefa.")
     if not prioridade:
-        flash("Selecione uma prioridade.", "error")
-        has_error = True
-        
+        erros.append("Selecione uma prioridade.")
     if not icone:
-        flash("Selecione um ícone.", "error")
-        has_error = True
-
-    if has_error:
-        return redirect(url_for("newtask.new_task_page"))
+        erros.append("Selecione um ícone.")
 
     try:
         valor_base = Decimal(valor.replace(",", "."))
@@ -81,33 +64,133 @@ def create_task():
             prazo_dt = datetime.fromisoformat(prazo_str)
         except:
             prazo_dt = None
-            
-    tarefa = Tarefa(
+
+    campos = dict(
         titulo=titulo,
         descricao=descricao,
         valorBase=valor_base,
-        status=TaskStatus.ATIVA,
         exigeFoto=exige_foto,
         prazo=prazo_dt,
         prioridade=prioridade,
         icone=icone,
-        criador_id=parent_member.id,
-        executor_id=executor_id # VCP05
     )
-    db.session.add(tarefa)
+    return campos, erros
+
+def _expandir(campos, executores, filhos):
+    """Uma linha de Tarefa por filho (VCP05), ignorando repetidos. Retorna (itens, erros)."""
+    executores = list(dict.fromkeys(e for e in executores if e))
+    if not executores:
+        return [], ["Selecione um filho para a tarefa."]
+    if any(e not in filhos for e in executores):
+        return [], ["Filho inválido para esta família."]
+    return [dict(campos, executor_id=e) for e in executores], []
+
+@newtask_bp.post("/new")
+@exige_papel(Role.PARENT, mensagem="Sessão inválida.")
+def create_task():
+    """
+    Processa o formulário de criação (um ou vários filhos marcados).
+    Também aceita JSON: um objeto ou {"tarefas": [...]}, cada um com os campos
+    do formulário e "executor_ids" (lista) ou "executor_id".
+    """
+    parent_member = g.membro
+    filhos = tarefas.filhos_da_familia(parent_member.familia_id)
+
+    if request.is_json:
+        return _create_tasks_json(parent_member, filhos)
+
+    campos, erros = _campos_tarefa(request.form)
+    # VCP05 - Os IDs dos executores definem para quem a tarefa vai
+    itens, erros_exec = _expandir(campos, request.form.getlist("executor_id"), filhos)
+    erros += erros_exec
+
+    if erros:
+        for erro in erros:
+            flash(erro, "error")
+        return redirect(url_for("newtask.new_task_page"))
+
+    repeticao = request.form.get("repeticao") or ""
+    if repeticao:
+        return _create_recurring(parent_member, campos, itens, repeticao)
+
+    tarefas.criar_em_lote(parent_member, itens, filhos)
     db.session.commit()
+
+    if len(itens) > 1:
+        flash(f"Tarefa criada para {len(itens)} filhos!", "success")
+    else:
+        flash("Tarefa criada com sucesso!", "success")
     
-    if executor_id:
-        filho = Membro.query.get(executor_id)
-        if filho:
-            notif = Notificacao(
-                tipo="NOVA_TAREFA",
-                mensagem=f"Nova tarefa: {tarefa.titulo}",
-                usuario_id=filho.usuario_id
-            )
-            db.session.add(notif)
-            db.session.commit()
-            
-    flash("Tarefa criada com sucesso!", "success")
-    
-    return redirect(url_for("notificacoes.home_parent"))
\ No newline at end of file
+    return redirect(url_for("notificacoes.home_parent"))
+
+def _create_tasks_json(parent_member, filhos):
+    dados = request.get_json(silent=True)
+    modelos = dados.get("tarefas") if isinstance(dados, dict) and "tarefas" in dados else [dados]
+    if not isinstance(modelos, list) or not all(isinstance(m, dict) for m in modelos):
+        return jsonify({"erros": ["JSON inválido."]}), 400
+
+    itens, erros = [], []
+    for posicao, modelo in enumerate(modelos):
+        campos, erros_item = _campos_tarefa(modelo)
+        executores = modelo.get("executor_ids") or [modelo.get("executor_id")]
+        novos, erros_exec = _expandir(campos, executores if isinstance(executores, list) else [], filhos)
+        erros.extend(f"[{posicao}] {erro}" for erro in erros_item + erros_exec)
+        itens.extend(novos)
+
+    if not erros and len(itens) > TAREFAS_POR_REQUISICAO:
+        erros.append(f"Máximo de {TAREFAS_POR_REQUISICAO} tarefas por requisição.")
+    if erros:
+        return jsonify({"erros": erros}), 400
+
+    ids = tarefas.criar_em_lote(parent_member, itens, filhos)
+    db.session.commit()
+    return jsonify({"criadas": len(ids), "ids": ids}), 201
+
+# ==========================================================
+# TAREFAS RECORRENTES (services/recorrentes.py)
+# ==========================================================
+DIAS_SEMANA = ["Seg", "Ter", "Qua", "Qui", "Sex", "Sáb", "Dom"]
+
+def _create_recurring(parent_member, campos, itens, repeticao):
+    """Salva a definição e já gera a ocorrência de hoje (se hoje for um dos dias)."""
+    dias = sorted({int(d) for d in request.form.getlist("dias_semana") if d.isdigit() and int(d) < 7})
+
+    if repeticao == Recorrencia.DIARIA:
+        frequencia, dias_str = Recorrencia.DIARIA, None
+    elif repeticao == Recorrencia.DIAS and dias:
+        frequencia = Recorrencia.SEMANAL if len(dias) == 1 else Recorrencia.DIAS
+        dias_str = ",".join(str(d) for d in dias)
+    else:
+        flash("Escolha os dias da semana da tarefa recorrente.", "error")
+        return redirect(url_for("newtask.new_task_page"))
+
+    prazo = campos.pop("prazo")
+    definicao = TarefaRecorrente(
+        **campos,
+        frequencia=frequencia,
+        diasSemana=dias_str,
+        horaPrazo=prazo.time() if prazo else None,
+        executores=[item["executor_id"] for item in itens],
+        familia_id=parent_member.familia_id,
+        criador_id=parent_member.id
+    )
+    db.session.add(definicao)
+    db.session.flush()
+    criadas = recorrentes.gerar(definicao_ids=[definicao.id])
+
+    flash(f"Tarefa recorrente criada! {criadas} tarefa(s) para hoje.", "success")
+    return redirect(url_for("notificacoes.home_parent"))
+
+@newtask_bp.post("/recurring/<recorrente_id>/stop")
+@exige_papel(Role.PARENT, mensagem="Sessão inválida.")
+def stop_recurring(recorrente_id):
+    """Para de gerar novas ocorrências (as tarefas já criadas continuam)."""
+    definicao = db.session.get(TarefaRecorrente, recorrente_id)
+    if not definicao or definicao.familia_id != g.membro.familia_id:
+        flash("Tarefa recorrente não encontrada.", "error")
+        return redirect(url_for("newtask.new_task_page"))
+
+    definicao.ativa = False
+    db.session.commit()
+    flash(f"'{definicao.titulo}' não vai mais se repetir.", "success")
+    return redirect(url_for("newtask.new_task_page"))
@@ -1,27 +1,24 @@
-from flask import Blueprint, render_template, redirect, url_for, session, flash
+from flask import Blueprint, render_template, redirect, url_for, session, flash, current_app, g, request, Response, stream_with_context, abort
 from sqlalchemy.sql import func
-from datetime import datetime, timedelta
+from datetime import datetime
 from extensions import db
 from models.models import (
     Membro, Role, Notificacao, Tarefa, TaskStatus, 
     Submissao, SubmissionStatus, Progresso, Carteira, 
-    Transacao, TransactionType,
     ResgateRecompensa, ResgateStatus
 )
+from services import resumo_familia, notificacoes, streak, diretorio, versao_familia, notificacoes_ao_vivo
+from services.membro_atual import exige_papel
+from services.versao_familia import com_etag
 
 notificacoes_bp = Blueprint("notificacoes", __name__, url_prefix="/home")
 
-def _get_member(role_required):
-    """Retorna o membro logado se corresponder ao papel exigido (PARENT ou CHILD)."""
-    uid = session.get("user_id")
-    if not uid: return None
-    membro = Membro.query.filter_by(usuario_id=uid, role=role_required).first()
-    return membro
-
 # ==========================================================
 # HOME DO PAI (Dashboard + Aprovações + Notificações)
 # ==========================================================
 @notificacoes_bp.get("/parent")
+@exige_papel(Role.PARENT)
+@com_etag
 def home_parent():
     """
     Exibe o Dashboard do Pai.
@@ -30,60 +27,46 @@ def home_parent():
     2. Lista de Aprovação (Tarefas que os filhos enviaram).
     3. Feed de Notificações.
     """
-    parent_member = _get_member(Role.PARENT)
-    if not parent_member:
-        return redirect(url_for("login.login_page"))
+    parent_member = g.membro
 
-    filhos = Membro.query.filter_by(familia_id=parent_member.familia_id, role=Role.CHILD).all()
-    filhos_ids = [f.id for f in filhos]
-    
-    total_prometido = 0.0
-    total_pago = 0.0
-    
-    if filhos_ids:
-        total_prometido = db.session.query(func.sum(Transacao.valor)).join(Carteira).filter(
-            Carteira.membro_id.in_(filhos_ids),
-            Transacao.tipo.in_([TransactionType.CREDIT_TASK, TransactionType.CREDIT_ALLOWANCE])
-        ).scalar() or 0.0
-
-        total_pago = db.session.query(func.sum(Transacao.valor)).join(Carteira).filter(
-            Carteira.membro_id.in_(filhos_ids),
-            Transacao.tipo == 'DEBIT_PAYMENT'
-        ).scalar() or 0.0
+    # Cards do topo: uma linha de resumo_familia (mantida pelas ações de escrita)
+    resumo = resumo_familia.obter(parent_member.familia_id)
 
+    # As listas só são consultadas quando o resumo diz que há algo para listar
     tarefas_para_avaliar = []
-    if filhos_ids:
-        tarefas_para_avaliar = Submissao.query.join(Tarefa).filter(
-            Tarefa.executor_id.in_(filhos_ids),
+    if resumo.avaliacoesPendentes > 0:
+        tarefas_para_avaliar = Submissao.query.join(Tarefa).join(Membro, Tarefa.executor_id == Membro.id).filter(
+            Membro.familia_id == parent_member.familia_id,
             Submissao.status == SubmissionStatus.PENDING
         ).order_by(Submissao.enviadaEm.asc()).all()
 
     tarefas_pendentes = []
-    if filhos_ids:
-        tarefas_pendentes = Tarefa.query.filter(
-            Tarefa.executor_id.in_(filhos_ids),
-            Tarefa.status == TaskStatus.ATIVA
+    if resumo.tarefasAtivas > 0:
+        tarefas_pendentes = Tarefa.query.join(Membro, Tarefa.executor_id == Membro.id).filter(
+            Membro.familia_id == parent_member.familia_id,
+            Tarefa.status.in_(TaskStatus.ABERTAS)
         ).order_by(Tarefa.prazo.asc()).all()
 
-    notificacoes = Notificacao.query.filter_by(
-        usuario_id=parent_member.usuario_id, 
-        lidaEm=None
-    ).order_by(Notificacao.enviadaEm.desc()).all()
+    notificacoes_pai = notificacoes.nao_lidas(parent_member, limite=current_app.config["NOTIF_LIMITE_FEED"])
 
     return render_template(
         "parent/home.html", 
         parent_member=parent_member,
-        total_prometido=total_prometido,
-        total_pago=total_pago,
+        resumo=resumo,
+        total_prometido=resumo.totalPrometido,
+        total_pago=resumo.totalPago,
+        saldo_a_pagar=resumo_familia.saldo_a_pagar(parent_member.familia_id),
         tarefas_pendentes=tarefas_pendentes,
         tarefas_para_avaliar=tarefas_para_avaliar, 
-        notificacoes=notificacoes
+        notificacoes=notificacoes_pai,
+        diretorio=diretorio.por_id(parent_member.familia_id)
     )
 
 # ==========================================================
 # HOME DO FILHO (Dashboard + Foguinho + Notificações)
 # ==========================================================
 @notificacoes_bp.get("/child")
+@exige_papel(Role.CHILD)
 def home_child():
     """
     Exibe o Dashboard do Filho.
@@ -92,9 +75,7 @@ def home_child():
     2. Resumo da Carteira (Ganhos, Perdas, XP Gasto).
     3. Notificações (Lê automaticamente ao abrir).
     """
-    child_member = _get_member(Role.CHILD)
-    if not child_member:
-        return redirect(url_for("login.login_page"))
+    child_member = g.membro
 
     if not child_member.progresso:
         db.session.add(Progresso(membro_id=child_member.id))
@@ -106,36 +87,23 @@ def home_child():
     carteira = child_member.carteira
 
     # 1. Lógica de Notificações (VCP 11)
-    notificacoes_db = Notificacao.query.filter_by(
-        usuario_id=child_member.usuario_id, 
-        lidaEm=None
-    ).order_by(Notificacao.enviadaEm.desc()).all()
-
-    unread_count = len(notificacoes_db)
-    notificacoes_novas = list(notificacoes_db)
+    # Pessoais + avisos da família; "ler ao abrir" só avança o cursor do usuário
+    notificacoes_novas = notificacoes.nao_lidas(child_member, limite=current_app.config["NOTIF_LIMITE_FEED"])
+    unread_count = len(notificacoes_novas)
 
-    if notificacoes_db:
-        for n in notificacoes_db:
-            n.lidaEm = datetime.utcnow()
+    if notificacoes_novas:
+        notificacoes.marcar_lidas_ate(child_member.usuario_id, notificacoes_novas[0].enviadaEm)
         db.session.commit()
 
     current_xp = progresso.xp
     max_xp = 1000
     xp_percent = (current_xp / max_xp) * 100 if max_xp > 0 else 0
 
-    is_streak_active = False
-    if progresso.ultimaTarefaEm:
-        agora = datetime.utcnow()
-        limite_streak = progresso.ultimaTarefaEm + timedelta(hours=24)
-        if agora < limite_streak:
-            is_streak_active = True
+    is_streak_active, _ = streak.streak_vigente(progresso, streak.fuso(child_member.familia.fusoHorario))
 
     saldo_atual = carteira.saldo
     
-    soma_tarefas = db.session.query(func.sum(Transacao.valor)).filter(
-        Transacao.carteira_id == carteira.id,
-        Transacao.tipo == TransactionType.CREDIT_TASK
-    ).scalar() or 0.0
+    soma_tarefas = carteira.totalTarefas or 0.0
 
     
     soma_rejeitadas = db.session.query(func.sum(Tarefa.valorBase)).join(Submissao).filter(
@@ -152,7 +120,7 @@ def home_child():
 
     tarefas_pendentes = Tarefa.query.filter(
         Tarefa.executor_id == child_member.id,
-        Tarefa.status == TaskStatus.ATIVA
+        Tarefa.status.in_(TaskStatus.ABERTAS)
     ).order_by(Tarefa.prazo.asc()).all()
     
     tarefas_enviadas = Submissao.query.join(Tarefa).filter(
@@ -187,9 +155,12 @@ def mark_read(notif_id):
     uid = session.get("user_id")
     if not uid: return redirect(url_for("login.login_page"))
     
+    # Avisos da família não têm leitura individual: saem pelo cursor (read_all)
     n = Notificacao.query.get(notif_id)
     if n and n.usuario_id == uid:
-        n.lidaEm = datetime.utcnow()
+        notificacoes.marcar_lida(n)
+        if g.get("membro"):
+            versao_familia.tocar(g.membro.familia_id)
         db.session.commit()
         
     if session.get("role") == Role.CHILD:
@@ -201,12 +172,41 @@ def mark_all_read():
     """Marca todas as notificações do usuário como lidas."""
     uid = session.get("user_id")
     if uid:
-        (Notificacao.query
-         .filter_by(usuario_id=uid)
-         .filter(Notificacao.lidaEm.is_(None))
-         .update({Notificacao.lidaEm: datetime.utcnow()}))
+        # Uma linha: o cursor "lido até" cobre pessoais e avisos da família
+        notificacoes.marcar_lidas_ate(uid)
+        if g.get("membro"):
+            versao_familia.tocar(g.membro.familia_id)
         db.session.commit()
         
     if session.get("role") == Role.CHILD:
         return redirect(url_for("notificacoes.home_child"))
-    return redirect(url_for("notificacoes.home_parent"))
\ No newline at end of file
+    return redirect(url_for("notificacoes.home_parent"))
+
+# ==========================================================
+# NOTIFICAÇÕES AO VIVO (SSE)
+# ==========================================================
+@notificacoes_bp.get("/eventos")
+@exige_papel()
+def eventos_stream():
+    """Stream de notificações novas e contagem de não lidas (EventSource). 404 com EVENTOS_AO_VIVO desligado."""
+    if not current_app.config["EVENTOS_AO_VIVO"]:
+        abort(404)   # o EventSource desiste sem ficar reconectando
+    desde = notificacoes_ao_vivo.cursor_de(request.headers.get("Last-Event-ID"))
+    resposta = Response(
+        stream_with_context(notificacoes_ao_vivo.fluxo(g.membro, desde)),
+        mimetype="text/event-stream",
+    )
+    resposta.headers["Cache-Control"] = "no-cache"
+    resposta.headers["X-Accel-Buffering"] = "no"   # nginx/proxy não segura os eventos
+    return resposta
+
+@notificacoes_bp.post("/lidas")
+@exige_papel()
+def mark_read_until():
+    """Avança o cursor "lido até" (toasts do feed ao vivo já mostrados). Responde 204."""
+    ate = notificacoes_ao_vivo.cursor_de(request.form.get("ate"))
+    if ate:
+        notificacoes.marcar_lidas_ate(g.membro.usuario_id, min(ate, datetime.utcnow()))
+        versao_familia.tocar(g.membro.familia_id)
+        db.session.commit()
+    return "", 204
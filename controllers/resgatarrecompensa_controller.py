@@ -1,32 +1,29 @@
-from flask import Blueprint, render_template, redirect, url_for, session, flash
+from flask import Blueprint, render_template, redirect, url_for, flash, g
+from sqlalchemy import select
 from sqlalchemy.sql import or_, and_
 from datetime import datetime, timedelta
 from extensions import db
 from models.models import (
-    Membro, Role, Recompensa, ResgateRecompensa, ResgateStatus, Notificacao
+    Membro, Role, Recompensa, ResgateRecompensa, ResgateStatus
 )
+from services import notificacoes, catalogo, diretorio, versao_familia
+from services.membro_atual import exige_papel
+from services.versao_familia import com_etag
 
 resgatar_bp = Blueprint("resgatar", __name__, url_prefix="/rewards")
 
-def _get_current_member():
-    uid = session.get("user_id")
-    role = session.get("role")
-    if not uid or not role: return None
-    return Membro.query.filter_by(usuario_id=uid, role=role).first()
-
 # ==========================================================
 # ÁREA DO FILHO (Loja e Resgate)
 # ==========================================================
 
 @resgatar_bp.get("/shop")
+@exige_papel(Role.CHILD)
 def shop_page():
     """
     Exibe a Loja de Recompensas para o Filho.
     Mostra itens disponíveis e o histórico recente.
     """
-    membro = _get_current_member()
-    if not membro or membro.role != Role.CHILD:
-        return redirect(url_for("login.login_page"))
+    membro = g.membro
     
     limite_tempo = datetime.utcnow() - timedelta(hours=36)
     historico_resgates = db.session.query(ResgateRecompensa).filter(
@@ -40,17 +37,7 @@ def shop_page():
         )
     ).order_by(ResgateRecompensa.criadoEm.desc()).all()
     
-    resgates_familia = db.session.query(ResgateRecompensa.recompensa_id)\
-        .join(Membro, ResgateRecompensa.membro_id == Membro.id)\
-        .filter(Membro.familia_id == membro.familia_id)\
-        .all()
-    ids_esconder = [r.recompensa_id for r in resgates_familia]
-    
-    query_loja = Recompensa.query.filter_by(familia_id=membro.familia_id, ativa=True)
-    if ids_esconder:
-        query_loja = query_loja.filter(Recompensa.id.notin_(ids_esconder))
-        
-    recompensas_disponiveis = query_loja.order_by(Recompensa.custoXP.asc()).all()
+    recompensas_disponiveis = sorted(catalogo.disponiveis(membro.familia_id), key=lambda r: r["custoXP"])
     
     return render_template(
         "child/rewards.html",
@@ -66,13 +53,12 @@ def shop_page():
 # VCP10 - Resgatar Recompensa:
 # Filho gasta XP, cria pedido PENDING, notifica pais.
 @resgatar_bp.post("/redeem/<recompensa_id>")
+@exige_papel(Role.CHILD)
 def redeem_reward(recompensa_id):
     """
     Ação do Filho: Gastar XP para pedir uma recompensa.
     """
-    membro = _get_current_member()
-    if not membro or membro.role != Role.CHILD:
-        return redirect(url_for("login.login_page"))
+    membro = g.membro
     
     recompensa = db.session.get(Recompensa, recompensa_id)
     
@@ -80,6 +66,11 @@ def redeem_reward(recompensa_id):
         flash("Recompensa inválida.", "error")
         return redirect(url_for("resgatar.shop_page"))
         
+    if catalogo.ja_resgatada(recompensa.id):
+        catalogo.invalidar(membro.familia_id)
+        flash("Esta recompensa já foi resgatada.", "warning")
+        return redirect(url_for("resgatar.shop_page"))
+        
     if (membro.saldoXP or 0) < recompensa.custoXP:
         flash(f"XP insuficiente. Você precisa de {recompensa.custoXP} XP.", "error")
         return redirect(url_for("resgatar.shop_page"))
@@ -95,16 +86,14 @@ def redeem_reward(recompensa_id):
         )
         db.session.add(resgate)
         
-        pais = Membro.query.filter_by(familia_id=membro.familia_id, role=Role.PARENT).all()
-        for pai in pais:
-            notif = Notificacao(
-                tipo="NOVO_RESGATE",
-                mensagem=f"{membro.usuario.nome} resgatou '{recompensa.titulo}'!",
-                usuario_id=pai.usuario_id
-            )
-            db.session.add(notif)
+        notificacoes.notificar_familia(
+            membro.familia_id, Role.PARENT,
+            tipo="NOVO_RESGATE",
+            mensagem=f"{membro.usuario.nome} resgatou '{recompensa.titulo}'!"
+        )
             
         db.session.commit()
+        catalogo.invalidar(membro.familia_id)
         flash(f"Pedido de '{recompensa.titulo}' enviado!", "success")
         
     except Exception as e:
@@ -119,30 +108,26 @@ def redeem_reward(recompensa_id):
 # ==========================================================
 
 @resgatar_bp.get("/manage")
+@exige_papel(Role.PARENT)
+@com_etag
 def manage_page():
     """
     Exibe a lista de pedidos de recompensa para o Pai (Pendentes e Histórico).
     """
-    membro = _get_current_member()
-    if not membro or membro.role != Role.PARENT:
-        return redirect(url_for("login.login_page"))
+    membro = g.membro
     
-    filhos = Membro.query.filter_by(familia_id=membro.familia_id, role=Role.CHILD).all()
+    filhos = diretorio.filhos(membro.familia_id)
     
+    # XP muda a cada aprovação/resgate: só ele vem do banco, numa consulta
+    xp = dict(db.session.execute(
+        select(Membro.id, Membro.saldoXP).where(Membro.familia_id == membro.familia_id, Membro.role == Role.CHILD)
+    ).all())
     xp_por_filho = [{
-        "id": f.id, "nome": f.usuario.nome, 
-        "xp": (f.saldoXP or 0), "avatar": f.usuario.avatarUrl
+        "id": f["id"], "nome": f["nome"], 
+        "xp": (xp.get(f["id"]) or 0), "avatar": f["avatarUrl"]
     } for f in filhos]
     
-    resgates_familia = db.session.query(ResgateRecompensa.recompensa_id)\
-        .join(Membro, ResgateRecompensa.membro_id == Membro.id)\
-        .filter(Membro.familia_id == membro.familia_id).all()
-    ids_ja_resgatados = [r.recompensa_id for r in resgates_familia]
-    
-    query_ativas = Recompensa.query.filter_by(familia_id=membro.familia_id, ativa=True)
-    if ids_ja_resgatados:
-        query_ativas = query_ativas.filter(Recompensa.id.notin_(ids_ja_resgatados))
-    ativas = query_ativas.order_by(Recompensa.criadoEm.desc()).all()
+    ativas = sorted(catalogo.disponiveis(membro.familia_id), key=lambda r: r["criadoEm"], reverse=True)
     
     limite_tempo = datetime.utcnow() - timedelta(hours=36)
     historico = (ResgateRecompensa.query
@@ -167,9 +152,9 @@ def manage_page():
 # VCP10 - Resgatar Recompensa:
 # Pai entrega (DELIVERED) ou rejeita (REJECTED) retornando XP ao filho.
 @resgatar_bp.get("/deliver/<resgate_id>")
+@exige_papel(Role.PARENT)
 def deliver_reward(resgate_id):
-    parent = _get_current_member()
-    if not parent or parent.role != Role.PARENT: return redirect(url_for("login.login_page"))
+    parent = g.membro
     
     resgate = db.session.get(ResgateRecompensa, resgate_id)
     if not resgate or resgate.membro.familia_id != parent.familia_id:
@@ -178,12 +163,12 @@ def deliver_reward(resgate_id):
     try:
         resgate.status = ResgateStatus.DELIVERED
         
-        notif = Notificacao(
+        notificacoes.notificar_usuario(
             tipo="RECOMPENSA_ENTREGUE",
             mensagem=f"Sua recompensa '{resgate.recompensa.titulo}' foi entregue!",
             usuario_id=resgate.membro.usuario_id
         )
-        db.session.add(notif)
+        versao_familia.tocar(parent.familia_id)
         db.session.commit()
         flash("Recompensa entregue!", "success")
     except Exception:
@@ -194,9 +179,9 @@ def deliver_reward(resgate_id):
 # VCP10 - Resgatar/rejeitar Recompensa:
 # Pai entrega (DELIVERED) ou rejeita (REJECTED) retornando XP ao filho.
 @resgatar_bp.get("/reject/<resgate_id>")
+@exige_papel(Role.PARENT)
 def reject_reward(resgate_id):
-    parent = _get_current_member()
-    if not parent or parent.role != Role.PARENT: return redirect(url_for("login.login_page"))
+    parent = g.membro
     
     resgate = db.session.get(ResgateRecompensa, resgate_id)
     if not resgate or resgate.membro.familia_id != parent.familia_id:
@@ -212,12 +197,12 @@ def reject_reward(resgate_id):
         filho = resgate.membro
         filho.saldoXP = (filho.saldoXP or 0) + resgate.xpPago
         
-        notif = Notificacao(
+        notificacoes.notificar_usuario(
             tipo="RECOMPENSA_REJEITADA",
             mensagem=f"Pedido de '{resgate.recompensa.titulo}' cancelado. {resgate.xpPago} XP devolvidos.",
             usuario_id=filho.usuario_id
         )
-        db.session.add(notif)
+        versao_familia.tocar(parent.familia_id)
         db.session.commit()
         flash(f"Rejeitado. XP devolvido para {filho.usuario.nome}.", "success")
     except Exception:
@@ -1,19 +1,15 @@
-from flask import Blueprint, request, redirect, url_for, session, flash, current_app, render_template
+from flask import Blueprint, request, redirect, url_for, flash, render_template, g, jsonify, current_app
 from datetime import datetime
-from werkzeug.utils import secure_filename
-import os
 from extensions import db
 from models.models import (
-    Membro, Role, Tarefa, TaskStatus, Submissao, SubmissionStatus, 
-    Notificacao, Carteira, Transacao, TransactionType, Progresso
+    Role, Tarefa, TaskStatus, Submissao, SubmissionStatus, generate_uuid
 )
+from services import resumo_familia, notificacoes, avaliacao, diretorio, blobs, armazenamento, ingestao_fotos
+from services.membro_atual import exige_papel
+from services.versao_familia import com_etag
 taskssubmission_bp = Blueprint("taskssubmission", __name__, url_prefix="/submission")
-# --- Função Auxiliar de Segurança ---
-def _get_current_member():
-    uid = session.get("user_id")
-    role = session.get("role")
-    if not uid or not role: return None
-    return Membro.query.filter_by(usuario_id=uid, role=role).first()
+
+FOLGA_MULTIPART = 64 * 1024  # cabeçalhos do multipart além do arquivo
 # ==========================================================
 # ÁREA DO PAI - VCP 08 (Validar/Rejeitar)
 # ==========================================================
@@ -22,68 +18,20 @@ def _get_current_member():
 # ou rejeita (marca tarefa como INATIVA e notifica).
 
 @taskssubmission_bp.get("/approve/<submissao_id>")
+@exige_papel(Role.PARENT)
 def approve_submission(submissao_id):
-    parent_member = _get_current_member()
-    if not parent_member or parent_member.role != Role.PARENT:
-        return redirect(url_for("login.login_page"))
-        
-    submissao = db.session.get(Submissao, submissao_id)
-    if not submissao: 
-        return redirect(url_for("notificacoes.home_parent"))
-        
-    tarefa = submissao.tarefa
-    membro_filho = tarefa.executor
-    
-    if membro_filho.familia_id != parent_member.familia_id:
-        flash("Permissão negada.", "error")
-        return redirect(url_for("notificacoes.home_parent"))
-        
-    if submissao.status == SubmissionStatus.APPROVED:
-        flash("Esta tarefa já foi aprovada.", "warning")
-        return redirect(url_for("notificacoes.home_parent"))
-        
-    try:
-        submissao.status = SubmissionStatus.APPROVED
-        submissao.aprovadaEm = datetime.utcnow()
-        submissao.valorAprovado = tarefa.valorBase
-        
-        if not membro_filho.carteira: 
-            membro_filho.carteira = Carteira(membro_id=membro_filho.id, saldo=0)
-            db.session.add(membro_filho.carteira)
-            
-        membro_filho.carteira.saldo = (membro_filho.carteira.saldo or 0) + tarefa.valorBase
-        
-        transacao = Transacao(
-            tipo=TransactionType.CREDIT_TASK,
-            valor=tarefa.valorBase,
-            descricao=f"Pagamento da tarefa: {tarefa.titulo}",
-            carteira_id=membro_filho.carteira.id
-        )
-        db.session.add(transacao)
+    parent_member = g.membro
 
-        xp_ganho = 100 
-        membro_filho.saldoXP = (membro_filho.saldoXP or 0) + xp_ganho
-        
-        if not membro_filho.progresso: 
-            membro_filho.progresso = Progresso(membro_id=membro_filho.id)
-            db.session.add(membro_filho.progresso)
-            
-        progresso = membro_filho.progresso
-        progresso.xp_total = (progresso.xp_total or 0) + xp_ganho
-        progresso.xp = (progresso.xp or 0) + xp_ganho
-        progresso.ultimaTarefaEm = datetime.utcnow()
-
-        max_xp_nivel_atual = 1000 
-        while progresso.xp >= max_xp_nivel_atual:
-            progresso.nivel += 1
-            progresso.xp -= max_xp_nivel_atual 
-            
-        notif = Notificacao(
-            tipo="TAREFA_APROVADA",
-            mensagem=f"Tarefa '{tarefa.titulo}' aprovada! +R${tarefa.valorBase} e +{xp_ganho} XP",
-            usuario_id=membro_filho.usuario_id
-        )
-        db.session.add(notif)
+    try:
+        resultado = avaliacao.avaliar(parent_member, [submissao_id], avaliacao.APROVAR)[0]
+        if resultado["codigo"] == "inexistente":
+            return redirect(url_for("notificacoes.home_parent"))
+        if resultado["codigo"] == "negado":
+            flash("Permissão negada.", "error")
+            return redirect(url_for("notificacoes.home_parent"))
+        if not resultado["ok"]:
+            flash(resultado["mensagem"], "warning")
+            return redirect(url_for("notificacoes.home_parent"))
         db.session.commit()
         
         flash(f"Tarefa aprovada com sucesso!", "success")
@@ -98,33 +46,21 @@ def approve_submission(submissao_id):
 # Pai aprova (gera XP, adiciona saldo, registra transação)
 # ou rejeita (marca tarefa como INATIVA e notifica).
 @taskssubmission_bp.get("/reject/<submissao_id>")
+@exige_papel(Role.PARENT)
 def reject_submission(submissao_id):
     """
     Ação de Rejeitar:
     Marca como rejeitada e notifica o filho.
     """
-    parent_member = _get_current_member()
-    if not parent_member or parent_member.role != Role.PARENT:
-        return redirect(url_for("login.login_page"))
-        
-    submissao = db.session.get(Submissao, submissao_id)
-    if not submissao: 
-        return redirect(url_for("notificacoes.home_parent"))
-        
-    tarefa = submissao.tarefa
-    if tarefa.executor.familia_id != parent_member.familia_id:
-        return redirect(url_for("notificacoes.home_parent"))
+    parent_member = g.membro
 
     try:
-        submissao.status = SubmissionStatus.REJECTED
-        tarefa.status = TaskStatus.INATIVA 
-        
-        notif = Notificacao(
-            tipo="TAREFA_REJEITADA",
-            mensagem=f"Sua submissão de '{tarefa.titulo}' foi rejeitada pelo responsável.",
-            usuario_id=tarefa.executor.usuario_id
-        )
-        db.session.add(notif)
+        resultado = avaliacao.avaliar(parent_member, [submissao_id], avaliacao.REJEITAR)[0]
+        if resultado["codigo"] in ("inexistente", "negado"):
+            return redirect(url_for("notificacoes.home_parent"))
+        if not resultado["ok"]:
+            flash(resultado["mensagem"], "warning")
+            return redirect(url_for("taskssubmission.tasks_page"))
         db.session.commit()
         
         flash(f"Tarefa rejeitada.", "success")
@@ -134,21 +70,70 @@ def reject_submission(submissao_id):
         
     return redirect(url_for("taskssubmission.tasks_page"))
 
+# Avaliação em lote: ids (form "ids" repetido ou JSON {"ids": [...], "acao": ...})
+# aplicados numa única transação. Responde JSON com o resultado de cada item,
+# ou volta para a fila de avaliação com um resumo.
+LOTE_MAXIMO = 200
+
+@taskssubmission_bp.post("/batch")
+@exige_papel(Role.PARENT)
+def batch_review():
+    parent_member = g.membro
+    quer_json = request.is_json
+
+    if quer_json:
+        dados = request.get_json(silent=True) or {}
+        ids, acao = dados.get("ids") or [], dados.get("acao")
+    else:
+        ids, acao = request.form.getlist("ids"), request.form.get("acao")
+
+    erro = None
+    if acao not in avaliacao.ACOES:
+        erro = "Ação inválida."
+    elif not isinstance(ids, list) or not ids:
+        erro = "Selecione ao menos uma tarefa."
+    elif len(ids) > LOTE_MAXIMO:
+        erro = f"Máximo de {LOTE_MAXIMO} tarefas por vez."
+    if erro:
+        if quer_json:
+            return jsonify({"erro": erro}), 400
+        flash(erro, "error")
+        return redirect(url_for("taskssubmission.tasks_page"))
+
+    try:
+        resultados = avaliacao.avaliar(parent_member, [str(i) for i in ids], acao)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        if quer_json:
+            return jsonify({"erro": str(e)}), 500
+        flash(f"Erro ao avaliar: {e}", "error")
+        return redirect(url_for("taskssubmission.tasks_page"))
+
+    aplicadas = sum(1 for r in resultados if r["ok"])
+    if quer_json:
+        return jsonify({"acao": acao, "aplicadas": aplicadas, "resultados": resultados})
+
+    verbo = "aprovada(s)" if acao == avaliacao.APROVAR else "rejeitada(s)"
+    if aplicadas:
+        flash(f"{aplicadas} tarefa(s) {verbo}.", "success")
+    if aplicadas < len(resultados):
+        flash(f"{len(resultados) - aplicadas} tarefa(s) ignorada(s) (já avaliadas, em processamento ou sem permissão).", "warning")
+    return redirect(url_for("taskssubmission.tasks_page"))
+
 @taskssubmission_bp.get("/parent/tasks")
+@exige_papel(Role.PARENT, mensagem="Acesso negado.")
+@com_etag
 def tasks_page():
-    parent_member = _get_current_member()
-    if not parent_member or parent_member.role != Role.PARENT:
-        flash("Acesso negado.", "error")
-        return redirect(url_for("login.login_page"))
+    parent_member = g.membro
 
-    filhos = Membro.query.filter_by(familia_id=parent_member.familia_id, role=Role.CHILD).all()
-    filhos_ids = [f.id for f in filhos]
+    filhos_ids = [f["id"] for f in diretorio.filhos(parent_member.familia_id)]
     
     tarefas_pendentes = []
     if filhos_ids:
         tarefas_pendentes = Tarefa.query.filter(
             Tarefa.executor_id.in_(filhos_ids),
-            Tarefa.status == TaskStatus.ATIVA
+            Tarefa.status.in_(TaskStatus.ABERTAS)
         ).order_by(Tarefa.prazo.asc()).all()
 
     tarefas_para_avaliar = []
@@ -161,7 +146,8 @@ def tasks_page():
     return render_template(
         "parent/tasks.html", 
         tarefas_pendentes=tarefas_pendentes,
-        tarefas_para_avaliar=tarefas_para_avaliar
+        tarefas_para_avaliar=tarefas_para_avaliar,
+        diretorio=diretorio.por_id(parent_member.familia_id)
     )
 
 # ==========================================================
@@ -170,12 +156,19 @@ def tasks_page():
 # Filho envia submissão de tarefa (com ou sem foto),
 # tarefa vira INATIVA e pai recebe notificação.
 
+def _ajustar_resumo_envio(membro, tarefa, submissao):
+    """Tarefa sai de 'ativas' e entra em 'para avaliar' no resumo da família."""
+    resumo_familia.ajustar(
+        membro.familia_id,
+        ativas=-1 if tarefa.status in TaskStatus.ABERTAS else 0,
+        pendentes=0 if submissao and submissao.status == SubmissionStatus.PENDING else 1
+    )
+
 @taskssubmission_bp.post("/child/submit/<tarefa_id>")
+@exige_papel(Role.CHILD)
 def submit_task_simple(tarefa_id):
     """Filho envia tarefa que NÃO exige foto."""
-    membro = _get_current_member()
-    if not membro or membro.role != Role.CHILD:
-        return redirect(url_for("login.login_page"))
+    membro = g.membro
     
     tarefa = db.session.get(Tarefa, tarefa_id)
     
@@ -188,14 +181,16 @@ def submit_task_simple(tarefa_id):
         return redirect(url_for("taskspending.tasks_page"))
 
     try:
+        submissao = Submissao.query.filter_by(tarefa_id=tarefa.id).first()
+        _ajustar_resumo_envio(membro, tarefa, submissao)
         tarefa.status = TaskStatus.INATIVA
         
-        submissao = Submissao.query.filter_by(tarefa_id=tarefa.id).first()
         if submissao:
             submissao.status = SubmissionStatus.PENDING
             submissao.nota = "Reenvio."
             submissao.enviadaEm = datetime.utcnow()
             submissao.fotoUrl = None
+            blobs.desreferenciar(blobs.SUBMISSAO, submissao.id)
         else:
             submissao = Submissao(
                 tarefa_id=tarefa.id,
@@ -204,14 +199,11 @@ def submit_task_simple(tarefa_id):
             )
             db.session.add(submissao)
 
-        pais = Membro.query.filter_by(familia_id=membro.familia_id, role=Role.PARENT).all()
-        for pai in pais:
-            notif = Notificacao(
-                tipo="TAREFA_PENDENTE", 
-                mensagem=f"{membro.usuario.nome} marcou '{tarefa.titulo}' como feita.", 
-                usuario_id=pai.usuario_id
-            )
-            db.session.add(notif)
+        notificacoes.notificar_familia(
+            membro.familia_id, Role.PARENT,
+            tipo="TAREFA_PENDENTE",
+            mensagem=f"{membro.usuario.nome} marcou '{tarefa.titulo}' como feita."
+        )
             
         db.session.commit()
         flash("Tarefa enviada para aprovação!", "success")
@@ -221,12 +213,17 @@ def submit_task_simple(tarefa_id):
 
     return redirect(url_for("taskspending.tasks_page"))
 
+@taskssubmission_bp.get("/child/upload_url")
+@exige_papel(Role.CHILD)
+def photo_upload_url():
+    """POST pré-assinado para a foto ir direto ao bucket (envio direto)."""
+    return jsonify(armazenamento.preparar_envio(g.membro.id, current_app.config["UPLOAD_LIMITE_FOTO"]))
+
 @taskssubmission_bp.post("/child/submit_photo/<tarefa_id>")
+@exige_papel(Role.CHILD)
 def submit_task_photo(tarefa_id):
     """Filho envia tarefa COM foto."""
-    membro = _get_current_member()
-    if not membro or membro.role != Role.CHILD:
-        return redirect(url_for("login.login_page"))
+    membro = g.membro
 
     tarefa = db.session.get(Tarefa, tarefa_id)
     if not tarefa or tarefa.executor_id != membro.id:
@@ -234,49 +231,51 @@ def submit_task_photo(tarefa_id):
     if not tarefa.exigeFoto:
         flash("Esta tarefa não exige foto.", "warning")
 
-    foto = request.files.get('foto_tarefa')
-    if not foto or foto.filename == '':
+    # Limite deste endpoint antes de o corpo ser lido (acima disso: 413)
+    limite = current_app.config["UPLOAD_LIMITE_FOTO"]
+    request.max_content_length = limite + FOLGA_MULTIPART
+
+    # Só o upload bruto é guardado aqui; conferir/normalizar/avisar os pais fica com o worker
+    try:
+        chave = ingestao_fotos.receber(
+            request.files.get('foto_tarefa'), request.form.get(armazenamento.CAMPO_CHAVE), membro.id, limite
+        )
+    except blobs.UploadInvalido as e:
+        flash(str(e), "error")
+        return redirect(url_for("taskspending.tasks_page"))
+    if chave is None:
         flash("Selecione uma foto.", "error")
         return redirect(url_for("taskspending.tasks_page"))
 
     try:
-        nome_seguro = secure_filename(foto.filename)
-        nome_final = f"sub_{tarefa.id}_{membro.usuario_id}_{nome_seguro}"
-        
-        caminho_dir = os.path.join(current_app.static_folder, 'uploads', 'submissions')
-        os.makedirs(caminho_dir, exist_ok=True)
-        foto.save(os.path.join(caminho_dir, nome_final))
-        
-        db_path = os.path.join('uploads', 'submissions', nome_final).replace("\\", "/")
-
-        tarefa.status = TaskStatus.INATIVA
-        
         submissao = Submissao.query.filter_by(tarefa_id=tarefa.id).first()
+        # Sai de 'ativas' agora; entra em 'para avaliar' quando o worker liberar a foto
+        resumo_familia.ajustar(
+            membro.familia_id,
+            ativas=-1 if tarefa.status in TaskStatus.ABERTAS else 0,
+            pendentes=-1 if submissao and submissao.status == SubmissionStatus.PENDING else 0
+        )
+        tarefa.status = TaskStatus.INATIVA
+
         if submissao:
-            submissao.status = SubmissionStatus.PENDING
-            submissao.fotoUrl = db_path
+            submissao.status = SubmissionStatus.PROCESSING
+            submissao.fotoEntrada = chave
             submissao.enviadaEm = datetime.utcnow()
         else:
             submissao = Submissao(
-                tarefa_id=tarefa.id, 
-                status=SubmissionStatus.PENDING, 
-                fotoUrl=db_path
+                id=generate_uuid(),
+                tarefa_id=tarefa.id,
+                status=SubmissionStatus.PROCESSING,
+                fotoEntrada=chave
             )
             db.session.add(submissao)
-
-        pais = Membro.query.filter_by(familia_id=membro.familia_id, role=Role.PARENT).all()
-        for pai in pais:
-            notif = Notificacao(
-                tipo="TAREFA_PENDENTE", 
-                mensagem=f"{membro.usuario.nome} enviou uma foto para '{tarefa.titulo}'.", 
-                usuario_id=pai.usuario_id
-            )
-            db.session.add(notif)
-            
+        ingestao_fotos.enfileirar(submissao.id)   # o job nasce junto com o commit
         db.session.commit()
-        flash("Foto enviada com sucesso!", "success")
     except Exception as e:
         db.session.rollback()
+        armazenamento.atual().remover(chave)
         flash(f"Erro ao salvar foto: {e}", "error")
+        return redirect(url_for("taskspending.tasks_page"))
 
+    flash("Foto enviada! Ela vai para aprovação assim que for processada.", "success")
     return redirect(url_for("taskspending.tasks_page"))
\ No newline at end of file
@@ -1,10 +1,11 @@
 from extensions import db  
 from datetime import datetime
-import uuid
+from models.tipos import IdUUID, novo_id
 from decimal import Decimal 
 
 def generate_uuid():
-    return str(uuid.uuid4())
+    # uuid4 ou uuid7 (ordenado por tempo), conforme Config.ID_ESTRATEGIA
+    return novo_id()
 
 class Role(str):
     PARENT = "PARENT"
@@ -13,8 +14,11 @@ class Role(str):
 class TaskStatus(str):
     ATIVA = "ATIVA"
     INATIVA = "INATIVA"
+    ATRASADA = "ATRASADA"   # passou do prazo sem envio (services/prazos.py); ainda pode ser enviada
+    ABERTAS = (ATIVA, ATRASADA)
     
 class SubmissionStatus(str):
+    PROCESSING = "PROCESSING"    # foto recebida, aguardando o worker (services/ingestao_fotos.py)
     PENDING = "PENDING"
     APPROVED = "APPROVED"
     REJECTED = "REJECTED"
@@ -24,23 +28,36 @@ class TransactionType(str):
     CREDIT_TASK = "CREDIT_TASK"
     CREDIT_ALLOWANCE = "CREDIT_ALLOWANCE"
     DEBIT_REWARD = "DEBIT_REWARD"
+    DEBIT_PAYMENT = "DEBIT_PAYMENT"
     ADJUSTMENT = "ADJUSTMENT"
 
+class Recorrencia(str):
+    DIARIA = "DIARIA"      # todo dia
+    SEMANAL = "SEMANAL"    # um dia da semana
+    DIAS = "DIAS"          # dias da semana escolhidos
+
 class ResgateStatus(str):
     PENDING = "PENDING"
     APPROVED = "APPROVED"
     REJECTED = "REJECTED"
     DELIVERED = "DELIVERED"
 
+class JobStatus(str):
+    PRONTO = "PRONTO"           # na fila (ou esperando o backoff de uma nova tentativa)
+    EXECUTANDO = "EXECUTANDO"   # reservado por um worker
+    FEITO = "FEITO"
+    MORTO = "MORTO"             # esgotou as tentativas (dead-letter; `flask jobs --reviver`)
+
 # --- 1. Entidade Usuario ---
 class Usuario(db.Model):
     __tablename__ = 'usuario'
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    id = db.Column(IdUUID, primary_key=True, default=generate_uuid)
     nome = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     senhaHash = db.Column(db.Text)
     criadoEm = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     avatarUrl = db.Column(db.String(255), nullable=True)  
+    avatarEntrada = db.Column(db.String(255), nullable=True)  # envio direto ainda não processado (services/ingestao_fotos.py)
     
     # Relacionamentos (1-para-N)
     membros = db.relationship('Membro', back_populates='usuario', lazy=True)
@@ -49,25 +66,44 @@ class Usuario(db.Model):
 # --- 2. Entidade Familia ---
 class Familia(db.Model):
     __tablename__ = 'familia'
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    id = db.Column(IdUUID, primary_key=True, default=generate_uuid)
     nome = db.Column(db.String(100), nullable=False)
     criadoEm = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     plano = db.Column(db.String(20), nullable=False, default="FREE")
+    # Fuso IANA que define o "dia" da família (streak); ver services/streak.py
+    fusoHorario = db.Column(db.String(50), nullable=False, default="America/Sao_Paulo", server_default="America/Sao_Paulo")
+    # Cresce a cada escrita que muda os dashboards (ETag); ver services/versao_familia.py
+    versao = db.Column(db.Integer, nullable=False, default=0, server_default="0")
     # Relacionamentos (1-para-N)
     membros = db.relationship('Membro', back_populates='familia', lazy=True)
     recompensas = db.relationship('Recompensa', back_populates='familia', lazy=True)
+    resumo = db.relationship('ResumoFamilia', back_populates='familia', uselist=False, lazy=True)
+
+# --- 2.1 Resumo da Família (dashboard do pai) ---
+# Linha única por família com os números dos cards do home_parent. Mantida
+# por services/resumo_familia.py em toda ação que mexe nesses números.
+class ResumoFamilia(db.Model):
+    __tablename__ = 'resumo_familia'
+    familia_id = db.Column(IdUUID, db.ForeignKey('familia.id'), primary_key=True)
+    totalPrometido = db.Column(db.Numeric(10, 2), nullable=False, default=Decimal('0.0'))
+    totalPago = db.Column(db.Numeric(10, 2), nullable=False, default=Decimal('0.0'))
+    avaliacoesPendentes = db.Column(db.Integer, nullable=False, default=0)
+    tarefasAtivas = db.Column(db.Integer, nullable=False, default=0)
+    atualizadoEm = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    familia = db.relationship('Familia', back_populates='resumo')
 
 # --- 3. Entidade Membro ---
 # (Classe central que liga Usuario e Familia)
 class Membro(db.Model):
     __tablename__ = 'membro'
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    id = db.Column(IdUUID, primary_key=True, default=generate_uuid)
     role = db.Column(db.String(20), nullable=False, default=Role.CHILD)
     entradaEm = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     
     # Chaves Estrangeiras
-    usuario_id = db.Column(db.String(36), db.ForeignKey('usuario.id'), nullable=False)
-    familia_id = db.Column(db.String(36), db.ForeignKey('familia.id'), nullable=False)
+    usuario_id = db.Column(IdUUID, db.ForeignKey('usuario.id'), nullable=False)
+    familia_id = db.Column(IdUUID, db.ForeignKey('familia.id'), nullable=False)
     
     # Relacionamentos (N-para-1)
     usuario = db.relationship('Usuario', back_populates='membros')
@@ -84,15 +120,27 @@ class Membro(db.Model):
 
     saldoXP = db.Column(db.Integer, nullable=False, default=0)
 
+    # Índices: filhos/pais de uma família e login (usuario + papel)
+    __table_args__ = (
+        db.Index('ix_membro_familia_role', 'familia_id', 'role'),
+        db.Index('ix_membro_usuario_role', 'usuario_id', 'role'),
+    )
+
 # --- 4. Entidade Carteira ---
 class Carteira(db.Model):
     __tablename__ = 'carteira'
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    id = db.Column(IdUUID, primary_key=True, default=generate_uuid)
     saldo = db.Column(db.Numeric(10, 2), nullable=False, default=Decimal('0.0'))
     moeda = db.Column(db.String(10), default='BRL')
+
+    # Totais acumulados (vida toda), mantidos na mesma transação que insere a Transacao
+    # (ver services/extrato.py). Evitam SUM sobre o extrato a cada página.
+    totalTarefas = db.Column(db.Numeric(10, 2), nullable=False, default=Decimal('0.0'), server_default='0')
+    totalMesada = db.Column(db.Numeric(10, 2), nullable=False, default=Decimal('0.0'), server_default='0')
+    totalPago = db.Column(db.Numeric(10, 2), nullable=False, default=Decimal('0.0'), server_default='0')
     
     # Chave Estrangeira (Relação 1-para-1 com Membro)
-    membro_id = db.Column(db.String(36), db.ForeignKey('membro.id'), nullable=False, unique=True)
+    membro_id = db.Column(IdUUID, db.ForeignKey('membro.id'), nullable=False, unique=True)
     
     # Relacionamentos
     membro = db.relationship('Membro', back_populates='carteira')
@@ -101,28 +149,37 @@ class Carteira(db.Model):
 # --- 5. Entidade Transacao (Extrato) ---
 class Transacao(db.Model):
     __tablename__ = 'transacao'
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    id = db.Column(IdUUID, primary_key=True, default=generate_uuid)
     tipo = db.Column(db.String(50), nullable=False) # Usa TransactionType
     valor = db.Column(db.Numeric(10, 2), nullable=False)
     descricao = db.Column(db.String(255), nullable=True)
     criadoEm = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     
     # Chave Estrangeira
-    carteira_id = db.Column(db.String(36), db.ForeignKey('carteira.id'), nullable=False)
+    carteira_id = db.Column(IdUUID, db.ForeignKey('carteira.id'), nullable=False)
     
     # Relacionamento
     carteira = db.relationship('Carteira', back_populates='transacoes')
 
+    # Índice: somatórios e extrato por carteira/tipo
+    __table_args__ = (
+        db.Index('ix_transacao_carteira_tipo', 'carteira_id', 'tipo'),
+    )
+
 # --- 6. Entidade Progresso ---
 class Progresso(db.Model):
     __tablename__ = 'progresso'
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    id = db.Column(IdUUID, primary_key=True, default=generate_uuid)
     xp = db.Column(db.Integer, default=0, nullable=False)
     nivel = db.Column(db.Integer, default=1, nullable=False)
     xp_total = db.Column(db.Integer, default=0, nullable=False)
     ultimaTarefaEm = db.Column(db.DateTime, nullable=True)
+    # Streak (dias seguidos com tarefa aprovada), mantido por services/streak.py
+    streakAtual = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    melhorStreak = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    ultimoDiaAtivo = db.Column(db.Date, nullable=True)   # dia local da família
     # Chave Estrangeira (Relação 1-para-1 com Membro)
-    membro_id = db.Column(db.String(36), db.ForeignKey('membro.id'), nullable=False, unique=True)
+    membro_id = db.Column(IdUUID, db.ForeignKey('membro.id'), nullable=False, unique=True)
     
     # Relacionamento
     membro = db.relationship('Membro', back_populates='progresso')
@@ -130,7 +187,7 @@ class Progresso(db.Model):
 # --- 7. Entidade Tarefa ---
 class Tarefa(db.Model):
     __tablename__ = 'tarefa'
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    id = db.Column(IdUUID, primary_key=True, default=generate_uuid)
     titulo = db.Column(db.String(150), nullable=False)
     descricao = db.Column(db.Text, nullable=True)
     valorBase = db.Column(db.Numeric(10, 2), nullable=False, default=Decimal('0.0'))
@@ -141,45 +198,103 @@ class Tarefa(db.Model):
     icone = db.Column(db.String(30), nullable=True)           # ex: 'fa-broom', 'fa-book', etc.
     
     # Chaves Estrangeiras (para Membro)
-    criador_id = db.Column(db.String(36), db.ForeignKey('membro.id'), nullable=False) # PARENT
-    executor_id = db.Column(db.String(36), db.ForeignKey('membro.id'), nullable=True) # CHILD
+    criador_id = db.Column(IdUUID, db.ForeignKey('membro.id'), nullable=False) # PARENT
+    executor_id = db.Column(IdUUID, db.ForeignKey('membro.id'), nullable=True) # CHILD
+
+    # Gerada por uma TarefaRecorrente: qual definição e para qual dia
+    recorrencia_id = db.Column(IdUUID, db.ForeignKey('tarefa_recorrente.id'), nullable=True)
+    periodo = db.Column(db.Date, nullable=True)
+
+    lembreteEnviadoEm = db.Column(db.DateTime, nullable=True)  # aviso "vence em N horas"
     
     # Relacionamentos
     criador = db.relationship('Membro', back_populates='tarefas_criadas', foreign_keys=[criador_id])
     executor = db.relationship('Membro', back_populates='tarefas_atribuidas', foreign_keys=[executor_id])
     submissao = db.relationship('Submissao', back_populates='tarefa', uselist=False, lazy=True) # 1-para-0..1
 
+    # Índice: tarefas ativas de um filho ordenadas por prazo
+    # Único: uma ocorrência por (definição, filho, dia) -> gerar de novo é no-op
+    __table_args__ = (
+        db.Index('ix_tarefa_executor_status_prazo', 'executor_id', 'status', 'prazo'),
+        db.Index('uq_tarefa_recorrencia_periodo', 'recorrencia_id', 'executor_id', 'periodo', unique=True),
+        # Janela de prazos do motor de prazos (status = ATIVA AND prazo BETWEEN ...)
+        db.Index('ix_tarefa_status_prazo', 'status', 'prazo'),
+    )
+
+# --- 7.1 Entidade TarefaRecorrente (modelo que gera Tarefas por dia) ---
+class TarefaRecorrente(db.Model):
+    __tablename__ = 'tarefa_recorrente'
+    id = db.Column(IdUUID, primary_key=True, default=generate_uuid)
+    titulo = db.Column(db.String(150), nullable=False)
+    descricao = db.Column(db.Text, nullable=True)
+    valorBase = db.Column(db.Numeric(10, 2), nullable=False, default=Decimal('0.0'))
+    exigeFoto = db.Column(db.Boolean, default=False, nullable=False)
+    prioridade = db.Column(db.String(10), nullable=True)
+    icone = db.Column(db.String(30), nullable=True)
+    frequencia = db.Column(db.String(10), nullable=False, default=Recorrencia.DIARIA)
+    diasSemana = db.Column(db.String(20), nullable=True)      # "0,2,4" (0 = segunda), p/ SEMANAL e DIAS
+    horaPrazo = db.Column(db.Time, nullable=True)              # prazo da ocorrência no próprio dia
+    executores = db.Column(db.JSON, nullable=False, default=list)  # [membro_id dos filhos]
+    ativa = db.Column(db.Boolean, nullable=False, default=True)
+    criadoEm = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    familia_id = db.Column(IdUUID, db.ForeignKey('familia.id'), nullable=False)
+    criador_id = db.Column(IdUUID, db.ForeignKey('membro.id'), nullable=False)
+
+    familia = db.relationship('Familia')
+    criador = db.relationship('Membro', foreign_keys=[criador_id])
+
+    __table_args__ = (
+        db.Index('ix_tarefa_recorrente_familia_ativa', 'familia_id', 'ativa'),
+    )
+
+    def dias_da_semana(self):
+        """Dias (0 = segunda) em que a definição gera tarefa."""
+        if self.frequencia == Recorrencia.DIARIA:
+            return set(range(7))
+        return {int(d) for d in (self.diasSemana or "").split(",") if d.strip().isdigit()}
+
 # --- 8. Entidade Submissao ---
 class Submissao(db.Model):
     __tablename__ = 'submissao'
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    id = db.Column(IdUUID, primary_key=True, default=generate_uuid)
     nota = db.Column(db.Text, nullable=True)
     fotoUrl = db.Column(db.String(255), nullable=True)
+    fotoEntrada = db.Column(db.String(255), nullable=True)  # upload bruto ainda não processado (chave no armazenamento)
     enviadaEm = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     status = db.Column(db.String(30), nullable=False, default=SubmissionStatus.PENDING)
     valorAprovado = db.Column(db.Numeric(10, 2), nullable=True)
     aprovadaEm = db.Column(db.DateTime, nullable=True)
 
     # Chave Estrangeira (Relação 1-para-0..1 com Tarefa)
-    tarefa_id = db.Column(db.String(36), db.ForeignKey('tarefa.id'), nullable=False, unique=True)
+    tarefa_id = db.Column(IdUUID, db.ForeignKey('tarefa.id'), nullable=False, unique=True)
     
     # Relacionamento
     tarefa = db.relationship('Tarefa', back_populates='submissao')
 
+    # Índices: fila de avaliação (no Postgres também um índice parcial só dos PENDING)
+    __table_args__ = (
+        db.Index('ix_submissao_status_enviada', 'status', 'enviadaEm'),
+        db.Index(
+            'ix_submissao_pendente_enviada', 'enviadaEm',
+            postgresql_where=db.text("status = 'PENDING'"),
+        ).ddl_if(dialect='postgresql'),
+    )
+
 
 # --- 9. Entidade Recompensa ---
 class Recompensa(db.Model):
     __tablename__ = "recompensa"
 
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    id = db.Column(IdUUID, primary_key=True, default=generate_uuid)
     titulo = db.Column(db.String(120), nullable=False)
     descricao = db.Column(db.Text, nullable=True)
     custoXP = db.Column(db.Integer, nullable=False, default=0)
     ativa = db.Column(db.Boolean, nullable=False, default=True)
     criadoEm = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
-    familia_id = db.Column(db.String(36), db.ForeignKey("familia.id"), nullable=False)
-    criador_id = db.Column(db.String(36), db.ForeignKey("membro.id"), nullable=False)
+    familia_id = db.Column(IdUUID, db.ForeignKey("familia.id"), nullable=False)
+    criador_id = db.Column(IdUUID, db.ForeignKey("membro.id"), nullable=False)
 
     familia = db.relationship("Familia", back_populates="recompensas")
     
@@ -192,9 +307,9 @@ class Recompensa(db.Model):
 class ResgateRecompensa(db.Model):
     __tablename__ = "resgate_recompensa"
 
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
-    recompensa_id = db.Column(db.String(36), db.ForeignKey("recompensa.id"), nullable=False)
-    membro_id = db.Column(db.String(36), db.ForeignKey("membro.id"), nullable=False)
+    id = db.Column(IdUUID, primary_key=True, default=generate_uuid)
+    recompensa_id = db.Column(IdUUID, db.ForeignKey("recompensa.id"), nullable=False)
+    membro_id = db.Column(IdUUID, db.ForeignKey("membro.id"), nullable=False)
     xpPago = db.Column(db.Integer, nullable=False, default=0)
     status = db.Column(db.String(20), nullable=False, default=ResgateStatus.PENDING)
     criadoEm = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -202,19 +317,154 @@ class ResgateRecompensa(db.Model):
     recompensa = db.relationship("Recompensa", back_populates="resgates")
     membro = db.relationship("Membro", back_populates="resgates")
 
+    # Índices: histórico de resgates do filho (no Postgres também parcial dos PENDING)
+    # e o anti-join do catálogo (services/catalogo.py) por recompensa
+    __table_args__ = (
+        db.Index('ix_resgate_membro_status_criado', 'membro_id', 'status', 'criadoEm'),
+        db.Index('ix_resgate_recompensa_status', 'recompensa_id', 'status'),
+        db.Index(
+            'ix_resgate_pendente_membro', 'membro_id', 'criadoEm',
+            postgresql_where=db.text("status = 'PENDING'"),
+        ).ddl_if(dialect='postgresql'),
+    )
+
 
 # --- 11. Entidade Notificacao ---
 class Notificacao(db.Model):
     __tablename__ = 'notificacao'
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    id = db.Column(IdUUID, primary_key=True, default=generate_uuid)
     tipo = db.Column(db.String(50), nullable=False)
     mensagem = db.Column(db.String(255), nullable=False)
     enviadaEm = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     lidaEm = db.Column(db.DateTime, nullable=True) 
     
     # Chave Estrangeira
-    usuario_id = db.Column(db.String(36), db.ForeignKey('usuario.id'), nullable=False)
+    usuario_id = db.Column(IdUUID, db.ForeignKey('usuario.id'), nullable=False)
     
     # Relacionamento
     usuario = db.relationship('Usuario', back_populates='notificacoes')
 
+    # Índices: notificações não lidas do usuário (no Postgres também parcial de lidaEm IS NULL);
+    # enviadaEm sozinho: as novas de todo mundo (eventos 'banco') e a retenção
+    __table_args__ = (
+        db.Index('ix_notificacao_usuario_lida_enviada', 'usuario_id', 'lidaEm', 'enviadaEm'),
+        db.Index('ix_notificacao_enviada', 'enviadaEm'),
+        db.Index(
+            'ix_notificacao_nao_lida', 'usuario_id', 'enviadaEm',
+            postgresql_where=db.text('"lidaEm" IS NULL'),
+        ).ddl_if(dialect='postgresql'),
+    )
+
+
+# --- 12. Entidade NotificacaoFamilia (aviso para um público da família) ---
+# Um único registro por evento ("todos os pais" / "todos os filhos" da família)
+# em vez de uma Notificacao por destinatário. A leitura é controlada pelo
+# cursor de cada usuário (LeituraNotificacao), não por uma coluna na linha.
+class NotificacaoFamilia(db.Model):
+    __tablename__ = 'notificacao_familia'
+    id = db.Column(IdUUID, primary_key=True, default=generate_uuid)
+    tipo = db.Column(db.String(50), nullable=False)
+    mensagem = db.Column(db.String(255), nullable=False)
+    enviadaEm = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    publico = db.Column(db.String(20), nullable=False)  # Role.PARENT | Role.CHILD
+
+    # Chave Estrangeira
+    familia_id = db.Column(IdUUID, db.ForeignKey('familia.id'), nullable=False)
+
+    # Índices: avisos não lidos = faixa de enviadaEm após o cursor do usuário;
+    # enviadaEm sozinho para os avisos novos de todas as famílias (eventos 'banco')
+    __table_args__ = (
+        db.Index('ix_notificacao_familia_publico_enviada', 'familia_id', 'publico', 'enviadaEm'),
+        db.Index('ix_notificacao_familia_enviada', 'enviadaEm'),
+    )
+
+
+# --- 13. Entidade LeituraNotificacao (cursor "lido até") ---
+class LeituraNotificacao(db.Model):
+    __tablename__ = 'leitura_notificacao'
+    usuario_id = db.Column(IdUUID, db.ForeignKey('usuario.id'), primary_key=True)
+    lidoAte = db.Column(db.DateTime, nullable=False)
+    # Avisos da família depois de lidoAte que já foram lidos (só a folga de commit, ver notificacoes.py)
+    avisosLidos = db.Column(db.JSON, nullable=True)
+
+
+# --- 14. Entidade NotificacaoArquivo (retenção) ---
+# Destino das notificações antigas quando a limpeza roda em modo "arquivar"
+# (services/retencao_notificacoes.py). Não é lida por nenhuma página.
+class NotificacaoArquivo(db.Model):
+    __tablename__ = 'notificacao_arquivo'
+    id = db.Column(IdUUID, primary_key=True)
+    origem = db.Column(db.String(10), nullable=False)  # 'PESSOAL' | 'FAMILIA'
+    tipo = db.Column(db.String(50), nullable=False)
+    mensagem = db.Column(db.String(255), nullable=False)
+    enviadaEm = db.Column(db.DateTime, nullable=False)
+    lidaEm = db.Column(db.DateTime, nullable=True)
+    usuario_id = db.Column(IdUUID, nullable=True)
+    familia_id = db.Column(IdUUID, nullable=True)
+    publico = db.Column(db.String(20), nullable=True)
+    arquivadaEm = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+# --- 15. Entidade Blob (arquivo enviado, endereçado pelo conteúdo) ---
+# Cada arquivo de upload existe uma vez só, em static/<caminho>, com o nome
+# igual ao SHA-256 do conteúdo (services/blobs.py). `origemSha256` é o hash
+# do upload bruto que gerou este blob (fotos normalizadas): o mesmo arquivo
+# reenviado reaproveita o blob sem processar de novo.
+class Blob(db.Model):
+    __tablename__ = 'blob'
+    sha256 = db.Column(db.String(64), primary_key=True)
+    caminho = db.Column(db.String(255), nullable=False)  # relativo a static/
+    tamanho = db.Column(db.Integer, nullable=False)
+    tipo = db.Column(db.String(50), nullable=True)
+    origemSha256 = db.Column(db.String(64), nullable=True)
+    criadoEm = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_blob_origem', 'origemSha256'),
+    )
+
+# --- 16. Entidade ReferenciaBlob (quem usa cada blob) ---
+# Uma linha por Submissao.fotoUrl / Usuario.avatarUrl apontando para o blob.
+# Blob sem referência pode ser apagado.
+class ReferenciaBlob(db.Model):
+    __tablename__ = 'referencia_blob'
+    id = db.Column(IdUUID, primary_key=True, default=generate_uuid)
+    blob_sha256 = db.Column(db.String(64), db.ForeignKey('blob.sha256'), nullable=False)
+    donoTipo = db.Column(db.String(20), nullable=False)  # 'submissao' | 'avatar'
+    dono_id = db.Column(IdUUID, nullable=False)          # submissao.id | usuario.id
+    criadoEm = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    blob = db.relationship('Blob')
+
+    __table_args__ = (
+        db.UniqueConstraint('donoTipo', 'dono_id', name='uq_referencia_blob_dono'),
+        db.Index('ix_referencia_blob_sha', 'blob_sha256'),
+    )
+
+# --- 17. Entidade Job (fila de trabalhos em segundo plano) ---
+# Gravada na mesma transação que a originou (services/fila.py): o job só
+# existe se o commit do chamador aconteceu, e sobrevive a restarts.
+class Job(db.Model):
+    __tablename__ = 'job'
+    id = db.Column(IdUUID, primary_key=True, default=generate_uuid)
+    fila = db.Column(db.String(40), nullable=False, default='padrao')
+    tipo = db.Column(db.String(60), nullable=False)
+    carga = db.Column(db.Text, nullable=False, default='{}')   # argumentos em JSON
+    status = db.Column(db.String(12), nullable=False, default=JobStatus.PRONTO)
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    maxTentativas = db.Column(db.Integer, nullable=False, default=5)
+    disponivelEm = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    travadoEm = db.Column(db.DateTime, nullable=True)
+    travadoPor = db.Column(db.String(120), nullable=True)     # host:pid/thread do worker
+    erro = db.Column(db.Text, nullable=True)                  # última falha
+    duracaoMs = db.Column(db.Integer, nullable=True)
+    criadoEm = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    concluidoEm = db.Column(db.DateTime, nullable=True)
+
+    # Índices: reserva do próximo job de cada fila (no Postgres também um parcial só dos PRONTO)
+    __table_args__ = (
+        db.Index('ix_job_fila_status_disponivel', 'fila', 'status', 'disponivelEm'),
+        db.Index(
+            'ix_job_pronto_disponivel', 'fila', 'disponivelEm',
+            postgresql_where=db.text("status = 'PRONTO'"),
+        ).ddl_if(dialect='postgresql'),
+    )
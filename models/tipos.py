@@ -0,0 +1,78 @@
+import os
+import time
+import uuid
+from sqlalchemy.types import TypeDecorator, String, LargeBinary
+from sqlalchemy.dialects import postgresql
+from config import Config
+
+# ==========================================================
+# IDs: geração (uuid4 / uuid7) e armazenamento (texto / binário)
+# ==========================================================
+# Na aplicação (rotas, sessão, templates) o id é sempre a string canônica
+# "xxxxxxxx-xxxx-...", então as URLs não mudam em nenhum dos modos.
+#   ID_ESTRATEGIA    = "uuid4" (aleatório) | "uuid7" (ordenado por tempo)
+#   ID_ARMAZENAMENTO = "texto" (VARCHAR(36)) | "binario" (uuid nativo de
+#                      16 bytes no Postgres, BLOB de 16 bytes no SQLite)
+# Para trocar o armazenamento de um banco existente: `flask converter-ids`.
+
+def uuid7():
+    """UUID versão 7: 48 bits de timestamp em ms + 74 bits aleatórios (RFC 9562)."""
+    ms = time.time_ns() // 1_000_000
+    aleatorio = int.from_bytes(os.urandom(10), "big")
+    rand_a = aleatorio >> 68                  # 12 bits
+    rand_b = aleatorio & ((1 << 62) - 1)      # 62 bits
+    valor = (
+        (ms & ((1 << 48) - 1)) << 80
+        | 0x7 << 76
+        | rand_a << 64
+        | 0b10 << 62
+        | rand_b
+    )
+    return uuid.UUID(int=valor)
+
+def novo_id(estrategia=None):
+    estrategia = estrategia or Config.ID_ESTRATEGIA
+    if estrategia == "uuid7":
+        return str(uuid7())
+    return str(uuid.uuid4())
+
+def _para_uuid(valor):
+    try:
+        return uuid.UUID(str(valor))
+    except ValueError:
+        return None
+
+class IdUUID(TypeDecorator):
+    """Coluna de id/FK: string canônica na aplicação, texto ou 16 bytes no banco."""
+    impl = String(36)
+    cache_ok = True
+
+    def __init__(self, binario=None):
+        super().__init__()
+        self.binario = (Config.ID_ARMAZENAMENTO == "binario") if binario is None else binario
+
+    def load_dialect_impl(self, dialect):
+        if not self.binario:
+            return dialect.type_descriptor(String(36))
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(postgresql.UUID(as_uuid=False))
+        return dialect.type_descriptor(LargeBinary(16))
+
+    def process_bind_param(self, value, dialect):
+        if value is None or not self.binario:
+            return value
+        u = _para_uuid(value)
+        if u is None:
+            # id malformado vindo da URL: não casa com nenhuma linha (em vez de erro no banco)
+            return None
+        return str(u) if dialect.name == "postgresql" else u.bytes
+
+    def process_result_value(self, value, dialect):
+        if value is None or not self.binario:
+            return value
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            bruto = bytes(value)
+            if len(bruto) == 16:
+                return str(uuid.UUID(bytes=bruto))
+            return bruto.decode()
+        return str(value)
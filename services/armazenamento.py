@@ -0,0 +1,268 @@
+import errno
+import mimetypes
+import os
+import shutil
+import time
+from flask import current_app, url_for
+from models.models import generate_uuid
+
+try:
+    import boto3
+    from botocore.config import Config as ConfigBoto
+    from botocore.exceptions import ClientError
+except ImportError:  # opcional: só o backend S3 precisa
+    boto3 = None
+
+# ==========================================================
+# ARMAZENAMENTO DOS UPLOADS (disco local ou bucket S3)
+# ==========================================================
+# Fotos e avatares são guardados por chave ("uploads/blobs/ab/cd/<sha>.jpg"),
+# sem o código saber onde o arquivo mora. ARMAZENAMENTO escolhe o backend:
+#   local -> static/<chave>, servido pelo próprio Flask (padrão, dev). Os
+#            uploads brutos (uploads/entrada/, ainda com EXIF e sem conferência)
+#            ficam fora de static/, em UPLOAD_ENTRADA: só blob processado é público;
+#   s3    -> bucket S3 ou compatível (MinIO...), servido pelo bucket/CDN.
+# Nos templates: {{ upload_url(usuario.avatarUrl) }} no lugar de
+# url_for('static', filename=...).
+# Com S3 + ARMAZENAMENTO_ENVIO_DIRETO, o navegador pede um POST pré-assinado
+# (rotas */upload_url) e manda a foto direto para o bucket, em
+# uploads/entrada/<membro>/<uuid>; o formulário chega ao Flask só com a
+# chave (campo chave_envio). A requisição só confere a chave e o tamanho;
+# um job da fila (services/ingestao_fotos.py) lê o objeto, confere/normaliza
+# como antes e apaga a entrada. O bucket precisa de CORS liberando POST a
+# partir do domínio do app.
+
+PASTA_ENTRADA = "uploads/entrada"
+CAMPO_CHAVE = "chave_envio"
+
+def _percorrer(pasta):
+    """Arquivos (DirEntry) sob `pasta`, em profundidade, um diretório aberto por vez."""
+    pilha = [pasta]
+    while pilha:
+        atual = pilha.pop()
+        try:
+            with os.scandir(atual) as it:
+                for entrada in it:
+                    if entrada.is_dir(follow_symlinks=False):
+                        pilha.append(entrada.path)
+                    elif entrada.is_file(follow_symlinks=False):
+                        yield entrada
+        except FileNotFoundError:
+            continue
+
+class ArmazenamentoLocal:
+    """Arquivos em static/<chave>; entradas brutas e quarentena fora de static."""
+    envio_direto = False
+
+    def __init__(self, raiz, quarentena, entrada=None):
+        self.raiz = raiz
+        self.pasta_quarentena = quarentena
+        self.pasta_entrada = entrada
+
+    def _caminho(self, chave):
+        if self.pasta_entrada and chave.startswith(PASTA_ENTRADA + "/"):
+            privado = os.path.join(self.pasta_entrada, chave[len(PASTA_ENTRADA) + 1:])
+            # Entrada gravada em static/ antes da mudança ainda é lida e apagada de lá
+            antigo = os.path.join(self.raiz, chave)
+            if not os.path.exists(privado) and os.path.exists(antigo):
+                return antigo
+            return privado
+        return os.path.join(self.raiz, chave)
+
+    def _pastas(self, prefixo):
+        """(pasta, raiz, prefixo da chave) a percorrer para listar `prefixo`."""
+        pastas = [(os.path.join(self.raiz, prefixo), self.raiz, "")]
+        if self.pasta_entrada:
+            if prefixo.startswith(PASTA_ENTRADA + "/"):
+                resto = prefixo[len(PASTA_ENTRADA) + 1:]
+                pastas.append((os.path.join(self.pasta_entrada, resto), self.pasta_entrada, PASTA_ENTRADA + "/"))
+            elif PASTA_ENTRADA.startswith(prefixo):
+                pastas.append((self.pasta_entrada, self.pasta_entrada, PASTA_ENTRADA + "/"))
+        return pastas
+
+    def existe(self, chave):
+        return os.path.isfile(self._caminho(chave))
+
+    def info(self, chave):
+        """(tamanho, mtime) ou None."""
+        try:
+            st = os.stat(self._caminho(chave))
+        except FileNotFoundError:
+            return None
+        return st.st_size, st.st_mtime
+
+    def publicar(self, temporario, chave):
+        """Move um arquivo local (temporário) para a chave."""
+        destino = self._caminho(chave)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        try:
+            os.replace(temporario, destino)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            # Temporários em outro disco: copia ao lado do destino e renomeia (nunca meio arquivo)
+            vizinho = f"{destino}.{generate_uuid()}.tmp"
+            shutil.copyfile(temporario, vizinho)
+            os.replace(vizinho, destino)
+            os.remove(temporario)
+
+    def abrir(self, chave):
+        return open(self._caminho(chave), "rb")
+
+    def remover(self, chave):
+        try:
+            os.remove(self._caminho(chave))
+        except FileNotFoundError:
+            pass
+
+    def quarentena(self, chave, rotulo):
+        destino = os.path.join(self.pasta_quarentena, rotulo, chave)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        try:
+            shutil.move(self._caminho(chave), destino)
+        except FileNotFoundError:
+            pass
+        return destino
+
+    def listar(self, prefixo):
+        """(chave, tamanho, mtime) de tudo sob o prefixo, sem montar a lista inteira."""
+        for pasta, raiz, antes in self._pastas(prefixo):
+            for entrada in _percorrer(pasta):
+                try:
+                    st = entrada.stat()
+                except FileNotFoundError:
+                    continue
+                chave = antes + os.path.relpath(entrada.path, raiz).replace(os.sep, "/")
+                yield chave, st.st_size, st.st_mtime
+
+    def url(self, chave):
+        return url_for("static", filename=chave)
+
+    def url_envio(self, chave, limite):
+        return None
+
+    def marca_cache(self):
+        return ""
+
+class ArmazenamentoS3:
+    """Bucket S3 (ou compatível, via endpoint). Credenciais pelo padrão do boto3 (AWS_*)."""
+
+    def __init__(self, bucket, endpoint=None, regiao=None, url_publica=None,
+                 expira=3600, envio_direto=True, prefixo_quarentena="quarentena"):
+        if boto3 is None:
+            raise RuntimeError("ARMAZENAMENTO=s3 exige o pacote boto3.")
+        self.bucket = bucket
+        self.cliente = boto3.client(
+            "s3", endpoint_url=endpoint or None, region_name=regiao or None,
+            config=ConfigBoto(signature_version="s3v4", s3={"addressing_style": "path" if endpoint else "auto"}),
+        )
+        self.url_publica = (url_publica or "").rstrip("/")
+        self.expira = expira
+        self.envio_direto = envio_direto
+        self.prefixo_quarentena = prefixo_quarentena
+
+    def _head(self, chave):
+        try:
+            return self.cliente.head_object(Bucket=self.bucket, Key=chave)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def existe(self, chave):
+        return self._head(chave) is not None
+
+    def info(self, chave):
+        cab = self._head(chave)
+        if cab is None:
+            return None
+        return cab["ContentLength"], cab["LastModified"].timestamp()
+
+    def publicar(self, temporario, chave):
+        tipo = mimetypes.guess_type(chave)[0] or "application/octet-stream"
+        self.cliente.upload_file(
+            temporario, self.bucket, chave,
+            ExtraArgs={"ContentType": tipo, "CacheControl": "public, max-age=31536000, immutable"},
+        )
+        os.remove(temporario)
+
+    def abrir(self, chave):
+        try:
+            return self.cliente.get_object(Bucket=self.bucket, Key=chave)["Body"]
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                raise FileNotFoundError(chave) from e
+            raise
+
+    def remover(self, chave):
+        self.cliente.delete_object(Bucket=self.bucket, Key=chave)
+
+    def quarentena(self, chave, rotulo):
+        destino = f"{self.prefixo_quarentena}/{rotulo}/{chave}"
+        try:
+            self.cliente.copy_object(Bucket=self.bucket, Key=destino, CopySource={"Bucket": self.bucket, "Key": chave})
+        except ClientError:
+            return None
+        self.remover(chave)
+        return destino
+
+    def listar(self, prefixo):
+        paginas = self.cliente.get_paginator("list_objects_v2").paginate(Bucket=self.bucket, Prefix=prefixo)
+        for pagina in paginas:
+            for obj in pagina.get("Contents", ()):
+                yield obj["Key"], obj["Size"], obj["LastModified"].timestamp()
+
+    def url(self, chave):
+        if self.url_publica:
+            return f"{self.url_publica}/{chave}"
+        return self.cliente.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": chave}, ExpiresIn=self.expira
+        )
+
+    def url_envio(self, chave, limite):
+        """POST pré-assinado para o navegador mandar o arquivo direto ao bucket."""
+        if not self.envio_direto:
+            return None
+        post = self.cliente.generate_presigned_post(
+            self.bucket, chave,
+            Conditions=[["content-length-range", 1, limite]],
+            ExpiresIn=min(self.expira, 900),
+        )
+        return {"url": post["url"], "campos": post["fields"], "chave": chave}
+
+    def marca_cache(self):
+        """Muda a cada meia validade: HTML em cache (ETag) nunca tem URL assinada vencida."""
+        if self.url_publica:
+            return ""
+        return str(int(time.time() // max(self.expira // 2, 1)))
+
+# --- Flask ---
+
+def atual():
+    return current_app.extensions["armazenamento"]
+
+def upload_url(chave):
+    """URL pública de um upload (avatar/foto) no backend configurado."""
+    return atual().url(chave) if chave else ""
+
+def preparar_envio(membro_id, limite):
+    """Dados do envio direto (url, campos, chave) ou {"url": None} se o backend não suporta."""
+    chave = f"{PASTA_ENTRADA}/{membro_id}/{generate_uuid()}"
+    return atual().url_envio(chave, limite) or {"url": None}
+
+def configurar_armazenamento(app):
+    cfg = app.config
+    if cfg["ARMAZENAMENTO"] == "s3":
+        backend = ArmazenamentoS3(
+            bucket=cfg["ARMAZENAMENTO_S3_BUCKET"],
+            endpoint=cfg["ARMAZENAMENTO_S3_ENDPOINT"],
+            regiao=cfg["ARMAZENAMENTO_S3_REGIAO"],
+            url_publica=cfg["ARMAZENAMENTO_S3_URL_PUBLICA"],
+            expira=cfg["ARMAZENAMENTO_URL_EXPIRA"],
+            envio_direto=cfg["ARMAZENAMENTO_ENVIO_DIRETO"],
+        )
+    else:
+        backend = ArmazenamentoLocal(app.static_folder, cfg["UPLOAD_QUARENTENA"], cfg["UPLOAD_ENTRADA"])
+    app.extensions["armazenamento"] = backend
+    app.jinja_env.globals["upload_url"] = upload_url
+    app.jinja_env.globals["envio_direto"] = backend.envio_direto
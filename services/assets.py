@@ -0,0 +1,263 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import click
+from flask import current_app, request, send_from_directory, url_for, abort
+
+try:
+    import brotli
+except ImportError:  # opcional: sem ele só saem os .gz
+    brotli = None
+
+# ==========================================================
+# ASSETS ESTÁTICOS (CSS/JS com hash no nome + pré-comprimidos)
+# ==========================================================
+# `flask build-assets` (e o create_app, se ASSETS_BUILD_AO_INICIAR) junta os
+# CSS/JS de cada página, minifica, grava em static/dist/ com o hash do
+# conteúdo no nome e deixa ao lado as versões .gz/.br. O manifest.json liga
+# o nome lógico ("css/home_parent.css") ao arquivo gerado.
+# Nos templates: {{ asset_url('css/home_parent.css') }} no lugar de
+# url_for('static', filename=...). O arquivo com hash nunca muda, então sai
+# com "Cache-Control: immutable" e o navegador não pergunta de novo; um
+# deploy que altera o CSS gera outro nome. Sem manifest (build não rodou), o
+# helper cai no url_for('static') normal.
+
+PASTA_DIST = "dist"
+MANIFEST = "manifest.json"
+UM_ANO = 365 * 24 * 3600
+
+# Páginas que usam mais de um arquivo viram um pacote só (a ordem é a do <head>)
+PACOTES = {
+    "pacotes/child_rewards.css": ["css/home_child.css", "css/rewards_child.css"],
+    "pacotes/child_detail.css": ["css/profile_parent.css", "css/child_detail.css"],
+    "pacotes/register.css": ["css/mobile.css", "css/register.css"],
+    "pacotes/child_tasks.js": ["js/flash_me.js", "js/envio_direto.js", "js/task_toggle.js"],
+    "pacotes/parent_tasks.js": ["js/flash_me.js", "js/parent_time_converter.js", "js/batch_select.js"],
+}
+
+_manifest = {}
+
+# --- Minificação (conservadora: strings, url(...), template literals e regex do JS saem intactos) ---
+
+# Trechos do CSS que não podem ser mexidos (strings e url() sem aspas) e comentários
+_CSS_TRECHOS = re.compile(r'"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'|url\(\s*[^)"\'\s]*\s*\)|/\*.*?\*/', re.S)
+
+def _css_solto(texto):
+    texto = re.sub(r"\s+", " ", texto)
+    texto = re.sub(r"\s*([{};,>])\s*", r"\1", texto)
+    texto = re.sub(r":\s+", ":", texto)
+    return texto.replace(";}", "}")
+
+def minificar_css(texto):
+    partes, solto, pos = [], [], 0
+    for m in _CSS_TRECHOS.finditer(texto):
+        solto.append(texto[pos:m.start()])
+        pos = m.end()
+        if m.group().startswith("/*"):
+            solto.append(" ")
+        else:
+            partes.extend((_css_solto("".join(solto)), m.group()))
+            solto = []
+    solto.append(texto[pos:])
+    partes.append(_css_solto("".join(solto)))
+    return "".join(partes).strip()
+
+# Depois destes (ou de uma destas palavras), "/" abre regex; senão é divisão
+_ANTES_DE_REGEX = set("(,=:[!&|?{};+-*%<>~^")
+_PALAVRAS_REGEX = {"return", "typeof", "case", "do", "else", "in", "of", "new", "delete", "void", "throw", "yield", "await"}
+
+def _ate_fechar(texto, i, fim):
+    """Índice logo depois do `fim` que fecha a string/regex aberta em i (respeita escapes)."""
+    j, classe = i + 1, False
+    while j < len(texto) and texto[j] != "\n":
+        c = texto[j]
+        if c == "\\":
+            j += 2
+            continue
+        if fim == "/" and c in "[]":
+            classe = c == "["
+        elif c == fim and not classe:
+            return j + 1
+        j += 1
+    return j
+
+def _template(texto, i, chaves):
+    """Copia um pedaço de template literal a partir de i (` ou o } de um ${}) até ` ou ${."""
+    j = i + 1
+    while j < len(texto):
+        if texto[j] == "\\":
+            j += 2
+            continue
+        if texto[j] == "`":
+            return j + 1
+        if texto.startswith("${", j):
+            chaves.append(0)
+            return j + 2
+        j += 1
+    return j
+
+def minificar_js(texto):
+    """Tira comentários e indentação; quebras de linha ficam (ASI)."""
+    saida = []
+    chaves = [0]          # { } abertas dentro de cada ${ } de template
+    anterior = palavra = ""
+    i, n = 0, len(texto)
+
+    def espaco(s):
+        if not saida or saida[-1] == "\n":
+            return
+        if saida[-1] == " ":
+            saida[-1] = s if s == "\n" else " "
+        else:
+            saida.append(s)
+
+    while i < n:
+        c = texto[i]
+        if c in "'\"":
+            j = _ate_fechar(texto, i, c)
+        elif c == "`" or (c == "}" and len(chaves) > 1 and chaves[-1] == 0):
+            if c == "}":
+                chaves.pop()
+            j = _template(texto, i, chaves)
+        elif texto.startswith("//", i):
+            fim = texto.find("\n", i)
+            i = n if fim < 0 else fim
+            continue
+        elif texto.startswith("/*", i):
+            fim = texto.find("*/", i + 2)
+            fim = n if fim < 0 else fim + 2
+            espaco("\n" if "\n" in texto[i:fim] else " ")
+            i = fim
+            continue
+        elif c == "/" and (not anterior or anterior in _ANTES_DE_REGEX or palavra in _PALAVRAS_REGEX):
+            j = _ate_fechar(texto, i, "/")
+            while j < n and texto[j].isalpha():
+                j += 1   # flags
+        elif c.isspace():
+            j = i
+            while j < n and texto[j].isspace():
+                j += 1
+            espaco("\n" if "\n" in texto[i:j] else " ")
+            i = j
+            continue
+        else:
+            if c == "{":
+                chaves[-1] += 1
+            elif c == "}":
+                chaves[-1] -= 1
+            palavra = palavra + c if (c.isalnum() or c in "_$") else ""
+            anterior = c
+            saida.append(c)
+            i += 1
+            continue
+        saida.append(texto[i:j])
+        anterior, palavra = "a", ""   # literal: depois dele "/" é divisão
+        i = j
+    return "".join(saida).strip()
+
+# --- Build ---
+
+def _gravar(caminho, dados):
+    """Escrita atômica: vários workers podem rodar o build ao mesmo tempo."""
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, "wb") as f:
+        f.write(dados)
+    os.replace(temporario, caminho)
+
+def _fontes(pasta_static):
+    """Nome lógico -> arquivos de origem: cada CSS/JS solto + os pacotes."""
+    fontes = {}
+    for sub in ("css", "js"):
+        pasta = os.path.join(pasta_static, sub)
+        if os.path.isdir(pasta):
+            for nome in sorted(os.listdir(pasta)):
+                if nome.endswith((".css", ".js")):
+                    fontes[f"{sub}/{nome}"] = [f"{sub}/{nome}"]
+    fontes.update(PACOTES)
+    return fontes
+
+def construir(pasta_static):
+    """Gera static/dist e o manifest. Retorna o manifest."""
+    destino = os.path.join(pasta_static, PASTA_DIST)
+    manifest = {}
+    for logico, arquivos in _fontes(pasta_static).items():
+        partes = []
+        for arquivo in dict.fromkeys(arquivos):
+            with open(os.path.join(pasta_static, arquivo), encoding="utf-8") as f:
+                partes.append(f.read())
+        if logico.endswith(".css"):
+            conteudo = minificar_css("\n".join(partes))
+        else:
+            conteudo = ";\n".join(minificar_js(p) for p in partes)
+        dados = conteudo.encode("utf-8")
+
+        raiz, ext = os.path.splitext(logico)
+        gerado = f"{raiz}.{hashlib.sha256(dados).hexdigest()[:12]}{ext}"
+        caminho = os.path.join(destino, gerado)
+        manifest[logico] = gerado
+        if os.path.exists(caminho):
+            continue  # mesmo conteúdo, mesmo nome: já está pronto
+        _gravar(caminho + ".gz", gzip.compress(dados, compresslevel=9, mtime=0))
+        if brotli is not None:
+            _gravar(caminho + ".br", brotli.compress(dados, quality=11))
+        _gravar(caminho, dados)
+
+    _gravar(os.path.join(destino, MANIFEST), json.dumps(manifest, indent=1, sort_keys=True).encode())
+    return manifest
+
+def carregar_manifest(pasta_static):
+    try:
+        with open(os.path.join(pasta_static, PASTA_DIST, MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+# --- Flask ---
+
+def asset_url(filename):
+    """Como url_for('static', filename=...), mas aponta para a versão com hash quando existe."""
+    gerado = _manifest.get(filename)
+    if gerado:
+        return url_for("assets", nome=gerado)
+    return url_for("static", filename=filename)
+
+def servir_asset(nome):
+    """Arquivo de static/dist, pré-comprimido conforme o Accept-Encoding e imutável."""
+    if nome == MANIFEST:
+        abort(404)
+    pasta = os.path.join(current_app.static_folder, PASTA_DIST)
+    tipo = mimetypes.guess_type(nome)[0]
+
+    resposta = None
+    for codificacao, ext in (("br", ".br"), ("gzip", ".gz")):
+        if request.accept_encodings[codificacao] and os.path.isfile(os.path.join(pasta, nome + ext)):
+            resposta = send_from_directory(pasta, nome + ext, mimetype=tipo, max_age=UM_ANO)
+            resposta.headers["Content-Encoding"] = codificacao
+            break
+    if resposta is None:
+        resposta = send_from_directory(pasta, nome, mimetype=tipo, max_age=UM_ANO)
+
+    resposta.vary.add("Accept-Encoding")
+    resposta.cache_control.public = True
+    resposta.cache_control.immutable = True
+    return resposta
+
+def configurar_assets(app):
+    global _manifest
+    if app.config.get("ASSETS_BUILD_AO_INICIAR"):
+        _manifest = construir(app.static_folder)
+    else:
+        _manifest = carregar_manifest(app.static_folder)
+    app.add_url_rule("/assets/<path:nome>", "assets", servir_asset)
+    app.jinja_env.globals["asset_url"] = asset_url
+
+@click.command("build-assets")
+def build_assets_command():
+    """Gera static/dist (CSS/JS minificados, com hash, .gz/.br) e o manifest."""
+    global _manifest
+    _manifest = construir(current_app.static_folder)
+    click.echo(f"{len(_manifest)} asset(s) em static/{PASTA_DIST}/" + ("" if brotli else " (sem .br: instale Brotli)"))
@@ -0,0 +1,145 @@
+from datetime import datetime
+from sqlalchemy.orm import joinedload
+from extensions import db
+from models.models import (
+    Tarefa, TaskStatus, Submissao, SubmissionStatus,
+    Carteira, TransactionType, Progresso, generate_uuid
+)
+from services import extrato, resumo_familia, notificacoes, streak
+
+# ==========================================================
+# AVALIAÇÃO DE SUBMISSÕES (aprovar / rejeitar)
+# ==========================================================
+# Usado pelas rotas de uma submissão e pela rota em lote. Tudo entra na
+# transação do chamador (nenhum commit aqui): no lote, cada filho recebe um
+# único UPDATE de carteira com a soma, as Transacoes e Notificacoes vão em
+# INSERTs em lote, e o resumo da família é ajustado uma vez.
+
+APROVAR = "aprovar"
+REJEITAR = "rejeitar"
+ACOES = (APROVAR, REJEITAR)
+
+# De onde cada ação pode partir: PENDING, mais a reavaliação que as rotas
+# sempre permitiram (aprovar uma rejeitada, rejeitar uma aprovada). PROCESSING
+# ainda não tem foto liberada; NEEDS_REVISION espera outra foto do filho.
+AVALIAVEIS = {
+    APROVAR: (SubmissionStatus.PENDING, SubmissionStatus.REJECTED),
+    REJEITAR: (SubmissionStatus.PENDING, SubmissionStatus.APPROVED, SubmissionStatus.NEEDS_REVISION),
+}
+
+XP_POR_TAREFA = 100
+XP_POR_NIVEL = 1000
+
+def _resultado(submissao_id, codigo, mensagem):
+    return {"id": submissao_id, "ok": codigo == "ok", "codigo": codigo, "mensagem": mensagem}
+
+def avaliar(pai, submissao_ids, acao):
+    """
+    Aplica `acao` às submissões informadas (não faz commit).
+    Retorna um resultado por id, na ordem recebida: codigo "ok", "inexistente",
+    "negado" (outra família), "repetida" (já estava no estado pedido),
+    "processando" (foto ainda no worker) ou "indisponivel" (outro estado).
+    """
+    ids = list(dict.fromkeys(i for i in submissao_ids if i))
+    encontradas = {
+        s.id: s for s in Submissao.query.options(
+            joinedload(Submissao.tarefa).joinedload(Tarefa.executor)
+        ).filter(Submissao.id.in_(ids))
+    } if ids else {}
+
+    estado_final = SubmissionStatus.APPROVED if acao == APROVAR else SubmissionStatus.REJECTED
+    ja_feita = "Esta tarefa já foi aprovada." if acao == APROVAR else "Esta tarefa já foi rejeitada."
+
+    resultados, aceitas = [], []
+    for submissao_id in ids:
+        submissao = encontradas.get(submissao_id)
+        executor = submissao.tarefa.executor if submissao else None
+        if not submissao:
+            resultados.append(_resultado(submissao_id, "inexistente", "Submissão não encontrada."))
+        elif not executor or executor.familia_id != pai.familia_id:
+            resultados.append(_resultado(submissao_id, "negado", "Permissão negada."))
+        elif submissao.status == estado_final:
+            resultados.append(_resultado(submissao_id, "repetida", ja_feita))
+        elif submissao.status == SubmissionStatus.PROCESSING:
+            resultados.append(_resultado(submissao_id, "processando", "A foto desta tarefa ainda está sendo processada."))
+        elif submissao.status not in AVALIAVEIS[acao]:
+            resultados.append(_resultado(submissao_id, "indisponivel", "Esta submissão não pode ser avaliada agora."))
+        else:
+            aceitas.append(submissao)
+            resultados.append(_resultado(submissao_id, "ok", submissao.tarefa.titulo))
+
+    if aceitas:
+        if acao == APROVAR:
+            _aprovar(pai, aceitas)
+        else:
+            _rejeitar(pai, aceitas)
+    return resultados
+
+def _pendentes(submissoes, acao):
+    """Quantas saem de 'para avaliar' no resumo. Só PENDING conta lá; a
+    reavaliação parte de um estado que já tinha saído do contador."""
+    assert all(s.status in AVALIAVEIS[acao] for s in submissoes), "avaliar só repassa estados avaliáveis"
+    return sum(1 for s in submissoes if s.status == SubmissionStatus.PENDING)
+
+def _aprovar(pai, submissoes):
+    agora = datetime.utcnow()
+    tz = streak.fuso(pai.familia.fusoHorario)
+    pendentes = _pendentes(submissoes, APROVAR)
+
+    por_filho = {}
+    for submissao in submissoes:
+        submissao.status = SubmissionStatus.APPROVED
+        submissao.aprovadaEm = agora
+        submissao.valorAprovado = submissao.tarefa.valorBase
+        por_filho.setdefault(submissao.tarefa.executor, []).append(submissao)
+
+    # Depois de mudar os status: se o resumo ainda não existe, o recálculo já os vê
+    resumo_familia.ajustar(pai.familia_id, pendentes=-pendentes)
+
+    avisos = []
+    for filho, lista in por_filho.items():
+        if not filho.carteira:
+            filho.carteira = Carteira(id=generate_uuid(), membro_id=filho.id, saldo=0)
+            db.session.add(filho.carteira)
+        extrato.lancar_lote(filho.carteira, TransactionType.CREDIT_TASK, [
+            (s.tarefa.valorBase, f"Pagamento da tarefa: {s.tarefa.titulo}") for s in lista
+        ])
+        _dar_xp(filho, XP_POR_TAREFA * len(lista), agora, tz)
+        avisos.extend(
+            (filho.usuario_id, "TAREFA_APROVADA",
+             f"Tarefa '{s.tarefa.titulo}' aprovada! +R${s.tarefa.valorBase} e +{XP_POR_TAREFA} XP")
+            for s in lista
+        )
+    notificacoes.notificar_usuarios(avisos)
+
+def _dar_xp(filho, xp, momento, tz):
+    filho.saldoXP = (filho.saldoXP or 0) + xp
+
+    if not filho.progresso:
+        filho.progresso = Progresso(membro_id=filho.id)
+        db.session.add(filho.progresso)
+
+    progresso = filho.progresso
+    progresso.xp_total = (progresso.xp_total or 0) + xp
+    progresso.xp = (progresso.xp or 0) + xp
+    progresso.ultimaTarefaEm = momento
+    streak.registrar_atividade(progresso, momento, tz)
+
+    while progresso.xp >= XP_POR_NIVEL:
+        progresso.nivel = (progresso.nivel or 1) + 1
+        progresso.xp -= XP_POR_NIVEL
+
+def _rejeitar(pai, submissoes):
+    pendentes = _pendentes(submissoes, REJEITAR)
+    ativas = sum(1 for s in submissoes if s.tarefa.status in TaskStatus.ABERTAS)
+
+    for submissao in submissoes:
+        submissao.status = SubmissionStatus.REJECTED
+        submissao.tarefa.status = TaskStatus.INATIVA
+
+    resumo_familia.ajustar(pai.familia_id, pendentes=-pendentes, ativas=-ativas)
+    notificacoes.notificar_usuarios([
+        (s.tarefa.executor.usuario_id, "TAREFA_REJEITADA",
+         f"Sua submissão de '{s.tarefa.titulo}' foi rejeitada pelo responsável.")
+        for s in submissoes
+    ])
@@ -0,0 +1,267 @@
+import hashlib
+import mimetypes
+import os
+import click
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import select, insert, update, delete
+from sqlalchemy.dialects import postgresql, sqlite
+from extensions import db
+from models.models import Blob, ReferenciaBlob, Submissao, Usuario, generate_uuid
+from services import armazenamento
+
+# ==========================================================
+# ARMAZENAMENTO DE UPLOADS POR CONTEÚDO (SHA-256)
+# ==========================================================
+# Todo upload vira um blob de chave uploads/blobs/ab/cd/<sha256>.<ext> no
+# armazenamento configurado (services/armazenamento.py: disco ou S3).
+# O arquivo chega em blocos fixos num temporário local (UPLOAD_TEMPORARIOS, fora
+# de static/) (memória do worker constante, qualquer que seja o tamanho); no caminho são
+# conferidos o limite de bytes do endpoint e os magic bytes do formato, e é
+# calculado o SHA-256. A publicação no armazenamento só acontece depois
+# do commit do banco (Lote.publicar): se o commit falha, os temporários somem
+# e nada fica pela metade no destino.
+# O mesmo conteúdo enviado de novo custa zero em disco: só ganha mais uma
+# linha em referencia_blob. Derivados (miniaturas) ficam ao lado do blob:
+# <sha256>_<sufixo>.<ext>. Nenhuma função daqui faz commit.
+
+PASTA = "uploads/blobs"  # relativa a static/
+BLOCO = 64 * 1024
+
+SUBMISSAO = "submissao"
+AVATAR = "avatar"
+
+# Assinaturas aceitas (o nome/Content-Type do navegador não contam)
+IMAGENS = ("jpg", "png", "gif", "webp")
+
+class UploadInvalido(ValueError):
+    """Upload recusado: grande demais, vazio ou de um tipo não aceito."""
+
+def farejar(cabeca):
+    """Extensão pelo conteúdo (magic bytes) ou None."""
+    if cabeca.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if cabeca.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if cabeca[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if cabeca[:4] == b"RIFF" and cabeca[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+def caminho_relativo(sha, ext, sufixo=""):
+    return f"{PASTA}/{sha[:2]}/{sha[2:4]}/{sha}{sufixo}.{ext}"
+
+def _absoluto(relativo):
+    """Caminho no disco local (temporários e uploads antigos), qualquer que seja o backend."""
+    return os.path.join(current_app.static_folder, relativo)
+
+def _temporario():
+    pasta = current_app.config["UPLOAD_TEMPORARIOS"]
+    os.makedirs(pasta, exist_ok=True)
+    return os.path.join(pasta, f"{generate_uuid()}.part")
+
+def _remover(caminho):
+    try:
+        os.remove(caminho)
+    except FileNotFoundError:
+        pass
+
+class Recebido:
+    """Upload já copiado para um temporário: caminho, hash, tamanho e extensão farejada."""
+    def __init__(self, temporario, sha256, tamanho, ext):
+        self.temporario = temporario
+        self.sha256 = sha256
+        self.tamanho = tamanho
+        self.ext = ext
+
+    def descartar(self):
+        _remover(self.temporario)
+
+def receber(fluxo, limite, extensoes=IMAGENS):
+    """Copia o upload em blocos para um temporário (hash + limite + magic bytes). Levanta UploadInvalido."""
+    temporario = _temporario()
+    h = hashlib.sha256()
+    tamanho = 0
+    ext = None
+    try:
+        with open(temporario, "wb") as saida:
+            for bloco in iter(lambda: fluxo.read(BLOCO), b""):
+                if ext is None:
+                    ext = farejar(bloco[:16])
+                    if ext not in extensoes:
+                        raise UploadInvalido("Formato de arquivo não suportado.")
+                tamanho += len(bloco)
+                if tamanho > limite:
+                    raise UploadInvalido(f"Arquivo maior que {limite // (1024 * 1024)} MB.")
+                h.update(bloco)
+                saida.write(bloco)
+        if tamanho == 0:
+            raise UploadInvalido("Arquivo vazio.")
+    except BaseException:
+        _remover(temporario)
+        raise
+    return Recebido(temporario, h.hexdigest(), tamanho, ext)
+
+def _registrar(sha, relativo, tamanho, ext, origem=None):
+    """Linha do blob (INSERT ... ON CONFLICT DO NOTHING: dois envios iguais ao mesmo tempo)."""
+    linha = dict(
+        sha256=sha, caminho=relativo, tamanho=tamanho,
+        tipo=mimetypes.guess_type(f"x.{ext}")[0], origemSha256=origem,
+        criadoEm=datetime.utcnow(),
+    )
+    dialeto = db.session.get_bind().dialect.name
+    if dialeto in ("postgresql", "sqlite"):
+        modulo = postgresql if dialeto == "postgresql" else sqlite
+        db.session.execute(modulo.insert(Blob).values(**linha).on_conflict_do_nothing())
+    elif db.session.get(Blob, sha) is None:
+        db.session.execute(insert(Blob).values(**linha))
+    return db.session.get(Blob, sha)
+
+class Lote:
+    """
+    Arquivos de uma transação. Use em volta do trabalho + commit:
+
+        with blobs.Lote() as lote:
+            blob = blobs.guardar(lote, recebido)
+            ...
+            db.session.commit()
+
+    Saiu sem exceção: os temporários vão para o destino. Com exceção: são apagados.
+    """
+    def __init__(self):
+        self.pendentes = []  # (temporario, relativo)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, rastro):
+        if tipo is None:
+            self.publicar()
+        else:
+            self.descartar()
+        return False
+
+    def adicionar(self, temporario, relativo):
+        self.pendentes.append((temporario, relativo))
+
+    def publicar(self):
+        backend = armazenamento.atual()
+        for temporario, relativo in self.pendentes:
+            if backend.existe(relativo):
+                _remover(temporario)  # mesmo conteúdo já guardado
+                continue
+            backend.publicar(temporario, relativo)
+        self.pendentes = []
+
+    def descartar(self):
+        for temporario, _ in self.pendentes:
+            _remover(temporario)
+        self.pendentes = []
+
+def _gravar_temporario(dados):
+    temporario = _temporario()
+    with open(temporario, "wb") as saida:
+        saida.write(dados)
+    return temporario
+
+def guardar(lote, recebido, origem=None):
+    """Blob de um upload recebido (o temporário passa para o lote). Retorna o Blob."""
+    relativo = caminho_relativo(recebido.sha256, recebido.ext)
+    lote.adicionar(recebido.temporario, relativo)
+    return _registrar(recebido.sha256, relativo, recebido.tamanho, recebido.ext, origem)
+
+def guardar_bytes(lote, dados, ext, origem=None):
+    """Blob de bytes já em memória (ex.: foto normalizada). Retorna o Blob."""
+    sha = hashlib.sha256(dados).hexdigest()
+    relativo = caminho_relativo(sha, ext)
+    lote.adicionar(_gravar_temporario(dados), relativo)
+    return _registrar(sha, relativo, len(dados), ext, origem)
+
+def guardar_derivado(lote, blob, sufixo, dados):
+    """Arquivo derivado de um blob (miniatura), ao lado dele: <sha><sufixo>.<ext>."""
+    ext = blob.caminho.rsplit(".", 1)[-1]
+    relativo = caminho_relativo(blob.sha256, ext, sufixo)
+    lote.adicionar(_gravar_temporario(dados), relativo)
+    return relativo
+
+def por_origem(sha_bruto):
+    """Blob já gerado a partir deste mesmo upload bruto (e ainda presente em disco)."""
+    blob = db.session.scalar(select(Blob).where(Blob.origemSha256 == sha_bruto).limit(1))
+    if blob and armazenamento.atual().existe(blob.caminho):
+        return blob
+    return None
+
+def referenciar(blob, dono_tipo, dono_id):
+    """Aponta o dono (submissão/avatar) para o blob, trocando a referência anterior."""
+    atualizadas = db.session.execute(
+        update(ReferenciaBlob)
+        .where(ReferenciaBlob.donoTipo == dono_tipo, ReferenciaBlob.dono_id == dono_id)
+        .values(blob_sha256=blob.sha256, criadoEm=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not atualizadas:
+        db.session.add(ReferenciaBlob(blob_sha256=blob.sha256, donoTipo=dono_tipo, dono_id=dono_id))
+
+def desreferenciar(dono_tipo, dono_id):
+    db.session.execute(
+        delete(ReferenciaBlob)
+        .where(ReferenciaBlob.donoTipo == dono_tipo, ReferenciaBlob.dono_id == dono_id)
+        .execution_options(synchronize_session=False)
+    )
+
+# ==========================================================
+# CLI: uploads antigos -> blobs
+# ==========================================================
+
+def _legado(caminho):
+    """Caminho relativo a static/ de um fotoUrl/avatarUrl antigo (avatar antigo: só o nome)."""
+    return caminho if "/" in caminho else f"uploads/{caminho}"
+
+def _migrar(modelo, coluna, dono_tipo, apagar):
+    coluna_attr = getattr(modelo, coluna)
+    linhas = db.session.execute(
+        select(modelo.id, coluna_attr).where(coluna_attr.isnot(None), ~coluna_attr.startswith(PASTA + "/"))
+    ).all()
+    movidos, faltando, antigos = 0, 0, set()
+    lote = Lote()
+    for dono_id, caminho in linhas:
+        origem = _absoluto(_legado(caminho))
+        if not os.path.isfile(origem):
+            faltando += 1
+            continue
+        try:
+            with open(origem, "rb") as f:
+                recebido = receber(f, float("inf"), extensoes=IMAGENS)
+        except UploadInvalido:
+            faltando += 1
+            continue
+        blob = guardar(lote, recebido)
+        db.session.execute(
+            update(modelo).where(modelo.id == dono_id).values({coluna: blob.caminho})
+            .execution_options(synchronize_session=False)
+        )
+        referenciar(blob, dono_tipo, dono_id)
+        antigos.add(origem)
+        movidos += 1
+    with lote:
+        db.session.commit()
+    if apagar:
+        for origem in antigos:
+            os.remove(origem)
+    return movidos, faltando
+
+@click.command("migrar-uploads")
+@click.option("--apagar-antigos", is_flag=True, help="Apaga os arquivos antigos depois de migrados.")
+def migrar_uploads_command(apagar_antigos):
+    """Move fotos de submissão e avatares antigos para o armazenamento por conteúdo."""
+    for rotulo, modelo, coluna, dono_tipo in (
+        ("fotos", Submissao, "fotoUrl", SUBMISSAO),
+        ("avatares", Usuario, "avatarUrl", AVATAR),
+    ):
+        movidos, faltando = _migrar(modelo, coluna, dono_tipo, apagar_antigos)
+        click.echo(f"{rotulo}: {movidos} migrado(s), {faltando} sem arquivo no disco (ou não é imagem).")
+    n, total = db.session.execute(
+        select(db.func.count(Blob.sha256), db.func.coalesce(db.func.sum(Blob.tamanho), 0))
+    ).one()
+    click.echo(f"{n} blob(s) únicos, {total / 1024 / 1024:,.1f} MiB.")
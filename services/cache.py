@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import OrderedDict
+
+# ==========================================================
+# CACHE EM MEMÓRIA (LRU + TTL)
+# ==========================================================
+# Cache simples por processo: cada worker do gunicorn tem o seu. As rotas
+# que alteram os dados invalidam a chave no próprio processo; o TTL limita
+# por quanto tempo os outros workers podem servir a versão anterior.
+# Guarde só dados simples (dicts, tuplas), nunca objetos do SQLAlchemy.
+# O `carregar()` roda fora da trava: cada chave em carga tem uma geração, que
+# `invalidar`/`limpar` sobem; se ela mudou durante a carga, o valor (lido
+# antes da escrita que invalidou) é devolvido mas não fica guardado.
+
+class CacheLRU:
+    def __init__(self, maximo=1024, ttl=60.0):
+        self.maximo = maximo
+        self.ttl = ttl
+        self._itens = OrderedDict()   # chave -> (expira_em, valor)
+        self._trava = threading.Lock()
+        self._carregando = {}  # chave -> cargas em andamento
+        self._geracoes = {}    # chave -> geração (só enquanto há carga em andamento)
+        self.acertos = 0
+        self.faltas = 0
+
+    def obter(self, chave, carregar):
+        """Valor da chave; se ausente/expirado, chama `carregar()` e guarda o resultado."""
+        agora = time.monotonic()
+        with self._trava:
+            item = self._itens.get(chave)
+            if item and item[0] > agora:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return item[1]
+            self.faltas += 1
+            self._carregando[chave] = self._carregando.get(chave, 0) + 1
+            geracao = self._geracoes.get(chave, 0)
+
+        try:
+            valor = carregar()
+        except BaseException:
+            with self._trava:
+                self._fim_da_carga(chave)
+            raise
+
+        with self._trava:
+            if self._fim_da_carga(chave) == geracao:
+                self._itens[chave] = (agora + self.ttl, valor)
+                self._itens.move_to_end(chave)
+                while len(self._itens) > self.maximo:
+                    self._itens.popitem(last=False)
+        return valor
+
+    def _fim_da_carga(self, chave):
+        """Desconta uma carga da chave e devolve a geração atual (chamar com a trava)."""
+        geracao = self._geracoes.get(chave, 0)
+        restantes = self._carregando.pop(chave) - 1
+        if restantes:
+            self._carregando[chave] = restantes
+        else:
+            self._geracoes.pop(chave, None)
+        return geracao
+
+    def _nova_geracao(self, chave):
+        if chave in self._carregando:
+            self._geracoes[chave] = self._geracoes.get(chave, 0) + 1
+
+    def invalidar(self, chave):
+        with self._trava:
+            self._itens.pop(chave, None)
+            self._nova_geracao(chave)
+
+    def limpar(self):
+        with self._trava:
+            self._itens.clear()
+            for chave in self._carregando:
+                self._nova_geracao(chave)
+
+    def estatisticas(self):
+        return {"itens": len(self._itens), "acertos": self.acertos, "faltas": self.faltas}
@@ -0,0 +1,46 @@
+from sqlalchemy import select, exists
+from flask import current_app
+from extensions import db
+from models.models import Recompensa, ResgateRecompensa
+from services.cache import CacheLRU
+
+# ==========================================================
+# CATÁLOGO DE RECOMPENSAS (loja do filho / lista do pai)
+# ==========================================================
+# Uma recompensa some do catálogo quando alguém da família a resgata (em
+# qualquer status, como sempre foi). A disponibilidade é um anti-join (NOT
+# EXISTS em resgate_recompensa pelo índice de recompensa_id), em vez de
+# carregar os ids já resgatados e mandá-los de volta num NOT IN.
+# O resultado fica em cache por família; create/redeem invalidam.
+
+_cache = None
+
+def _cache_catalogo():
+    global _cache
+    if _cache is None:
+        cfg = current_app.config
+        _cache = CacheLRU(maximo=cfg["CATALOGO_CACHE_MAX"], ttl=cfg["CATALOGO_CACHE_TTL"])
+    return _cache
+
+def resgatada():
+    """Condição "existe um resgate desta recompensa" (correlacionada)."""
+    return exists().where(ResgateRecompensa.recompensa_id == Recompensa.id)
+
+def ja_resgatada(recompensa_id):
+    return db.session.scalar(
+        select(exists().where(ResgateRecompensa.recompensa_id == recompensa_id))
+    )
+
+def _carregar(familia_id):
+    linhas = db.session.execute(
+        select(Recompensa.id, Recompensa.titulo, Recompensa.descricao, Recompensa.custoXP, Recompensa.criadoEm)
+        .where(Recompensa.familia_id == familia_id, Recompensa.ativa.is_(True), ~resgatada())
+    ).all()
+    return tuple(dict(linha._mapping) for linha in linhas)
+
+def disponiveis(familia_id):
+    """Recompensas que a família ainda pode resgatar (dicts; o template usa item.titulo etc.)."""
+    return _cache_catalogo().obter(familia_id, lambda: _carregar(familia_id))
+
+def invalidar(familia_id):
+    _cache_catalogo().invalidar(familia_id)
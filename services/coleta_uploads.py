@@ -0,0 +1,215 @@
+import os
+import re
+import time
+import click
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import select, delete, exists
+from extensions import db
+from models.models import Blob, ReferenciaBlob, Submissao, Usuario
+from services import blobs, armazenamento
+
+# ==========================================================
+# COLETA DE UPLOADS ÓRFÃOS
+# ==========================================================
+# Roda fora das requisições (cron / `flask limpar-uploads --a-cada N`).
+# Troca de avatar e reenvio de foto deixam o arquivo anterior sem dono; a
+# coleta percorre os uploads do armazenamento (os.scandir no disco, listagem
+# paginada no S3; nunca a árvore toda na memória) e confere cada lote de
+# arquivos no banco:
+# 1. referencia_blob de submissão/usuário que não existe mais sai;
+# 2. blobs (e miniaturas) sem nenhuma referência: a linha do blob sai e o
+#    arquivo vai para a quarentena (ou é apagado);
+# 3. arquivos antigos fora do armazenamento por conteúdo (uploads de antes
+#    do `migrar-uploads`) que nenhum fotoUrl/avatarUrl aponta: idem;
+# 4. temporários .part de uploads interrompidos e uploads brutos em
+#    uploads/entrada/ que nenhuma submissão em PROCESSING nem avatar em
+#    processamento aponta (envio direto nunca confirmado): apagados.
+# Só entra arquivo com mtime mais velho que a carência (upload recém-publicado
+# cujo commit ainda não chegou). Um blob antigo reaproveitado é protegido pelo
+# banco, não pelo mtime: a linha do blob só sai num DELETE condicional (sem
+# referência) e o arquivo só sai se a linha continuar ausente depois do
+# commit. Quem reaproveita re-registra a linha e sempre leva o temporário no
+# lote, que republica o arquivo se ele tiver sumido nesse meio tempo.
+
+SUFIXO_DERIVADO = re.compile(r"_\d+(?=\.[^.]+$)")
+
+def _sha(chave):
+    """SHA-256 do blob de uma chave (a miniatura <sha>_320.jpg é do mesmo blob)."""
+    return chave.rsplit("/", 1)[-1][:64]
+
+class Relatorio:
+    def __init__(self):
+        self.examinados = 0
+        self.arquivos = 0
+        self.bytes = 0
+        self.blobs = 0
+        self.referencias = 0
+        self.temporarios = 0
+        self.lotes = 0
+
+class ColetaUploads:
+    def __init__(self, carencia_horas, modo="quarentena", lote=500, simular=False, agora=None):
+        self.corte = (agora or time.time()) - carencia_horas * 3600
+        self.modo = modo
+        self.lote = lote
+        self.simular = simular
+        self.backend = armazenamento.atual()
+        self.rotulo = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+        self.relatorio = Relatorio()
+
+    # --- comum ---
+
+    def _retirar(self, chave, tamanho):
+        self.relatorio.arquivos += 1
+        self.relatorio.bytes += tamanho
+        if self.simular:
+            return
+        info = self.backend.info(chave)
+        if info is None or info[1] >= self.corte:
+            return  # sumiu ou foi regravado depois da consulta
+        if self.modo == "quarentena":
+            self.backend.quarentena(chave, self.rotulo)
+        else:
+            self.backend.remover(chave)
+
+    def _lotes(self, prefixo, pular=()):
+        """Lotes de (chave, tamanho) mais velhos que a carência."""
+        lote = []
+        for chave, tamanho, mtime in self.backend.listar(prefixo):
+            if chave.startswith(pular):
+                continue
+            self.relatorio.examinados += 1
+            if mtime < self.corte:
+                lote.append((chave, tamanho))
+                if len(lote) >= self.lote:
+                    yield lote
+                    lote = []
+        if lote:
+            yield lote
+
+    # --- etapas ---
+
+    def referencias_mortas(self):
+        """Referências de submissões/usuários apagados (o blob fica livre para a coleta)."""
+        for dono_tipo, modelo in ((blobs.SUBMISSAO, Submissao), (blobs.AVATAR, Usuario)):
+            condicao = (
+                ReferenciaBlob.donoTipo == dono_tipo,
+                ~exists().where(modelo.id == ReferenciaBlob.dono_id),
+            )
+            if self.simular:
+                self.relatorio.referencias += db.session.scalar(
+                    select(db.func.count()).select_from(ReferenciaBlob).where(*condicao)
+                )
+            else:
+                self.relatorio.referencias += db.session.execute(
+                    delete(ReferenciaBlob).where(*condicao).execution_options(synchronize_session=False)
+                ).rowcount
+        if not self.simular:
+            db.session.commit()
+
+    def blobs_sem_dono(self):
+        for lote in self._lotes(blobs.PASTA + "/", pular=(blobs.PASTA + "/tmp/",)):
+            shas = {_sha(chave) for chave, _ in lote}
+            vivos = set(db.session.scalars(
+                select(ReferenciaBlob.blob_sha256).where(ReferenciaBlob.blob_sha256.in_(shas)).distinct()
+            ))
+            orfaos = shas - vivos
+            if orfaos and not self.simular:
+                # Confere de novo na mesma instrução: referência criada agora segura o blob
+                self.relatorio.blobs += db.session.execute(
+                    delete(Blob).where(
+                        Blob.sha256.in_(orfaos),
+                        ~exists().where(ReferenciaBlob.blob_sha256 == Blob.sha256),
+                    ).execution_options(synchronize_session=False)
+                ).rowcount
+                db.session.commit()
+                orfaos -= set(db.session.scalars(select(Blob.sha256).where(Blob.sha256.in_(orfaos))))
+            elif orfaos:
+                self.relatorio.blobs += len(orfaos)
+            for chave, tamanho in lote:
+                if _sha(chave) in orfaos:
+                    self._retirar(chave, tamanho)
+            self.relatorio.lotes += 1
+
+    def legados_sem_dono(self):
+        pular = (blobs.PASTA + "/", armazenamento.PASTA_ENTRADA + "/")
+        for lote in self._lotes("uploads/", pular=pular):
+            # Miniatura antiga (<nome>_320.jpg) vale enquanto o original tiver dono
+            candidatos = {chave: {chave, SUFIXO_DERIVADO.sub("", chave)} for chave, _ in lote}
+            todos = set().union(*candidatos.values())
+            vivos = set(db.session.scalars(select(Submissao.fotoUrl).where(Submissao.fotoUrl.in_(todos))))
+            vivos |= set(db.session.scalars(select(Usuario.avatarUrl).where(Usuario.avatarUrl.in_(todos))))
+            for chave, tamanho in lote:
+                if not candidatos[chave] & vivos:
+                    self._retirar(chave, tamanho)
+            self.relatorio.lotes += 1
+
+    def temporarios(self):
+        # .part ficam sempre no disco local (a pasta antiga, dentro de static/, ainda é varrida)
+        pastas = (
+            current_app.config["UPLOAD_TEMPORARIOS"],
+            os.path.join(current_app.static_folder, blobs.PASTA, "tmp"),
+        )
+        for pasta in pastas:
+            if not os.path.isdir(pasta):
+                continue
+            local = armazenamento.ArmazenamentoLocal(pasta, None)
+            for chave, tamanho, mtime in local.listar(""):
+                if mtime < self.corte:
+                    self._apagar_temporario(local, chave, tamanho)
+
+    def entradas(self):
+        """Uploads brutos (uploads/entrada/) que nenhuma submissão/avatar em processamento usa."""
+        for lote in self._lotes(armazenamento.PASTA_ENTRADA + "/"):
+            chaves = [chave for chave, _ in lote]
+            vivas = set(db.session.scalars(select(Submissao.fotoEntrada).where(Submissao.fotoEntrada.in_(chaves))))
+            vivas |= set(db.session.scalars(select(Usuario.avatarEntrada).where(Usuario.avatarEntrada.in_(chaves))))
+            for chave, tamanho in lote:
+                if chave not in vivas:
+                    self._apagar_temporario(self.backend, chave, tamanho)
+            self.relatorio.lotes += 1
+
+    def _apagar_temporario(self, fonte, chave, tamanho):
+        self.relatorio.temporarios += 1
+        self.relatorio.bytes += tamanho
+        if not self.simular:
+            fonte.remover(chave)
+
+    def executar(self):
+        self.referencias_mortas()
+        self.blobs_sem_dono()
+        self.legados_sem_dono()
+        self.temporarios()
+        self.entradas()
+        return self.relatorio
+
+@click.command("limpar-uploads")
+@click.option("--horas", type=float, default=None, help="Carência: só arquivos mais velhos que isso (padrão: UPLOAD_GC_CARENCIA_HORAS).")
+@click.option("--modo", type=click.Choice(["quarentena", "apagar"]), default=None)
+@click.option("--lote", type=int, default=None)
+@click.option("--simular", is_flag=True, help="Só conta o que seria coletado.")
+@click.option("--a-cada", "a_cada", type=int, default=0, help="Repete a cada N minutos (0 = roda uma vez).")
+def limpar_uploads_command(horas, modo, lote, simular, a_cada):
+    """Coleta fotos/avatares que nenhum registro usa mais."""
+    cfg = current_app.config
+    while True:
+        inicio = time.perf_counter()
+        coleta = ColetaUploads(
+            carencia_horas=horas if horas is not None else cfg["UPLOAD_GC_CARENCIA_HORAS"],
+            modo=modo or cfg["UPLOAD_GC_MODO"],
+            lote=lote or cfg["UPLOAD_GC_LOTE"],
+            simular=simular,
+        )
+        rel = coleta.executar()
+        destino = "" if simular or coleta.modo == "apagar" else f" -> quarentena {coleta.rotulo}"
+        click.echo(
+            f"[{datetime.utcnow():%Y-%m-%d %H:%M}] {'(simulação) ' if simular else ''}"
+            f"{rel.examinados} arquivo(s) examinado(s) em {rel.lotes} lote(s) "
+            f"({time.perf_counter() - inicio:.1f}s): {rel.arquivos} órfão(s){destino}, "
+            f"{rel.blobs} blob(s), {rel.referencias} referência(s) morta(s), "
+            f"{rel.temporarios} temporário(s); {rel.bytes / 1024 / 1024:,.1f} MiB recuperados."
+        )
+        if not a_cada:
+            break
+        time.sleep(a_cada * 60)
@@ -0,0 +1,97 @@
+import click
+import uuid
+from sqlalchemy import inspect
+from extensions import db
+from models.tipos import IdUUID
+
+# ==========================================================
+# CONVERSÃO DO ARMAZENAMENTO DE IDS (texto <-> binário)
+# ==========================================================
+# Os valores não mudam (a mesma string canônica continua valendo nas URLs
+# e nas sessões já abertas); só muda a forma gravada no banco:
+#   SQLite:   o texto vira BLOB de 16 bytes na própria coluna (UPDATE in-place)
+#   Postgres: ALTER COLUMN ... TYPE uuid (FKs removidas e recriadas em volta)
+# Depois de converter, suba o app com ID_ARMAZENAMENTO correspondente.
+
+def colunas_de_id():
+    """[(tabela, coluna)] de todas as colunas IdUUID (PKs e FKs) dos models."""
+    return [
+        (tabela.name, coluna.name)
+        for tabela in db.metadata.sorted_tables
+        for coluna in tabela.columns
+        if isinstance(coluna.type, IdUUID)
+    ]
+
+def _texto_para_blob(valor):
+    if isinstance(valor, str):
+        try:
+            return uuid.UUID(valor).bytes
+        except ValueError:
+            return valor
+    return valor
+
+def _blob_para_texto(valor):
+    if isinstance(valor, bytes) and len(valor) == 16:
+        return str(uuid.UUID(bytes=valor))
+    return valor
+
+def _converter_sqlite(conn, para):
+    bruta = conn.connection.driver_connection
+    bruta.create_function("taskpay_id_blob", 1, _texto_para_blob, deterministic=True)
+    bruta.create_function("taskpay_id_texto", 1, _blob_para_texto, deterministic=True)
+    funcao, tipo_origem = ("taskpay_id_blob", "text") if para == "binario" else ("taskpay_id_texto", "blob")
+
+    total = 0
+    for tabela, coluna in colunas_de_id():
+        col = conn.dialect.identifier_preparer.quote(coluna)
+        resultado = conn.exec_driver_sql(
+            f"UPDATE {tabela} SET {col} = {funcao}({col}) WHERE typeof({col}) = '{tipo_origem}'"
+        )
+        total += resultado.rowcount
+    return total
+
+def _converter_postgres(conn, para):
+    insp = inspect(conn)
+    colunas = colunas_de_id()
+    tabelas = sorted({t for t, _ in colunas})
+
+    fks = []
+    for tabela in tabelas:
+        for fk in insp.get_foreign_keys(tabela):
+            fks.append((tabela, fk))
+            conn.exec_driver_sql(f'ALTER TABLE {tabela} DROP CONSTRAINT "{fk["name"]}"')
+
+    novo_tipo = "uuid" if para == "binario" else "varchar(36)"
+    conversao = "::uuid" if para == "binario" else "::text"
+    for tabela, coluna in colunas:
+        conn.exec_driver_sql(
+            f'ALTER TABLE {tabela} ALTER COLUMN "{coluna}" TYPE {novo_tipo} USING "{coluna}"{conversao}'
+        )
+
+    for tabela, fk in fks:
+        origem = ", ".join(f'"{c}"' for c in fk["constrained_columns"])
+        destino = ", ".join(f'"{c}"' for c in fk["referred_columns"])
+        conn.exec_driver_sql(
+            f'ALTER TABLE {tabela} ADD CONSTRAINT "{fk["name"]}" '
+            f'FOREIGN KEY ({origem}) REFERENCES {fk["referred_table"]} ({destino})'
+        )
+    return len(colunas)
+
+@click.command("converter-ids")
+@click.option("--para", type=click.Choice(["binario", "texto"]), default="binario", show_default=True)
+def converter_ids_command(para):
+    """Converte as colunas de id/FK do banco entre texto (36) e binário (16 bytes)."""
+    with db.engine.begin() as conn:
+        if conn.dialect.name == "sqlite":
+            n = _converter_sqlite(conn, para)
+            click.echo(f"{n} valor(es) convertido(s) para {para}.")
+        elif conn.dialect.name == "postgresql":
+            n = _converter_postgres(conn, para)
+            click.echo(f"{n} coluna(s) alteradas para {para}.")
+        else:
+            raise click.ClickException(f"Banco não suportado: {conn.dialect.name}")
+
+    if conn.dialect.name == "sqlite" and para == "binario":
+        with db.engine.connect() as conn:
+            conn.exec_driver_sql("VACUUM")
+    click.echo(f"Suba o app com ID_ARMAZENAMENTO={para}.")
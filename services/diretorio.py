@@ -0,0 +1,51 @@
+from sqlalchemy import select
+from flask import current_app
+from extensions import db
+from models.models import Membro, Usuario, Role
+from services.cache import CacheLRU
+
+# ==========================================================
+# DIRETÓRIO DA FAMÍLIA (quem é quem: ids, nomes, avatares, papéis)
+# ==========================================================
+# Quase toda tela do pai lista os filhos e os templates ainda buscavam
+# usuario.nome/avatarUrl um a um (lazy load por filho). Esses dados quase
+# nunca mudam, então ficam em cache por família: uma consulta com JOIN em
+# usuario na falta, nenhuma no acerto. Cadastro e edição de perfil invalidam.
+# Só dados de identidade: saldo, XP e streak continuam vindo do banco.
+
+_cache = None
+
+def _cache_diretorio():
+    global _cache
+    if _cache is None:
+        cfg = current_app.config
+        _cache = CacheLRU(maximo=cfg["DIRETORIO_CACHE_MAX"], ttl=cfg["DIRETORIO_CACHE_TTL"])
+    return _cache
+
+def _carregar(familia_id):
+    linhas = db.session.execute(
+        select(Membro.id, Membro.usuario_id, Membro.role, Usuario.nome, Usuario.avatarUrl)
+        .join(Usuario, Usuario.id == Membro.usuario_id)
+        .where(Membro.familia_id == familia_id)
+        .order_by(Membro.entradaEm)
+    ).all()
+    return tuple(dict(linha._mapping) for linha in linhas)
+
+def membros(familia_id):
+    """Todos os membros da família, na ordem de entrada (dicts; o template usa m.nome etc.)."""
+    return _cache_diretorio().obter(familia_id, lambda: _carregar(familia_id))
+
+def filhos(familia_id):
+    return [m for m in membros(familia_id) if m["role"] == Role.CHILD]
+
+def por_id(familia_id):
+    """{membro_id: dict} para trocar `tarefa.executor.usuario.nome` por uma consulta ao dicionário."""
+    return {m["id"]: m for m in membros(familia_id)}
+
+def invalidar(*familia_ids):
+    cache = _cache_diretorio()
+    for familia_id in familia_ids:
+        cache.invalidar(familia_id)
+
+def estatisticas():
+    return _cache_diretorio().estatisticas()
@@ -0,0 +1,278 @@
+import abc
+import os
+import select as _select
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import event, select, func, text
+from extensions import db
+from models.models import Notificacao, NotificacaoFamilia
+
+# ==========================================================
+# PUB/SUB DE EVENTOS (avisos "mudou algo para você")
+# ==========================================================
+# Quem escreve chama publicar(canal) junto com a escrita (notificacoes.py já
+# faz); o aviso só sai DEPOIS do commit da sessão e some no rollback. O
+# evento não carrega dados: é um "acorde", e quem assina (o SSE de
+# services/notificacoes_ao_vivo.py) relê o banco com o próprio cursor. Aviso
+# repetido ou perdido no meio do caminho não corrompe nada.
+# Canais: "u:<usuario_id>" (pessoais e leitura) e "f:<familia_id>:<publico>".
+# EVENTOS_BACKEND:
+#   memoria  -> entrega em memória no próprio processo (um processo só);
+#   banco    -> cada processo tem uma thread que lê as notificações novas
+#               (cursor por enviadaEm) a cada EVENTOS_INTERVALO s; qualquer banco;
+#   postgres -> NOTIFY na transação (entregue no commit) e uma conexão LISTEN
+#               por processo;
+#   auto     -> postgres se o banco for Postgres; senão banco se houver mais
+#               de um processo escrevendo (WEB_CONCURRENCY > 1 ou JOBS_MODO
+#               'worker', cujas notificações nascem no processo do worker) e
+#               memoria só quando tudo roda num processo.
+# 'memoria' explícito com mais de um processo e EVENTOS_AO_VIVO ligado é
+# recusado ao subir: cada processo só avisaria as próprias conexões.
+# Nos backends entre processos, a leitura de notificações feita em outro
+# processo não é avisada no 'banco' (só notificação nova): o badge se acerta
+# na próxima notificação ou reconexão.
+
+CANAL_PG = "taskpay_eventos"
+FOLGA = timedelta(seconds=2)   # commit que chega depois do instante da linha
+
+def canal_usuario(usuario_id):
+    return f"u:{usuario_id}"
+
+def canal_familia(familia_id, publico):
+    return f"f:{familia_id}:{publico}"
+
+class Assinatura:
+    def __init__(self, hub, canais):
+        self.hub = hub
+        self.canais = tuple(canais)
+        self._evento = threading.Event()
+
+    def avisar(self):
+        self._evento.set()
+
+    def esperar(self, timeout):
+        """True se chegou aviso (desde a última espera) antes do timeout."""
+        chegou = self._evento.wait(timeout)
+        self._evento.clear()
+        return chegou
+
+    def cancelar(self):
+        self.hub.cancelar(self)
+
+class Hub:
+    """Assinaturas deste processo: canal -> assinaturas."""
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._canais = {}
+
+    def assinar(self, canais):
+        assinatura = Assinatura(self, canais)
+        with self._trava:
+            for canal in assinatura.canais:
+                self._canais.setdefault(canal, set()).add(assinatura)
+        return assinatura
+
+    def cancelar(self, assinatura):
+        with self._trava:
+            for canal in assinatura.canais:
+                assinantes = self._canais.get(canal)
+                if assinantes:
+                    assinantes.discard(assinatura)
+                    if not assinantes:
+                        del self._canais[canal]
+
+    def publicar(self, canais):
+        with self._trava:
+            alvos = set().union(*(self._canais.get(c, ()) for c in canais))
+        for assinatura in alvos:
+            assinatura.avisar()
+
+    def publicar_todos(self):
+        """Acorda todo mundo (ex.: a escuta caiu e pode ter perdido avisos)."""
+        with self._trava:
+            alvos = set().union(*self._canais.values())
+        for assinatura in alvos:
+            assinatura.avisar()
+
+    def tem_assinantes(self):
+        return bool(self._canais)
+
+class EventosMemoria:
+    """Entrega no próprio processo: dev, ou um único worker do gunicorn com threads."""
+    def __init__(self, app):
+        self.app = app
+        self.hub = Hub()
+
+    def assinar(self, canais):
+        return self.hub.assinar(canais)
+
+    def antes_commit(self, sessao, canais):
+        pass
+
+    def depois_commit(self, canais):
+        self.hub.publicar(canais)
+
+class _ComEscuta(EventosMemoria, abc.ABC):
+    """Base dos backends entre processos: uma thread de escuta por processo (sobe depois do fork)."""
+    def __init__(self, app):
+        super().__init__(app)
+        self._pid = None
+        self._trava = threading.Lock()
+
+    def assinar(self, canais):
+        if self._pid != os.getpid():
+            with self._trava:
+                if self._pid != os.getpid():
+                    self.hub = Hub()
+                    threading.Thread(target=self._escutar, name="eventos-escuta", daemon=True).start()
+                    self._pid = os.getpid()
+        return self.hub.assinar(canais)
+
+    @abc.abstractmethod
+    def _escutar(self):
+        """Laço da thread de escuta: chama self.hub.publicar(canais) a cada aviso."""
+
+class EventosBanco(_ComEscuta):
+    """Lê as notificações novas a cada `intervalo` s (uma consulta por processo, não por conexão)."""
+    def __init__(self, app, intervalo):
+        super().__init__(app)
+        self.intervalo = intervalo
+
+    def _novos(self, desde, vistos):
+        """Canais com notificação mais nova que a última vista (cursor por canal)."""
+        canais = []
+        consultas = (
+            (select(Notificacao.usuario_id, func.max(Notificacao.enviadaEm))
+             .where(Notificacao.enviadaEm > desde).group_by(Notificacao.usuario_id),
+             lambda usuario_id: canal_usuario(usuario_id)),
+            (select(NotificacaoFamilia.familia_id, NotificacaoFamilia.publico, func.max(NotificacaoFamilia.enviadaEm))
+             .where(NotificacaoFamilia.enviadaEm > desde)
+             .group_by(NotificacaoFamilia.familia_id, NotificacaoFamilia.publico),
+             lambda familia_id, publico: canal_familia(familia_id, publico)),
+        )
+        for consulta, nome in consultas:
+            for *chave, ultima in db.session.execute(consulta):
+                canal = nome(*chave)
+                if vistos.get(canal) is None or ultima > vistos[canal]:
+                    vistos[canal] = ultima
+                    canais.append(canal)
+        return canais
+
+    def _escutar(self):
+        cursor = datetime.utcnow()
+        vistos = {}
+        with self.app.app_context():
+            while True:
+                time.sleep(self.intervalo)
+                agora = datetime.utcnow()
+                if not self.hub.tem_assinantes():
+                    cursor, vistos = agora, {}
+                    continue
+                try:
+                    canais = self._novos(cursor - FOLGA, vistos)
+                    db.session.rollback()
+                except Exception:
+                    db.session.rollback()
+                    self.app.logger.exception("Eventos: falha ao consultar notificações novas")
+                    continue
+                finally:
+                    db.session.remove()
+                if canais:
+                    self.hub.publicar(canais)
+                # Só o que ainda cabe na folga precisa ser lembrado
+                vistos = {c: t for c, t in vistos.items() if t > agora - FOLGA * 2}
+                cursor = agora
+
+class EventosPostgres(_ComEscuta):
+    """LISTEN/NOTIFY: o NOTIFY entra na transação do commit e uma conexão por processo escuta."""
+    def antes_commit(self, sessao, canais):
+        for canal in canais:
+            sessao.execute(text("SELECT pg_notify(:fila, :canal)"), {"fila": CANAL_PG, "canal": canal})
+
+    def depois_commit(self, canais):
+        pass  # a própria escuta recebe o NOTIFY (de qualquer processo)
+
+    def _escutar(self):
+        while True:
+            bruta = None
+            try:
+                with self.app.app_context():
+                    bruta = db.engine.raw_connection()
+                conexao = bruta.driver_connection
+                conexao.autocommit = True
+                conexao.cursor().execute(f"LISTEN {CANAL_PG}")
+                self.hub.publicar_todos()  # avisos perdidos enquanto a escuta estava fora
+                while True:
+                    if _select.select([conexao], [], [], 30) == ([], [], []):
+                        continue
+                    conexao.poll()
+                    canais = set()
+                    while conexao.notifies:
+                        canais.add(conexao.notifies.pop(0).payload)
+                    if canais:
+                        self.hub.publicar(canais)
+            except Exception:
+                self.app.logger.exception("Eventos: escuta LISTEN caiu; reconectando")
+                time.sleep(5)
+            finally:
+                if bruta is not None:
+                    try:
+                        bruta.invalidate()
+                    except Exception:
+                        pass
+
+# --- sessão: avisos saem depois do commit ---
+
+CHAVE_SESSAO = "eventos_pendentes"
+
+def atual():
+    return current_app.extensions["eventos"]
+
+def publicar(*canais):
+    """Agenda o aviso para o commit da sessão atual (some no rollback)."""
+    db.session.info.setdefault(CHAVE_SESSAO, set()).update(canais)
+
+def assinar(canais):
+    return atual().assinar(canais)
+
+def _antes_commit(sessao):
+    canais = sessao.info.get(CHAVE_SESSAO)
+    if canais:
+        current_app.extensions["eventos"].antes_commit(sessao, canais)
+
+def _depois_commit(sessao):
+    canais = sessao.info.pop(CHAVE_SESSAO, None)
+    if canais:
+        current_app.extensions["eventos"].depois_commit(canais)
+
+def _depois_rollback(sessao):
+    sessao.info.pop(CHAVE_SESSAO, None)
+
+def configurar_eventos(app):
+    cfg = app.config
+    backend = cfg["EVENTOS_BACKEND"]
+    varios = cfg["WEB_PROCESSOS"] > 1 or cfg["JOBS_MODO"] == "worker"
+    if backend == "auto":
+        if cfg["SQLALCHEMY_DATABASE_URI"].startswith("postgresql"):
+            backend = "postgres"
+        else:
+            backend = "banco" if varios else "memoria"
+    elif backend == "memoria" and varios and cfg["EVENTOS_AO_VIVO"]:
+        raise RuntimeError(
+            "EVENTOS_BACKEND=memoria só entrega dentro de um processo; com WEB_CONCURRENCY > 1 "
+            "ou JOBS_MODO=worker use 'banco' ou 'postgres' (ou 'auto')."
+        )
+    if backend == "postgres":
+        app.extensions["eventos"] = EventosPostgres(app)
+    elif backend == "banco":
+        app.extensions["eventos"] = EventosBanco(app, cfg["EVENTOS_INTERVALO"])
+    else:
+        app.extensions["eventos"] = EventosMemoria(app)
+    app.jinja_env.globals["eventos_ao_vivo"] = cfg["EVENTOS_AO_VIVO"]
+
+    for nome, funcao in (("before_commit", _antes_commit), ("after_commit", _depois_commit),
+                         ("after_rollback", _depois_rollback)):
+        if not event.contains(db.session, nome, funcao):
+            event.listen(db.session, nome, funcao)
@@ -0,0 +1,158 @@
+import click
+from decimal import Decimal
+from sqlalchemy import select, update, insert, bindparam, inspect
+from sqlalchemy.sql import func
+from extensions import db
+from models.models import Carteira, Transacao, TransactionType
+from services import resumo_familia
+
+# ==========================================================
+# EXTRATO + TOTAIS ACUMULADOS DA CARTEIRA
+# ==========================================================
+# Toda Transacao deve ser criada por `lancar`, que atualiza na mesma
+# transação do banco o saldo e os totais da Carteira. As páginas de
+# carteira leem esses totais direto da linha (O(1)), sem SUM no extrato.
+
+# Qual total acumulado cada tipo de transação alimenta
+COLUNA_TOTAL = {
+    TransactionType.CREDIT_TASK: "totalTarefas",
+    TransactionType.CREDIT_ALLOWANCE: "totalMesada",
+    TransactionType.DEBIT_PAYMENT: "totalPago",
+}
+
+# Sinal do lançamento no saldo (ADJUSTMENT usa o valor com o próprio sinal)
+_SINAL_SALDO = {
+    TransactionType.CREDIT_TASK: 1,
+    TransactionType.CREDIT_ALLOWANCE: 1,
+    TransactionType.DEBIT_PAYMENT: -1,
+    TransactionType.DEBIT_REWARD: -1,
+    TransactionType.ADJUSTMENT: 1,
+}
+
+def lancar(carteira, tipo, valor, descricao=None):
+    """
+    Registra uma Transacao e atualiza saldo/totais da carteira.
+    Não faz commit: o chamador fecha a transação junto com o resto da ação.
+    """
+    valor = Decimal(valor)
+    transacao = Transacao(tipo=tipo, valor=valor, descricao=descricao, carteira_id=carteira.id)
+    db.session.add(transacao)
+    _somar_na_carteira(carteira, tipo, valor)
+    return transacao
+
+def lancar_lote(carteira, tipo, itens):
+    """
+    Vários lançamentos do mesmo tipo na mesma carteira: um INSERT em lote das
+    Transacoes e um único UPDATE da carteira com a soma. `itens` = [(valor, descricao)].
+    """
+    itens = [(Decimal(valor), descricao) for valor, descricao in itens]
+    if not itens:
+        return
+    if not inspect(carteira).persistent:
+        db.session.flush()  # a FK das transações precisa da carteira no banco
+    db.session.execute(insert(Transacao), [
+        dict(tipo=tipo, valor=valor, descricao=descricao, carteira_id=carteira.id)
+        for valor, descricao in itens
+    ])
+    _somar_na_carteira(carteira, tipo, sum(valor for valor, _ in itens))
+
+def _somar_na_carteira(carteira, tipo, valor):
+    delta_saldo = valor * _SINAL_SALDO.get(tipo, 1)
+    coluna = COLUNA_TOTAL.get(tipo)
+
+    if inspect(carteira).persistent:
+        # Atribuição com expressão SQL: vira "col = col + :valor" no UPDATE,
+        # então dois lançamentos concorrentes não se sobrescrevem. O flush
+        # expira os atributos, que voltam do banco já somados se lidos depois.
+        carteira.saldo = Carteira.saldo + delta_saldo
+        if coluna:
+            setattr(carteira, coluna, getattr(Carteira, coluna) + valor)
+        db.session.flush()
+    else:
+        # Carteira criada nesta mesma ação (ainda não está no banco)
+        carteira.saldo = (carteira.saldo or 0) + delta_saldo
+        if coluna:
+            setattr(carteira, coluna, (getattr(carteira, coluna) or 0) + valor)
+
+    resumo_familia.registrar_lancamento(carteira, tipo, valor)
+
+def total_ganho(carteira):
+    """Tudo que o filho já recebeu (tarefas + mesada)."""
+    if not carteira:
+        return Decimal("0.00")
+    return (carteira.totalTarefas or 0) + (carteira.totalMesada or 0)
+
+# ==========================================================
+# RECÁLCULO E VERIFICAÇÃO
+# ==========================================================
+
+def somas_do_extrato(conn):
+    """{carteira_id: {coluna_total: soma}} calculado a partir da tabela transacao."""
+    somas = {}
+    consulta = (
+        select(Transacao.carteira_id, Transacao.tipo, func.sum(Transacao.valor))
+        .where(Transacao.tipo.in_(list(COLUNA_TOTAL)))
+        .group_by(Transacao.carteira_id, Transacao.tipo)
+    )
+    for carteira_id, tipo, soma in conn.execute(consulta):
+        somas.setdefault(carteira_id, {})[COLUNA_TOTAL[tipo]] = Decimal(soma or 0)
+    return somas
+
+def recalcular_totais(conn):
+    """Reescreve os totais de todas as carteiras a partir do extrato. Retorna quantas foram tocadas."""
+    somas = somas_do_extrato(conn)
+    tabela = Carteira.__table__
+    linhas = [
+        {
+            "_id": carteira_id,
+            "_tarefas": somas.get(carteira_id, {}).get("totalTarefas", Decimal("0")),
+            "_mesada": somas.get(carteira_id, {}).get("totalMesada", Decimal("0")),
+            "_pago": somas.get(carteira_id, {}).get("totalPago", Decimal("0")),
+        }
+        for (carteira_id,) in conn.execute(select(tabela.c.id))
+    ]
+    if linhas:
+        conn.execute(
+            update(tabela)
+            .where(tabela.c.id == bindparam("_id"))
+            .values(
+                totalTarefas=bindparam("_tarefas"),
+                totalMesada=bindparam("_mesada"),
+                totalPago=bindparam("_pago"),
+            ),
+            linhas,
+        )
+    return len(linhas)
+
+def divergencias(conn):
+    """Lista (carteira_id, coluna, gravado, extrato) onde o total gravado não bate com o extrato."""
+    somas = somas_do_extrato(conn)
+    tabela = Carteira.__table__
+    problemas = []
+    consulta = select(tabela.c.id, tabela.c.totalTarefas, tabela.c.totalMesada, tabela.c.totalPago)
+    for carteira_id, tarefas, mesada, pago in conn.execute(consulta):
+        esperado = somas.get(carteira_id, {})
+        for coluna, gravado in (("totalTarefas", tarefas), ("totalMesada", mesada), ("totalPago", pago)):
+            calculado = esperado.get(coluna, Decimal("0"))
+            if Decimal(gravado or 0) != calculado:
+                problemas.append((carteira_id, coluna, Decimal(gravado or 0), calculado))
+    return problemas
+
+@click.command("recalcular-carteiras")
+def recalcular_carteiras_command():
+    """Recalcula os totais acumulados de todas as carteiras a partir do extrato."""
+    with db.engine.begin() as conn:
+        n = recalcular_totais(conn)
+    click.echo(f"{n} carteira(s) recalculada(s).")
+
+@click.command("verificar-carteiras")
+def verificar_carteiras_command():
+    """Confere os totais acumulados contra o extrato (sai com código 1 se divergir)."""
+    with db.engine.connect() as conn:
+        problemas = divergencias(conn)
+    for carteira_id, coluna, gravado, calculado in problemas:
+        click.echo(f"{carteira_id} {coluna}: gravado={gravado} extrato={calculado}")
+    if problemas:
+        click.echo(f"{len(problemas)} divergência(s). Rode `flask recalcular-carteiras`.")
+        raise SystemExit(1)
+    click.echo("Totais das carteiras consistentes com o extrato.")
@@ -0,0 +1,508 @@
+import json
+import os
+import random
+import signal
+import socket
+import threading
+import time
+import traceback
+import click
+from datetime import datetime, timedelta
+from flask import current_app, g
+from sqlalchemy import select, update, delete, func
+from extensions import db
+from models.models import Job, JobStatus, generate_uuid
+
+# ==========================================================
+# FILA DE JOBS DURÁVEL (no próprio banco)
+# ==========================================================
+# enfileirar() grava uma linha em `job` na sessão do chamador: o job nasce
+# com o commit da requisição (e some com o rollback), sem broker à parte.
+# O worker (`flask worker`) reserva um job por vez em cada thread:
+#   SELECT ... FOR UPDATE SKIP LOCKED (Postgres; no SQLite o FOR UPDATE é
+#   ignorado) + UPDATE condicional status PRONTO -> EXECUTANDO, que é quem
+#   garante que dois workers nunca pegam o mesmo job.
+# A função registrada com @tarefa recebe a carga (JSON) como argumentos e
+# pode fazer os próprios commits (ingestao_fotos.processar commita antes de
+# publicar os arquivos); o que ela deixar pendente na sessão entra no commit
+# do FEITO. O FEITO é sempre uma transação à parte, depois da função: se o
+# worker cair entre as duas, o job roda de novo. Exceção = nova tentativa com
+# backoff exponencial (com jitter); esgotadas as tentativas o job fica MORTO
+# (dead-letter) até `flask jobs --reviver`. Job EXECUTANDO há mais de
+# JOBS_TIMEOUT (worker morto no meio) volta para a fila. A entrega é "pelo
+# menos uma vez": as tarefas precisam ser idempotentes (as de ingestão
+# terminam num UPDATE condicional).
+# JOBS_MODO: 'embutido' (threads do worker em cada processo web; padrão),
+# 'worker' (processo `flask worker` separado, opt-in; o web registra um erro
+# no log se houver job pronto parado há mais de JOBS_ALERTA_SEG, sinal de
+# que o worker não está no ar) ou 'sincrono' (roda no fim da requisição; dev
+# sem worker e testes).
+
+OK = "ok"
+NOVA_TENTATIVA = "nova tentativa"
+MORTO = "morto"
+
+class Tipo:
+    def __init__(self, funcao, fila, tentativas, ao_esgotar):
+        self.funcao = funcao
+        self.fila = fila
+        self.tentativas = tentativas
+        self.ao_esgotar = ao_esgotar
+
+_tipos = {}  # tipo -> Tipo
+
+def tarefa(tipo, fila="padrao", tentativas=None, ao_esgotar=None):
+    """
+    Registra a função que executa os jobs de `tipo`:
+
+        @fila.tarefa("ingestao_foto", fila="fotos", ao_esgotar=desistir)
+        def processar(submissao_id): ...
+
+    `ao_esgotar(**carga)` roda (e é commitado) quando o job morre.
+    """
+    def registrar(funcao):
+        _tipos[tipo] = Tipo(funcao, fila, tentativas, ao_esgotar)
+        return funcao
+    return registrar
+
+def filas_registradas():
+    return sorted({t.fila for t in _tipos.values()})
+
+def enfileirar(tipo, atraso=0, **carga):
+    """Grava o job na sessão atual; vale a partir do commit do chamador. Retorna o Job."""
+    registro = _tipos[tipo]
+    cfg = current_app.config
+    job = Job(
+        id=generate_uuid(), fila=registro.fila, tipo=tipo, carga=json.dumps(carga),
+        status=JobStatus.PRONTO, tentativas=0,
+        maxTentativas=registro.tentativas or cfg["JOBS_TENTATIVAS"],
+        disponivelEm=datetime.utcnow() + timedelta(seconds=atraso),
+    )
+    db.session.add(job)
+    if cfg["JOBS_MODO"] == "sincrono":
+        g.setdefault("jobs_sincronos", []).append(job.id)
+    return job
+
+# ==========================================================
+# EXECUÇÃO
+# ==========================================================
+
+def _backoff(tentativa):
+    cfg = current_app.config
+    espera = min(cfg["JOBS_BACKOFF_MAX"], cfg["JOBS_BACKOFF_BASE"] * 2 ** (tentativa - 1))
+    return espera * random.uniform(0.8, 1.2)
+
+def _reservar(filas, dono, job_id=None):
+    """Pega o próximo job pronto (ou o job `job_id`) e o marca EXECUTANDO. None se não há."""
+    agora = datetime.utcnow()
+    pronto = (Job.status == JobStatus.PRONTO, Job.disponivelEm <= agora)
+    consulta = select(Job.id, Job.tentativas).where(*pronto)
+    if job_id:
+        consulta = consulta.where(Job.id == job_id)
+    else:
+        consulta = consulta.where(Job.fila.in_(filas)).order_by(Job.disponivelEm).limit(1)
+    consulta = consulta.with_for_update(skip_locked=True)
+    for _ in range(3):
+        try:
+            linha = db.session.execute(consulta).first()
+            if linha is None:
+                db.session.rollback()
+                return None
+            escolhido, tentativas = linha
+            # `tentativas` na condição: se outro worker pegou, falhou e reagendou o
+            # job entre o SELECT e este UPDATE (SQLite), a reserva não vale
+            pegou = db.session.execute(
+                update(Job)
+                .where(Job.id == escolhido, Job.tentativas == tentativas, *pronto)
+                .values(status=JobStatus.EXECUTANDO, travadoEm=agora, travadoPor=dono,
+                        tentativas=tentativas + 1)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.session.commit()
+        except BaseException:
+            db.session.rollback()
+            raise
+        if pegou:
+            return db.session.get(Job, escolhido)
+        # Outro worker levou este (SQLite, sem SKIP LOCKED): tenta o próximo
+    return None
+
+def _encerrar(job_id, **valores):
+    db.session.execute(
+        update(Job).where(Job.id == job_id)
+        .values(travadoPor=None, **valores)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+def _esgotou(registro, carga, job_id):
+    if registro is None or registro.ao_esgotar is None:
+        return
+    try:
+        registro.ao_esgotar(**carga)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception("Fila: ao_esgotar do job %s falhou", job_id)
+
+def _executar(job, metricas=None):
+    """Roda um job reservado e registra o resultado. Retorna OK, NOVA_TENTATIVA ou MORTO."""
+    job_id, tipo, fila, tentativa, maximo = job.id, job.tipo, job.fila, job.tentativas, job.maxTentativas
+    registro = _tipos.get(tipo)
+    carga = json.loads(job.carga)
+    inicio = time.perf_counter()
+    try:
+        if registro is None:
+            raise LookupError(f"tipo de job não registrado: {tipo}")
+        registro.funcao(**carga)
+        duracao = int((time.perf_counter() - inicio) * 1000)
+        _encerrar(job_id, status=JobStatus.FEITO, concluidoEm=datetime.utcnow(), duracaoMs=duracao, erro=None)
+        resultado = OK
+    except Exception:
+        db.session.rollback()
+        duracao = int((time.perf_counter() - inicio) * 1000)
+        erro = traceback.format_exc(limit=8)[-4000:]
+        if tentativa >= maximo:
+            current_app.logger.error("Fila: job %s (%s) morreu após %s tentativa(s)\n%s", job_id, tipo, tentativa, erro)
+            _encerrar(job_id, status=JobStatus.MORTO, concluidoEm=datetime.utcnow(), duracaoMs=duracao, erro=erro)
+            _esgotou(registro, carga, job_id)
+            resultado = MORTO
+        else:
+            espera = _backoff(tentativa)
+            current_app.logger.warning("Fila: job %s (%s) falhou (tentativa %s/%s), de novo em %.0fs", job_id, tipo, tentativa, maximo, espera)
+            _encerrar(
+                job_id, status=JobStatus.PRONTO, travadoEm=None, duracaoMs=duracao, erro=erro,
+                disponivelEm=datetime.utcnow() + timedelta(seconds=espera),
+            )
+            resultado = NOVA_TENTATIVA
+    if metricas is not None:
+        metricas.registrar(fila, resultado, duracao)
+    return resultado
+
+def executar_pendentes():
+    """Modo 'sincrono': roda os jobs enfileirados neste contexto (depois do commit dele)."""
+    while g.get("jobs_sincronos"):
+        for job_id in g.pop("jobs_sincronos"):
+            job = _reservar(None, "sincrono", job_id=job_id)
+            if job is not None:
+                _executar(job)
+
+# ==========================================================
+# MANUTENÇÃO E SITUAÇÃO
+# ==========================================================
+
+def recuperar_travados(timeout):
+    """Jobs EXECUTANDO há mais de `timeout` s (worker morreu no meio): voltam à fila ou morrem."""
+    agora = datetime.utcnow()
+    travados = (Job.status == JobStatus.EXECUTANDO, Job.travadoEm < agora - timedelta(seconds=timeout))
+    mortos = db.session.execute(
+        update(Job)
+        .where(*travados, Job.tentativas >= Job.maxTentativas)
+        .values(status=JobStatus.MORTO, travadoPor=None, concluidoEm=agora, erro="worker parou no meio do job (timeout)")
+        .returning(Job.id, Job.tipo, Job.carga)
+        .execution_options(synchronize_session=False)
+    ).all()
+    voltaram = db.session.execute(
+        update(Job)
+        .where(*travados)
+        .values(status=JobStatus.PRONTO, travadoPor=None, travadoEm=None, disponivelEm=agora)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    for job_id, tipo, carga in mortos:
+        _esgotou(_tipos.get(tipo), json.loads(carga), job_id)
+    return voltaram, len(mortos)
+
+def purgar_feitos(horas, lote=500):
+    """Apaga, em lotes, os jobs FEITO concluídos há mais de `horas`."""
+    corte = datetime.utcnow() - timedelta(hours=horas)
+    total = 0
+    while True:
+        ids = select(Job.id).where(Job.status == JobStatus.FEITO, Job.concluidoEm < corte).limit(lote)
+        apagados = db.session.execute(
+            delete(Job).where(Job.id.in_(ids)).execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        total += apagados
+        if apagados < lote:
+            return total
+
+def situacao(filas=None):
+    """
+    {fila: {status: quantidade, "agendados": n, "espera": s}} de tudo que não
+    está FEITO. PRONTO conta só os já disponíveis; "agendados" esperam o backoff.
+    """
+    agora = datetime.utcnow()
+    consulta = select(Job.fila, Job.status, func.count()).where(Job.status != JobStatus.FEITO).group_by(Job.fila, Job.status)
+    prontos = (
+        select(Job.fila, func.count(), func.min(Job.disponivelEm))
+        .where(Job.status == JobStatus.PRONTO, Job.disponivelEm <= agora).group_by(Job.fila)
+    )
+    if filas:
+        consulta = consulta.where(Job.fila.in_(filas))
+        prontos = prontos.where(Job.fila.in_(filas))
+    saida = {}
+    for fila, status, n in db.session.execute(consulta):
+        linha = saida.setdefault(fila, {JobStatus.PRONTO: 0, JobStatus.EXECUTANDO: 0, JobStatus.MORTO: 0})
+        linha[status] = n
+    for linha in saida.values():
+        # Até aqui PRONTO conta também os que esperam o backoff
+        linha["agendados"], linha[JobStatus.PRONTO] = linha[JobStatus.PRONTO], 0
+    for fila, n, mais_antigo in db.session.execute(prontos):
+        linha = saida[fila]
+        linha["agendados"] -= n
+        linha[JobStatus.PRONTO] = n
+        linha["espera"] = (agora - mais_antigo).total_seconds()
+    db.session.rollback()
+    return saida
+
+class Metricas:
+    """Contadores por fila desde a última coleta (as threads do worker registram aqui)."""
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._por_fila = {}
+        self._desde = time.monotonic()
+
+    def registrar(self, fila, resultado, duracao_ms):
+        with self._trava:
+            m = self._por_fila.setdefault(fila, {OK: 0, NOVA_TENTATIVA: 0, MORTO: 0, "ms": 0, "max_ms": 0})
+            m[resultado] += 1
+            m["ms"] += duracao_ms
+            m["max_ms"] = max(m["max_ms"], duracao_ms)
+
+    def coletar(self):
+        """(segundos, {fila: contadores}) e zera."""
+        with self._trava:
+            agora = time.monotonic()
+            intervalo, dados = agora - self._desde, self._por_fila
+            self._por_fila, self._desde = {}, agora
+        return intervalo, dados
+
+# ==========================================================
+# WORKER
+# ==========================================================
+
+class Worker:
+    def __init__(self, app, filas=None, concorrencia=2, intervalo=1.0):
+        self.app = app
+        self.filas = list(filas or filas_registradas())
+        self.concorrencia = concorrencia
+        self.intervalo = intervalo
+        self.nome = f"{socket.gethostname()}:{os.getpid()}"
+        self.parar = threading.Event()
+        self.metricas = Metricas()
+        self.threads = []
+
+    def _laco(self, n):
+        dono = f"{self.nome}/{n}"
+        with self.app.app_context():
+            try:
+                while not self.parar.is_set():
+                    try:
+                        job = _reservar(self.filas, dono)
+                    except Exception:
+                        self.app.logger.exception("Fila: falha ao reservar job")
+                        self.parar.wait(self.intervalo * 5)
+                        continue
+                    if job is None:
+                        self.parar.wait(self.intervalo)
+                        continue
+                    _executar(job, self.metricas)
+                    db.session.expunge_all()
+            finally:
+                db.session.remove()
+
+    def iniciar(self):
+        for n in range(self.concorrencia):
+            t = threading.Thread(target=self._laco, args=(n,), name=f"worker-{n}", daemon=True)
+            t.start()
+            self.threads.append(t)
+
+    def encerrar(self, espera=None):
+        """Para de pegar jobs e espera os que estão rodando terminarem."""
+        self.parar.set()
+        for t in self.threads:
+            t.join(espera)
+
+    def manutencao(self):
+        cfg = self.app.config
+        voltaram, mortos = recuperar_travados(cfg["JOBS_TIMEOUT"])
+        apagados = purgar_feitos(cfg["JOBS_RETENCAO_HORAS"])
+        if voltaram or mortos:
+            self.app.logger.warning("Fila: %s job(s) travado(s) voltaram, %s morreram", voltaram, mortos)
+        return voltaram, mortos, apagados
+
+    def relatorio(self):
+        """Uma linha por fila com atividade ou backlog desde o último relatório."""
+        intervalo, dados = self.metricas.coletar()
+        fila_agora = situacao(self.filas)
+        linhas = []
+        for fila in self.filas:
+            m = dados.get(fila)
+            s = fila_agora.get(fila)
+            if not m and not s:
+                continue
+            partes = [f"{fila}:"]
+            if m:
+                feitos = m[OK] + m[NOVA_TENTATIVA] + m[MORTO]
+                partes.append(
+                    f"{m[OK]} ok, {m[NOVA_TENTATIVA]} nova(s) tentativa(s), {m[MORTO]} morto(s) | "
+                    f"{m[OK] / intervalo:.2f} job/s | média {m['ms'] // max(feitos, 1)} ms, máx {m['max_ms']} ms |"
+                )
+            if s:
+                partes.append(
+                    f"backlog {s[JobStatus.PRONTO]} pronto(s), {s.get('agendados', 0)} agendado(s), "
+                    f"{s[JobStatus.EXECUTANDO]} executando, {s[JobStatus.MORTO]} morto(s)"
+                )
+                if s.get("espera"):
+                    partes.append(f"(mais antigo há {s['espera']:.0f}s)")
+            linhas.append(" ".join(partes))
+        return linhas
+
+    def vigiar(self, a_cada, saida, ate_esvaziar=False):
+        """Laço do zelador: manutenção a cada minuto e relatório a cada `a_cada` s até parar."""
+        proxima_manutencao = proximo_relatorio = time.monotonic()
+        with self.app.app_context():
+            try:
+                while not self.parar.is_set():
+                    agora = time.monotonic()
+                    try:
+                        if agora >= proxima_manutencao:
+                            self.manutencao()
+                            proxima_manutencao = agora + 60
+                        if agora >= proximo_relatorio:
+                            for linha in self.relatorio():
+                                saida(f"[{datetime.utcnow():%Y-%m-%d %H:%M:%S}] {linha}")
+                            proximo_relatorio = agora + a_cada
+                        if ate_esvaziar:
+                            s = situacao(self.filas).values()
+                            if not any(x[JobStatus.PRONTO] or x[JobStatus.EXECUTANDO] for x in s):
+                                break
+                    except Exception:
+                        db.session.rollback()
+                        self.app.logger.exception("Fila: falha na manutenção")
+                    self.parar.wait(self.intervalo)
+            finally:
+                db.session.remove()
+
+# --- Flask ---
+
+_embutido = {"pid": None}
+_trava_embutido = threading.Lock()
+
+def _iniciar_embutido():
+    """Modo 'embutido': sobe o worker no primeiro request de cada processo (depois do fork)."""
+    if current_app.config["JOBS_MODO"] != "embutido" or _embutido["pid"] == os.getpid():
+        return
+    with _trava_embutido:
+        if _embutido["pid"] == os.getpid():
+            return
+        app = current_app._get_current_object()
+        cfg = app.config
+        worker = Worker(app, concorrencia=cfg["JOBS_CONCORRENCIA"], intervalo=cfg["JOBS_INTERVALO"])
+        worker.iniciar()
+        threading.Thread(
+            target=worker.vigiar, args=(cfg["JOBS_METRICAS_SEG"], app.logger.info),
+            name="worker-zelador", daemon=True,
+        ).start()
+        _embutido["pid"] = os.getpid()
+
+_alerta = {"proxima": 0.0}
+
+def _alertar_sem_worker():
+    """Modo 'worker': no máximo uma vez por minuto, acusa job pronto que ninguém pegou."""
+    cfg = current_app.config
+    if cfg["JOBS_MODO"] != "worker" or not cfg["JOBS_ALERTA_SEG"] or time.monotonic() < _alerta["proxima"]:
+        return
+    _alerta["proxima"] = time.monotonic() + 60
+    corte = datetime.utcnow() - timedelta(seconds=cfg["JOBS_ALERTA_SEG"])
+    parados, mais_antigo = db.session.execute(
+        select(func.count(), func.min(Job.disponivelEm))
+        .where(Job.status == JobStatus.PRONTO, Job.disponivelEm <= corte)
+    ).one()
+    if parados:
+        current_app.logger.error(
+            "Fila: %s job(s) pronto(s) sem worker há até %.0f s. JOBS_MODO=worker exige o processo "
+            "`flask --app app worker` no ar (ou use JOBS_MODO=embutido).",
+            parados, (datetime.utcnow() - mais_antigo).total_seconds(),
+        )
+
+def _executar_no_fim(resposta):
+    if current_app.config["JOBS_MODO"] == "sincrono":
+        executar_pendentes()
+    return resposta
+
+def configurar_fila(app):
+    app.before_request(_iniciar_embutido)
+    app.before_request(_alertar_sem_worker)
+    app.after_request(_executar_no_fim)
+
+# ==========================================================
+# CLI
+# ==========================================================
+
+@click.command("worker")
+@click.option("--filas", default=None, help="Filas separadas por vírgula (padrão: todas as registradas).")
+@click.option("--concorrencia", type=int, default=None, help="Threads (padrão: JOBS_CONCORRENCIA).")
+@click.option("--metricas", "a_cada", type=float, default=None, help="Segundos entre relatórios (padrão: JOBS_METRICAS_SEG).")
+@click.option("--ate-esvaziar", is_flag=True, help="Sai quando não houver mais job pronto (cron/testes).")
+def worker_command(filas, concorrencia, a_cada, ate_esvaziar):
+    """Executa os jobs da fila até receber SIGTERM/Ctrl+C."""
+    cfg = current_app.config
+    worker = Worker(
+        current_app._get_current_object(),
+        filas=[f.strip() for f in filas.split(",") if f.strip()] if filas else None,
+        concorrencia=concorrencia or cfg["JOBS_CONCORRENCIA"],
+        intervalo=cfg["JOBS_INTERVALO"],
+    )
+    for sinal in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sinal, lambda *_: worker.parar.set())
+    click.echo(f"Worker {worker.nome}: filas {', '.join(worker.filas)}; {worker.concorrencia} thread(s).")
+    worker.iniciar()
+    worker.vigiar(a_cada or cfg["JOBS_METRICAS_SEG"], click.echo, ate_esvaziar=ate_esvaziar)
+    click.echo("Encerrando: esperando os jobs em andamento...")
+    worker.encerrar()
+    for linha in worker.relatorio():
+        click.echo(linha)
+
+@click.command("jobs")
+@click.option("--fila", default=None, help="Só esta fila.")
+@click.option("--reviver", is_flag=True, help="Devolve os jobs MORTOS à fila, com as tentativas zeradas.")
+def jobs_command(fila, reviver):
+    """Situação das filas, throughput da última hora e últimos jobs mortos."""
+    filas = [fila] if fila else None
+    if reviver:
+        consulta = update(Job).where(Job.status == JobStatus.MORTO)
+        if fila:
+            consulta = consulta.where(Job.fila == fila)
+        revividos = db.session.execute(
+            consulta.values(status=JobStatus.PRONTO, tentativas=0, disponivelEm=datetime.utcnow(), concluidoEm=None)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        click.echo(f"{revividos} job(s) de volta à fila.")
+
+    hora = select(Job.fila, func.count(), func.avg(Job.duracaoMs)).where(
+        Job.status == JobStatus.FEITO, Job.concluidoEm >= datetime.utcnow() - timedelta(hours=1)
+    ).group_by(Job.fila)
+    if fila:
+        hora = hora.where(Job.fila == fila)
+    ultima_hora = {f: (n, media) for f, n, media in db.session.execute(hora)}
+    agora = situacao(filas)
+    if not agora and not ultima_hora:
+        click.echo("Nenhum job na fila.")
+    for nome in sorted(set(agora) | set(ultima_hora)):
+        s = agora.get(nome, {})
+        n, media = ultima_hora.get(nome, (0, None))
+        click.echo(
+            f"{nome}: {s.get(JobStatus.PRONTO, 0)} pronto(s), {s.get('agendados', 0)} agendado(s), "
+            f"{s.get(JobStatus.EXECUTANDO, 0)} executando, {s.get(JobStatus.MORTO, 0)} morto(s) | "
+            f"última hora: {n} feito(s), {n / 60:.1f}/min, média {media or 0:.0f} ms"
+        )
+
+    mortos = select(Job).where(Job.status == JobStatus.MORTO).order_by(Job.concluidoEm.desc()).limit(5)
+    if fila:
+        mortos = mortos.where(Job.fila == fila)
+    for job in db.session.scalars(mortos):
+        ultima = (job.erro or "").strip().splitlines()[-1:] or [""]
+        click.echo(f"  MORTO {job.id} {job.tipo} ({job.tentativas}x, {job.concluidoEm:%Y-%m-%d %H:%M}): {ultima[0]}")
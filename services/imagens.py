@@ -0,0 +1,119 @@
+import io
+import os
+import warnings
+from PIL import Image, ImageOps
+from flask import current_app
+from services import blobs, armazenamento
+from services.cache import CacheLRU
+
+# ==========================================================
+# FOTOS DAS SUBMISSÕES (normalização na entrada)
+# ==========================================================
+# O celular manda JPEGs de vários MB, com EXIF (GPS, modelo...) e rotação
+# só na tag de orientação. Na entrada a foto é:
+#   1. recusada se passar de FOTO_MAX_PIXELS decodificados (bomba de pixels);
+#   2. girada conforme o EXIF e regravada sem metadado nenhum;
+#   3. reduzida a FOTO_LADO_MAX e regravada (JPEG ou WebP) baixando a
+#      qualidade até caber em FOTO_BYTES_MAX;
+#   4. acompanhada das miniaturas FOTO_MINIATURAS (largura em px), que são o
+#      que a fila de avaliação do pai mostra.
+# A foto vira um blob (services/blobs.py) e as miniaturas ficam ao lado dele:
+# <sha>.<ext> e <sha>_<largura>.<ext>. O hash do upload bruto fica no blob,
+# então reenviar o mesmo arquivo não processa nem grava nada.
+
+QUALIDADE_MINIMA = 50
+
+# Miniatura existe? (com S3 seria um HEAD por foto em cada render)
+_miniaturas = CacheLRU(maximo=4096, ttl=600)
+
+class ImagemInvalida(blobs.UploadInvalido):
+    """Arquivo que não é imagem, está corrompido ou é grande demais."""
+
+def _abrir(fluxo, max_pixels, lado_max):
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", Image.DecompressionBombWarning)
+            img = Image.open(fluxo)
+            if img.width * img.height > max_pixels:
+                raise ImagemInvalida(f"Imagem grande demais ({img.width}x{img.height}).")
+            # JPEG: decodifica já reduzido (escala do DCT) quando sobra resolução
+            img.draft("RGB", (lado_max, lado_max))
+            img = ImageOps.exif_transpose(img)
+            img.load()
+    except ImagemInvalida:
+        raise
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError, Image.DecompressionBombWarning) as e:
+        raise ImagemInvalida("Arquivo de imagem inválido.") from e
+
+    if img.mode in ("RGBA", "LA", "P"):
+        img = img.convert("RGBA")
+        fundo = Image.new("RGB", img.size, "white")
+        fundo.paste(img, mask=img.getchannel("A"))
+        return fundo
+    return img.convert("RGB")
+
+def _codificar(img, formato, qualidade, bytes_max=None):
+    """Bytes da imagem (sem EXIF); com `bytes_max`, baixa a qualidade até caber."""
+    while True:
+        saida = io.BytesIO()
+        opcoes = {"quality": qualidade}
+        if formato == "JPEG":
+            opcoes.update(optimize=True, progressive=True)
+        else:
+            opcoes.update(method=4)
+        img.save(saida, formato, **opcoes)
+        dados = saida.getvalue()
+        if bytes_max is None or len(dados) <= bytes_max or qualidade <= QUALIDADE_MINIMA:
+            return dados
+        qualidade -= 8
+
+def processar(fluxo, cfg=None):
+    """
+    Normaliza uma foto. Retorna (extensão, bytes da principal, {largura: bytes}).
+    Levanta ImagemInvalida.
+    """
+    cfg = cfg or current_app.config
+    formato = "WEBP" if cfg["FOTO_FORMATO"].upper() == "WEBP" else "JPEG"
+    ext = "webp" if formato == "WEBP" else "jpg"
+
+    img = _abrir(fluxo, cfg["FOTO_MAX_PIXELS"], cfg["FOTO_LADO_MAX"])
+    img.thumbnail((cfg["FOTO_LADO_MAX"], cfg["FOTO_LADO_MAX"]), Image.LANCZOS)
+    principal = _codificar(img, formato, cfg["FOTO_QUALIDADE"], cfg["FOTO_BYTES_MAX"])
+
+    miniaturas = {}
+    for largura in cfg["FOTO_MINIATURAS"]:
+        mini = img.copy()
+        mini.thumbnail((largura, largura * 4), Image.LANCZOS)
+        miniaturas[largura] = _codificar(mini, formato, cfg["FOTO_QUALIDADE"])
+    return ext, principal, miniaturas
+
+def salvar_foto(fluxo, lote, limite):
+    """
+    Recebe o upload (em blocos, até `limite` bytes), normaliza e guarda como
+    blob com miniaturas no `lote`. Retorna o Blob; não faz commit.
+    Levanta UploadInvalido/ImagemInvalida.
+    """
+    recebido = blobs.receber(fluxo, limite, blobs.IMAGENS)
+    try:
+        existente = blobs.por_origem(recebido.sha256)
+        if existente:
+            return existente
+
+        with open(recebido.temporario, "rb") as bruto:
+            ext, principal, miniaturas = processar(bruto)
+        blob = blobs.guardar_bytes(lote, principal, ext, origem=recebido.sha256)
+        for largura, dados in miniaturas.items():
+            blobs.guardar_derivado(lote, blob, f"_{largura}", dados)
+        return blob
+    finally:
+        recebido.descartar()  # o original do celular não é guardado
+
+def miniatura(caminho, largura):
+    """Caminho da miniatura de `caminho`; fotos antigas (sem miniatura) ficam com o original."""
+    if not caminho:
+        return caminho
+    raiz, ext = os.path.splitext(caminho)
+    candidato = f"{raiz}_{largura}{ext}"
+    if _miniaturas.obter(candidato, lambda: armazenamento.atual().existe(candidato)):
+        return candidato
+    return caminho
@@ -0,0 +1,226 @@
+import click
+from contextlib import closing
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, update
+from extensions import db
+from models.models import Role, Submissao, SubmissionStatus, TaskStatus, Usuario, generate_uuid
+from services import armazenamento, blobs, diretorio, fila, imagens, notificacoes, resumo_familia, versao_familia
+
+# ==========================================================
+# INGESTÃO ASSÍNCRONA DAS FOTOS DE SUBMISSÃO
+# ==========================================================
+# A requisição do filho só guarda o upload bruto no armazenamento
+# (uploads/entrada/<membro>/..., ou a chave do envio direto), marca a
+# submissão como PROCESSING com Submissao.fotoEntrada e enfileira um job
+# "ingestao_foto" (services/fila.py) na mesma transação. O worker faz o
+# resto: confere/normaliza a foto (imagens.salvar_foto), grava o blob,
+# passa a submissão para PENDING e avisa os pais. Foto inválida: a submissão
+# vira NEEDS_REVISION, a tarefa volta a ATIVA e o filho é avisado.
+# O fim do job é um UPDATE condicional (ainda PROCESSING e com a mesma
+# entrada): job repetido ou reenvio no meio do caminho não estragam nada.
+# Falha passageira (armazenamento fora do ar...) levanta exceção e a fila
+# tenta de novo; esgotadas as tentativas, desistir() devolve a tarefa ao filho.
+# O avatar do envio direto segue o mesmo caminho (job "ingestao_avatar",
+# Usuario.avatarEntrada): a requisição só confere a chave e o tamanho (HEAD),
+# sem baixar o objeto do bucket no worker web.
+
+TIPO_JOB = "ingestao_foto"
+TIPO_AVATAR = "ingestao_avatar"
+
+def receber(arquivo, chave, membro_id, limite):
+    """
+    Chave do upload bruto no armazenamento: a do envio direto (conferida) ou
+    o arquivo do formulário copiado para lá. None se nada veio.
+    Levanta UploadInvalido (tamanho/tipo; os magic bytes do envio direto são
+    conferidos no worker).
+    """
+    backend = armazenamento.atual()
+    if chave:
+        if not chave.startswith(f"{armazenamento.PASTA_ENTRADA}/{membro_id}/") or ".." in chave:
+            return None
+        info = backend.info(chave)
+        if info is None:
+            return None
+        if info[0] > limite:
+            backend.remover(chave)
+            raise blobs.UploadInvalido(f"Arquivo maior que {limite // (1024 * 1024)} MB.")
+        return chave
+    if not arquivo or not arquivo.filename:
+        return None
+    recebido = blobs.receber(arquivo.stream, limite)
+    chave = f"{armazenamento.PASTA_ENTRADA}/{membro_id}/{generate_uuid()}.{recebido.ext}"
+    try:
+        backend.publicar(recebido.temporario, chave)
+    finally:
+        recebido.descartar()
+    return chave
+
+def _finalizar(sub, chave, erro=None, blob=None):
+    """
+    Tira a submissão de PROCESSING (UPDATE condicional) e aplica resumo,
+    referência do blob e avisos. False se ela mudou no caminho. Não faz commit.
+    """
+    tarefa = sub.tarefa
+    membro = tarefa.executor
+    if erro:
+        valores = dict(status=SubmissionStatus.NEEDS_REVISION, fotoUrl=None, nota=f"Foto não aceita: {erro}")
+    else:
+        valores = dict(status=SubmissionStatus.PENDING, fotoUrl=blob.caminho)
+    concluida = db.session.execute(
+        update(Submissao)
+        .where(
+            Submissao.id == sub.id,
+            Submissao.status == SubmissionStatus.PROCESSING,
+            Submissao.fotoEntrada == chave,
+        )
+        .values(fotoEntrada=None, **valores)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not concluida:
+        return False  # reenviada ou já processada por outro job
+
+    if erro:
+        tarefa.status = TaskStatus.ATIVA
+        blobs.desreferenciar(blobs.SUBMISSAO, sub.id)
+        resumo_familia.ajustar(membro.familia_id, ativas=1)
+        notificacoes.notificar_usuario(
+            membro.usuario_id, "FOTO_RECUSADA",
+            f"A foto de '{tarefa.titulo}' não pôde ser usada ({erro}). Envie outra."
+        )
+    else:
+        blobs.referenciar(blob, blobs.SUBMISSAO, sub.id)
+        resumo_familia.ajustar(membro.familia_id, pendentes=1)
+        notificacoes.notificar_familia(
+            membro.familia_id, Role.PARENT,
+            tipo="TAREFA_PENDENTE",
+            mensagem=f"{membro.usuario.nome} enviou uma foto para '{tarefa.titulo}'."
+        )
+    return True
+
+def desistir(submissao_id):
+    """Job esgotou as tentativas: a tarefa volta para o filho em vez de ficar em PROCESSING."""
+    sub = db.session.get(Submissao, submissao_id)
+    if sub is None or sub.status != SubmissionStatus.PROCESSING or not sub.fotoEntrada:
+        return
+    # O upload bruto fica para a coleta (limpar-uploads) apagar
+    _finalizar(sub, sub.fotoEntrada, erro="não foi possível processar a foto agora")
+
+@fila.tarefa(TIPO_JOB, fila="fotos", ao_esgotar=desistir)
+def processar(submissao_id):
+    """Job: normaliza a foto da submissão e a libera para os pais. Retorna True se concluiu."""
+    sub = db.session.get(Submissao, submissao_id)
+    if sub is None or sub.status != SubmissionStatus.PROCESSING or not sub.fotoEntrada:
+        return False
+    chave = sub.fotoEntrada
+    backend = armazenamento.atual()
+
+    lote = blobs.Lote()
+    erro = blob = None
+    try:
+        with closing(backend.abrir(chave)) as fluxo:
+            blob = imagens.salvar_foto(fluxo, lote, current_app.config["UPLOAD_LIMITE_FOTO"])
+    except FileNotFoundError:
+        erro = "o arquivo enviado não foi encontrado"
+    except blobs.UploadInvalido as e:
+        erro = str(e)
+
+    return _concluir(lambda: _finalizar(sub, chave, erro, blob), lote, chave)
+
+def _concluir(finalizar, lote, chave):
+    """Commit do fim do job; depois publica os arquivos e apaga a entrada bruta."""
+    try:
+        if not finalizar():
+            db.session.rollback()
+            lote.descartar()
+            return False
+        db.session.commit()
+    except BaseException:
+        db.session.rollback()
+        lote.descartar()
+        raise
+
+    lote.publicar()
+    armazenamento.atual().remover(chave)
+    return True
+
+def enfileirar(submissao_id):
+    """Agenda o processamento na transação atual (o job vale a partir do commit)."""
+    fila.enfileirar(TIPO_JOB, submissao_id=submissao_id)
+
+# --- avatar (envio direto) ---
+
+def _finalizar_avatar(usuario, chave, erro=None, blob=None):
+    """Aplica o avatar se a entrada ainda é a mesma (UPDATE condicional). Não faz commit."""
+    valores = dict(avatarEntrada=None)
+    if blob is not None:
+        valores["avatarUrl"] = blob.caminho
+    concluida = db.session.execute(
+        update(Usuario)
+        .where(Usuario.id == usuario.id, Usuario.avatarEntrada == chave)
+        .values(**valores)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not concluida:
+        return False  # outro avatar chegou depois deste
+
+    if erro:
+        notificacoes.notificar_usuario(
+            usuario.id, "FOTO_RECUSADA",
+            f"Sua foto de perfil não pôde ser usada ({erro}). Envie outra."
+        )
+    else:
+        blobs.referenciar(blob, blobs.AVATAR, usuario.id)
+        versao_familia.tocar(*{m.familia_id for m in usuario.membros})
+    return True
+
+def desistir_avatar(usuario_id):
+    usuario = db.session.get(Usuario, usuario_id)
+    if usuario is not None and usuario.avatarEntrada:
+        _finalizar_avatar(usuario, usuario.avatarEntrada, erro="não foi possível processar a foto agora")
+
+@fila.tarefa(TIPO_AVATAR, fila="fotos", ao_esgotar=desistir_avatar)
+def processar_avatar(usuario_id):
+    """Job: confere (magic bytes, limite), guarda e aplica o avatar enviado direto ao bucket."""
+    usuario = db.session.get(Usuario, usuario_id)
+    if usuario is None or not usuario.avatarEntrada:
+        return False
+    chave = usuario.avatarEntrada
+    familias = {m.familia_id for m in usuario.membros}
+
+    lote = blobs.Lote()
+    erro = blob = None
+    try:
+        with closing(armazenamento.atual().abrir(chave)) as fluxo:
+            recebido = blobs.receber(fluxo, current_app.config["UPLOAD_LIMITE_AVATAR"])
+        blob = blobs.guardar(lote, recebido)
+    except FileNotFoundError:
+        erro = "o arquivo enviado não foi encontrado"
+    except blobs.UploadInvalido as e:
+        erro = str(e)
+
+    concluiu = _concluir(lambda: _finalizar_avatar(usuario, chave, erro, blob), lote, chave)
+    if concluiu:
+        diretorio.invalidar(*familias)
+    return concluiu
+
+def enfileirar_avatar(usuario_id):
+    fila.enfileirar(TIPO_AVATAR, usuario_id=usuario_id)
+
+@click.command("reprocessar-fotos")
+@click.option("--minutos", type=float, default=5.0, show_default=True, help="Só submissões paradas há mais que isso.")
+def reprocessar_fotos_command(minutos):
+    """Enfileira de novo as fotos paradas em PROCESSING (ex.: job apagado ou de antes da fila)."""
+    corte = datetime.utcnow() - timedelta(minutes=minutos)
+    ids = db.session.scalars(
+        select(Submissao.id).where(
+            Submissao.status == SubmissionStatus.PROCESSING,
+            Submissao.fotoEntrada.isnot(None),
+            Submissao.enviadaEm < corte,
+        )
+    ).all()
+    for sid in ids:
+        enfileirar(sid)
+    db.session.commit()
+    fila.executar_pendentes()
+    click.echo(f"{len(ids)} foto(s) enfileirada(s) na fila 'fotos'.")
@@ -0,0 +1,47 @@
+from functools import wraps
+from flask import g, session, request, redirect, url_for, flash
+from sqlalchemy.orm import joinedload
+from extensions import db
+from models.models import Membro
+
+# ==========================================================
+# MEMBRO LOGADO (por requisição)
+# ==========================================================
+# Um before_request resolve o membro da sessão pela chave primária
+# (session["membro_id"], gravado no login), já trazendo usuario e familia
+# no mesmo SELECT, e deixa em g.membro. As rotas usam @exige_papel em vez
+# de cada controller repetir a consulta por usuario_id + role.
+
+def carregar_membro_atual():
+    g.membro = None
+    if request.endpoint == "static":
+        return
+
+    membro_id = session.get("membro_id")
+    if not membro_id:
+        return
+
+    membro = db.session.get(
+        Membro, membro_id,
+        options=[joinedload(Membro.usuario), joinedload(Membro.familia)]
+    )
+    # A sessão precisa continuar batendo com o membro (usuário e papel do login)
+    if membro and membro.usuario_id == session.get("user_id") and membro.role == session.get("role"):
+        g.membro = membro
+
+def exige_papel(papel=None, mensagem=None):
+    """
+    Decorator de rota: exige um membro logado (e, se informado, com o papel `papel`).
+    Sem permissão, opcionalmente mostra `mensagem` e volta para o login.
+    """
+    def decorador(view):
+        @wraps(view)
+        def protegido(*args, **kwargs):
+            membro = g.get("membro")
+            if not membro or (papel and membro.role != papel):
+                if mensagem:
+                    flash(mensagem, "error")
+                return redirect(url_for("login.login_page"))
+            return view(*args, **kwargs)
+        return protegido
+    return decorador
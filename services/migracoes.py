@@ -0,0 +1,200 @@
+import click
+from datetime import datetime
+from sqlalchemy import MetaData, Table, Column, Integer, String, DateTime, inspect, select
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+
+# ==========================================================
+# MIGRAÇÕES VERSIONADAS
+# ==========================================================
+# O db.create_all() só cria tabelas que ainda não existem: ele nunca
+# adiciona índices ou colunas novas em tabelas já criadas (app.db local
+# ou o Postgres do Render). Cada mudança de schema entra aqui como uma
+# migração numerada, idempotente, aplicada uma única vez por banco.
+
+_meta = MetaData()
+
+schema_migracao = Table(
+    "schema_migracao", _meta,
+    Column("versao", Integer, primary_key=True),
+    Column("descricao", String(255), nullable=False),
+    Column("aplicadaEm", DateTime, nullable=False),
+)
+
+MIGRACOES = []
+
+def migracao(versao, descricao):
+    """Registra uma função (recebe a conexão) como migração de número `versao`."""
+    def decorador(fn):
+        MIGRACOES.append((versao, descricao, fn))
+        MIGRACOES.sort(key=lambda m: m[0])
+        return fn
+    return decorador
+
+# --- Helpers usados pelas migrações ---
+
+def criar_indices(conn, *tabelas):
+    """Cria os índices declarados nos models das tabelas informadas (se ainda não existirem)."""
+    for nome in tabelas:
+        tabela = db.metadata.tables[nome]
+        existentes = {i["name"] for i in inspect(conn).get_indexes(nome)}
+        colunas = {c["name"] for c in inspect(conn).get_columns(nome)}
+        for indice in tabela.indexes:
+            # Índice sobre coluna que uma migração posterior ainda vai criar: fica para ela
+            if indice.name in existentes or any(c.name not in colunas for c in indice.columns):
+                continue
+            indice.create(conn)
+
+def adicionar_coluna(conn, tabela, coluna):
+    """ALTER TABLE ADD COLUMN a partir da coluna declarada no model (se ainda não existir)."""
+    existentes = {c["name"] for c in inspect(conn).get_columns(tabela)}
+    if coluna in existentes:
+        return False
+    col = db.metadata.tables[tabela].c[coluna]
+    ddl = col.type.compile(dialect=conn.dialect)
+    nome = conn.dialect.identifier_preparer.quote(col.name)
+    sql = f"ALTER TABLE {tabela} ADD COLUMN {nome} {ddl}"
+    padrao = conn.dialect.ddl_compiler(conn.dialect, None).get_column_default_string(col)
+    if padrao is not None:
+        sql += f" DEFAULT {padrao}"
+        if not col.nullable:
+            sql += " NOT NULL"
+    conn.exec_driver_sql(sql)
+    return True
+
+def remover_coluna(conn, tabela, coluna):
+    """ALTER TABLE DROP COLUMN de uma coluna que saiu do model (se ainda existir)."""
+    existentes = {c["name"] for c in inspect(conn).get_columns(tabela)}
+    if coluna not in existentes:
+        return False
+    nome = conn.dialect.identifier_preparer.quote(coluna)
+    conn.exec_driver_sql(f"ALTER TABLE {tabela} DROP COLUMN {nome}")
+    return True
+
+# --- Runner ---
+
+def versoes_aplicadas(conn):
+    _meta.create_all(conn)
+    return {v for (v,) in conn.execute(select(schema_migracao.c.versao))}
+
+def aplicar_migracoes(engine=None, ate=None, log=None):
+    """Aplica, em ordem, as migrações ainda não registradas. Retorna as versões aplicadas."""
+    engine = engine or db.engine
+    aplicadas = []
+    with engine.connect() as conn:
+        feitas = versoes_aplicadas(conn)
+        conn.commit()
+
+        for versao, descricao, fn in MIGRACOES:
+            if versao in feitas or (ate is not None and versao > ate):
+                continue
+            try:
+                with conn.begin():
+                    fn(conn)
+                    conn.execute(schema_migracao.insert().values(
+                        versao=versao, descricao=descricao, aplicadaEm=datetime.utcnow()
+                    ))
+            except IntegrityError:
+                # Outro worker aplicou a mesma versão ao mesmo tempo.
+                continue
+            aplicadas.append(versao)
+            if log:
+                log(f"  [{versao:03d}] {descricao}")
+    return aplicadas
+
+# ==========================================================
+# LISTA DE MIGRAÇÕES
+# ==========================================================
+
+@migracao(1, "Índices compostos das colunas de filtro (tarefa, submissão, notificação, transação, resgate, membro)")
+def _m001_indices_filtros(conn):
+    criar_indices(
+        conn,
+        "membro", "transacao", "tarefa", "submissao",
+        "resgate_recompensa", "notificacao",
+    )
+
+@migracao(2, "Totais acumulados na carteira (totalTarefas, totalMesada, totalPago) + backfill")
+def _m002_totais_carteira(conn):
+    from services.extrato import recalcular_totais
+    for coluna in ("totalTarefas", "totalMesada", "totalPago"):
+        adicionar_coluna(conn, "carteira", coluna)
+    recalcular_totais(conn)
+
+@migracao(3, "Streak no progresso (streakAtual, melhorStreak, ultimoDiaAtivo) + fuso da família + backfill")
+def _m003_streak(conn):
+    from services.streak import recalcular_streaks
+    adicionar_coluna(conn, "familia", "fusoHorario")
+    for coluna in ("streakAtual", "melhorStreak", "ultimoDiaAtivo"):
+        adicionar_coluna(conn, "progresso", coluna)
+    recalcular_streaks(conn)
+
+@migracao(4, "Tarefas recorrentes: tarefa.recorrencia_id/periodo + índice único da ocorrência")
+def _m004_tarefas_recorrentes(conn):
+    for coluna in ("recorrencia_id", "periodo"):
+        adicionar_coluna(conn, "tarefa", coluna)
+    criar_indices(conn, "tarefa", "tarefa_recorrente")
+
+@migracao(5, "Motor de prazos: tarefa.lembreteEnviadoEm + índice (status, prazo)")
+def _m005_motor_prazos(conn):
+    adicionar_coluna(conn, "tarefa", "lembreteEnviadoEm")
+    criar_indices(conn, "tarefa")
+
+@migracao(6, "Índice resgate_recompensa(recompensa_id, status) para o anti-join do catálogo")
+def _m006_indice_catalogo(conn):
+    criar_indices(conn, "resgate_recompensa")
+
+@migracao(7, "Versão da família (familia.versao) para o ETag dos dashboards")
+def _m007_versao_familia(conn):
+    adicionar_coluna(conn, "familia", "versao")
+
+@migracao(8, "Avatares antigos (só o nome do arquivo) passam a ter o caminho relativo a static/")
+def _m008_caminho_avatares(conn):
+    from sqlalchemy import update, literal
+    usuario = db.metadata.tables["usuario"]
+    conn.execute(
+        update(usuario)
+        .where(usuario.c.avatarUrl.isnot(None), ~usuario.c.avatarUrl.contains("/"))
+        .values(avatarUrl=literal("uploads/") + usuario.c.avatarUrl)
+    )
+
+@migracao(9, "Ingestão assíncrona das fotos: submissao.fotoEntrada")
+def _m009_foto_entrada(conn):
+    adicionar_coluna(conn, "submissao", "fotoEntrada")
+
+@migracao(10, "Índices por enviadaEm nas notificações (eventos ao vivo com backend 'banco')")
+def _m010_indices_eventos(conn):
+    criar_indices(conn, "notificacao", "notificacao_familia")
+
+@migracao(11, "Resumo da família sem saldosFilhos (saldo a pagar vem de carteira.saldo)")
+def _m011_sem_saldos_filhos(conn):
+    remover_coluna(conn, "resumo_familia", "saldosFilhos")
+
+@migracao(12, "Avatar do envio direto processado na fila: usuario.avatarEntrada")
+def _m012_avatar_entrada(conn):
+    adicionar_coluna(conn, "usuario", "avatarEntrada")
+
+@migracao(13, "Leitura das notificações: leitura_notificacao.avisosLidos (folga de commit do cursor)")
+def _m013_avisos_lidos(conn):
+    adicionar_coluna(conn, "leitura_notificacao", "avisosLidos")
+
+# ==========================================================
+# CLI
+# ==========================================================
+
+@click.command("migrar")
+@click.option("--ate", type=int, default=None, help="Aplica somente até esta versão.")
+@click.option("--status", "so_status", is_flag=True, help="Só lista as versões, sem aplicar.")
+def migrar_command(ate, so_status):
+    """Aplica as migrações pendentes no banco configurado."""
+    if so_status:
+        with db.engine.connect() as conn:
+            feitas = versoes_aplicadas(conn)
+            conn.commit()
+        for versao, descricao, _ in MIGRACOES:
+            marca = "x" if versao in feitas else " "
+            click.echo(f"[{marca}] {versao:03d} {descricao}")
+        return
+
+    aplicadas = aplicar_migracoes(ate=ate, log=click.echo)
+    click.echo(f"{len(aplicadas)} migração(ões) aplicada(s).")
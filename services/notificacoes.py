@@ -0,0 +1,163 @@
+from datetime import datetime
+from sqlalchemy import insert, update, select, or_, and_
+from sqlalchemy.sql import func
+from extensions import db
+from models.models import Notificacao, NotificacaoFamilia, LeituraNotificacao, Membro
+from services import versao_familia, eventos
+
+# ==========================================================
+# NOTIFICAÇÕES: pessoais + avisos de família com cursor de leitura
+# ==========================================================
+# - Notificacao: um destinatário (aprovação, pagamento, nova tarefa...).
+# - NotificacaoFamilia: um registro por evento para "os pais" ou "os filhos"
+#   da família (fan-out na leitura, não na escrita).
+# - LeituraNotificacao: "lido até" de cada usuário. Tudo com enviadaEm <=
+#   lidoAte conta como lido, então "marcar todas" atualiza uma única linha.
+#   enviadaEm é a hora do INSERT, não do commit: uma notificação que commita
+#   depois de o cursor avançar pode ter enviadaEm anterior a ele. Por isso o
+#   cursor só vai até agora - eventos.FOLGA (a mesma folga do feed ao vivo);
+#   o que já estava visível depois disso é marcado um a um (lidaEm nas
+#   pessoais, avisosLidos para os avisos da família).
+# Nenhuma função daqui faz commit: o chamador fecha junto com a ação. Cada
+# escrita publica o canal do destinatário (services/eventos.py), avisado
+# depois desse commit para o badge/feed ao vivo, e sobe a versão da família
+# do destinatário (o 304 dos dashboards não esconde a notificação nova).
+
+def notificar_usuario(usuario_id, tipo, mensagem):
+    notif = Notificacao(tipo=tipo, mensagem=mensagem, usuario_id=usuario_id)
+    db.session.add(notif)
+    versao_familia.tocar_usuarios(usuario_id)
+    eventos.publicar(eventos.canal_usuario(usuario_id))
+    return notif
+
+def notificar_usuarios(linhas):
+    """Várias notificações pessoais num único INSERT. `linhas` = [(usuario_id, tipo, mensagem)]."""
+    if linhas:
+        db.session.execute(insert(Notificacao), [
+            dict(usuario_id=usuario_id, tipo=tipo, mensagem=mensagem)
+            for usuario_id, tipo, mensagem in linhas
+        ])
+        versao_familia.tocar_usuarios(*(usuario_id for usuario_id, _, _ in linhas))
+        eventos.publicar(*{eventos.canal_usuario(usuario_id) for usuario_id, _, _ in linhas})
+
+def notificar_familia(familia_id, publico, tipo, mensagem):
+    """Um aviso para todos os membros da família com o papel `publico`."""
+    aviso = NotificacaoFamilia(familia_id=familia_id, publico=publico, tipo=tipo, mensagem=mensagem)
+    db.session.add(aviso)
+    versao_familia.tocar(familia_id)
+    eventos.publicar(eventos.canal_familia(familia_id, publico))
+    return aviso
+
+def _leitura(membro):
+    """(cursor, avisos lidos depois dele); sem cursor, vale a entrada na família (avisos anteriores não contam)."""
+    leitura = db.session.get(LeituraNotificacao, membro.usuario_id)
+    if leitura:
+        return leitura.lidoAte, leitura.avisosLidos or []
+    return membro.entradaEm or datetime.min, []
+
+def lido_ate(membro):
+    return _leitura(membro)[0]
+
+def _consultas_nao_lidas(membro, desde=None):
+    cursor, avisos_lidos = _leitura(membro)
+    desde = max(cursor, desde) if desde else cursor
+    pessoais = Notificacao.query.filter(
+        Notificacao.usuario_id == membro.usuario_id,
+        Notificacao.lidaEm.is_(None),
+        Notificacao.enviadaEm > desde
+    )
+    familia = NotificacaoFamilia.query.filter(
+        NotificacaoFamilia.familia_id == membro.familia_id,
+        NotificacaoFamilia.publico == membro.role,
+        NotificacaoFamilia.enviadaEm > desde
+    )
+    if avisos_lidos:
+        familia = familia.filter(NotificacaoFamilia.id.not_in(avisos_lidos))
+    return pessoais, familia
+
+def nao_lidas(membro, limite=None):
+    """Notificações não lidas (pessoais + da família), mais recentes primeiro."""
+    pessoais, familia = _consultas_nao_lidas(membro)
+    pessoais = pessoais.order_by(Notificacao.enviadaEm.desc())
+    familia = familia.order_by(NotificacaoFamilia.enviadaEm.desc())
+    if limite:
+        pessoais = pessoais.limit(limite)
+        familia = familia.limit(limite)
+    itens = sorted(pessoais.all() + familia.all(), key=lambda n: n.enviadaEm, reverse=True)
+    return itens[:limite] if limite else itens
+
+def nao_lidas_desde(membro, desde, limite, depois=None):
+    """
+    Não lidas enviadas depois de `desde`, mais antigas primeiro (feed ao vivo).
+    `depois` = (enviadaEm, id) do último item da página anterior: pagina por
+    essa chave (um lote com o mesmo enviadaEm não repete a 1ª página).
+    """
+    pessoais, familia = _consultas_nao_lidas(membro, desde)
+    if depois:
+        quando, ultimo_id = depois
+        pessoais = pessoais.filter(or_(
+            Notificacao.enviadaEm > quando, and_(Notificacao.enviadaEm == quando, Notificacao.id > ultimo_id)
+        ))
+        familia = familia.filter(or_(
+            NotificacaoFamilia.enviadaEm > quando,
+            and_(NotificacaoFamilia.enviadaEm == quando, NotificacaoFamilia.id > ultimo_id),
+        ))
+    itens = (
+        pessoais.order_by(Notificacao.enviadaEm.asc(), Notificacao.id.asc()).limit(limite).all()
+        + familia.order_by(NotificacaoFamilia.enviadaEm.asc(), NotificacaoFamilia.id.asc()).limit(limite).all()
+    )
+    return sorted(itens, key=lambda n: (n.enviadaEm, n.id))[:limite]
+
+def contar_nao_lidas(membro):
+    pessoais, familia = _consultas_nao_lidas(membro)
+    return (
+        pessoais.with_entities(func.count(Notificacao.id)).scalar()
+        + familia.with_entities(func.count(NotificacaoFamilia.id)).scalar()
+    )
+
+def marcar_lidas_ate(usuario_id, quando=None):
+    """
+    Marca como lido tudo até `quando` (padrão: agora). O cursor nunca volta e
+    para em agora - FOLGA; o que o usuário já via entre ele e `quando` (só a
+    folga, poucas linhas) é marcado um a um.
+    """
+    agora = datetime.utcnow()
+    quando = min(quando or agora, agora)
+    cursor = min(quando, agora - eventos.FOLGA)
+    leitura = db.session.get(LeituraNotificacao, usuario_id)
+    if leitura is None:
+        leitura = LeituraNotificacao(usuario_id=usuario_id, lidoAte=cursor)
+        db.session.add(leitura)
+    elif cursor > leitura.lidoAte:
+        leitura.lidoAte = cursor
+    cursor, anteriores = leitura.lidoAte, leitura.avisosLidos or []
+
+    db.session.execute(
+        update(Notificacao)
+        .where(
+            Notificacao.usuario_id == usuario_id,
+            Notificacao.lidaEm.is_(None),
+            Notificacao.enviadaEm > cursor,
+            Notificacao.enviadaEm <= quando,
+        )
+        .values(lidaEm=agora)
+        .execution_options(synchronize_session=False)
+    )
+    # Os já lidos de antes continuam valendo enquanto estiverem depois do cursor
+    leitura.avisosLidos = db.session.scalars(
+        select(NotificacaoFamilia.id)
+        .join(Membro, and_(
+            Membro.familia_id == NotificacaoFamilia.familia_id,
+            Membro.role == NotificacaoFamilia.publico,
+        ))
+        .where(
+            Membro.usuario_id == usuario_id,
+            NotificacaoFamilia.enviadaEm > cursor,
+            or_(NotificacaoFamilia.enviadaEm <= quando, NotificacaoFamilia.id.in_(anteriores)),
+        )
+    ).all() or None
+    eventos.publicar(eventos.canal_usuario(usuario_id))
+
+def marcar_lida(notif):
+    notif.lidaEm = datetime.utcnow()
+    eventos.publicar(eventos.canal_usuario(notif.usuario_id))
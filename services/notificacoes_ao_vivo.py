@@ -0,0 +1,96 @@
+import json
+import time
+from collections import deque
+from datetime import datetime
+from types import SimpleNamespace
+from flask import current_app
+from extensions import db
+from services import eventos, notificacoes
+
+# ==========================================================
+# NOTIFICAÇÕES AO VIVO (Server-Sent Events)
+# ==========================================================
+# Só com EVENTOS_AO_VIVO ligado (config.py). GET /home/eventos mantém a
+# conexão aberta e manda:
+#   event: contagem     data: {"naoLidas": n}             (ao conectar e quando muda)
+#   event: notificacao  data: {"id", "tipo", "mensagem", "enviadaEm"}
+#   ": ping" a cada EVENTOS_HEARTBEAT s (proxies não derrubam a conexão)
+# A conexão assina os canais do usuário (services/eventos.py) e dorme até
+# um aviso; acordada, relê o banco a partir do próprio cursor. O `id` de
+# cada notificação é o enviadaEm: o EventSource reconecta com Last-Event-ID
+# e continua dali. Cada aviso lê as novas em páginas de LIMITE_POR_AVISO até
+# acabarem (um lote grande sai inteiro). Depois de EVENTOS_DURACAO_MAX s o
+# servidor fecha e o navegador reconecta sozinho (a thread do gunicorn não
+# fica presa para sempre; use worker gthread com threads de sobra).
+
+LIMITE_POR_AVISO = 20
+
+def _evento(nome, dados, id=None):
+    linhas = [f"id: {id}"] if id else []
+    linhas.append(f"event: {nome}")
+    linhas.append(f"data: {json.dumps(dados, ensure_ascii=False)}")
+    return "\n".join(linhas) + "\n\n"
+
+def cursor_de(ultimo_id):
+    """Last-Event-ID -> datetime (None se ausente ou inválido)."""
+    try:
+        return datetime.fromisoformat(ultimo_id) if ultimo_id else None
+    except ValueError:
+        return None
+
+def fluxo(membro, desde=None):
+    """Gerador do stream SSE do membro logado."""
+    cfg = current_app.config
+    # Só os campos que as consultas usam: a sessão do banco é fechada entre as esperas
+    leitor = SimpleNamespace(
+        usuario_id=membro.usuario_id, familia_id=membro.familia_id,
+        role=membro.role, entradaEm=membro.entradaEm,
+    )
+    assinatura = eventos.assinar([
+        eventos.canal_usuario(leitor.usuario_id),
+        eventos.canal_familia(leitor.familia_id, leitor.role),
+    ])
+    cursor = desde or datetime.utcnow()
+    silenciar_ate = cursor         # 1ª leitura: o que já estava na folga antes de conectar não sai
+    enviados = deque(maxlen=1000)  # a folga do cursor repete linhas (um lote inteiro, se cair nela)
+    contagem = None
+    fim = time.monotonic() + cfg["EVENTOS_DURACAO_MAX"]
+    try:
+        yield f"retry: {cfg['EVENTOS_RETRY_MS']}\n\n"
+        acordou = True
+        while True:
+            if acordou:
+                desde, depois = cursor - eventos.FOLGA, None
+                while True:
+                    novas = notificacoes.nao_lidas_desde(leitor, desde, LIMITE_POR_AVISO, depois)
+                    db.session.close()   # devolve a conexão ao pool enquanto escreve/espera
+                    for n in novas:
+                        if n.id in enviados:
+                            continue
+                        enviados.append(n.id)
+                        if silenciar_ate and n.enviadaEm <= silenciar_ate:
+                            continue
+                        cursor = max(cursor, n.enviadaEm)
+                        yield _evento("notificacao", {
+                            "id": n.id, "tipo": n.tipo, "mensagem": n.mensagem,
+                            "enviadaEm": n.enviadaEm.isoformat(),
+                        }, id=n.enviadaEm.isoformat())
+                    if len(novas) < LIMITE_POR_AVISO:
+                        break
+                    # Página cheia (ex.: aprovação em lote): o resto sai agora, sem esperar outro aviso
+                    depois = (novas[-1].enviadaEm, novas[-1].id)
+                silenciar_ate = None
+                total = notificacoes.contar_nao_lidas(leitor)
+                db.session.close()
+                if total != contagem:
+                    contagem = total
+                    yield _evento("contagem", {"naoLidas": total})
+            else:
+                yield ": ping\n\n"
+            restante = fim - time.monotonic()
+            if restante <= 0:
+                break
+            acordou = assinatura.esperar(min(cfg["EVENTOS_HEARTBEAT"], restante))
+    finally:
+        assinatura.cancelar()
+        db.session.close()
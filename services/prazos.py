@@ -0,0 +1,195 @@
+import heapq
+import time
+import click
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy import select, update
+from extensions import db
+from models.models import Tarefa, TaskStatus, Membro, Familia, Role
+from services import notificacoes, streak
+
+# ==========================================================
+# MOTOR DE PRAZOS (lembretes + tarefas atrasadas)
+# ==========================================================
+# Processo separado (`flask motor-prazos`). Em vez de varrer a tabela a cada
+# tick, carrega só a janela de prazos próximos (range scan no índice
+# (status, prazo)) para um heap de eventos em memória:
+#   LEMBRETE   em prazo - PRAZO_LEMBRETE_HORAS -> notifica o filho
+#   VENCIMENTO em prazo                        -> marca ATRASADA (UPDATE em lote)
+# O laço dorme até o próximo evento ou a próxima recarga da janela, o que
+# vier antes. Os UPDATEs repetem as condições (status, lembrete já enviado),
+# então evento velho (tarefa enviada/apagada) ou dois motores não duplicam nada.
+#
+# `prazo` vem do <input datetime-local>, ou seja, horário local da família:
+# o instante real é calculado com Familia.fusoHorario. Por isso a consulta da
+# janela ganha uma folga do tamanho do maior deslocamento de fuso.
+
+LEMBRETE = "LEMBRETE"
+VENCIMENTO = "VENCIMENTO"
+
+FOLGA_FUSO = timedelta(hours=14)
+
+def _instante_utc(prazo, tz):
+    """Prazo local (ingênuo) da família -> datetime UTC ingênuo."""
+    return prazo.replace(tzinfo=tz).astimezone(timezone.utc).replace(tzinfo=None)
+
+class MotorPrazos:
+    def __init__(self, horas_lembrete=2, janela_horas=6, recarga_minutos=5, lote=500):
+        self.antecedencia = timedelta(hours=horas_lembrete)
+        self.janela = timedelta(hours=janela_horas)
+        self.recarga = timedelta(minutes=recarga_minutos)
+        self.lote = lote
+        self.fila = []           # heap de (instante_utc, tipo, tarefa_id)
+        self.agendados = set()   # (tarefa_id, tipo) já no heap
+        self.proxima_recarga = None
+        self.primeira_carga = True
+        self.totais = {LEMBRETE: 0, VENCIMENTO: 0}
+
+    # --- carga da janela ---
+
+    def carregar(self, agora):
+        """Range scan dos prazos da janela; na primeira carga inclui todos os já vencidos."""
+        fim = agora + self.antecedencia + self.janela + FOLGA_FUSO
+        consulta = (
+            select(Tarefa.id, Tarefa.prazo, Tarefa.lembreteEnviadoEm, Familia.fusoHorario)
+            .join(Membro, Membro.id == Tarefa.executor_id)
+            .join(Familia, Familia.id == Membro.familia_id)
+            .where(Tarefa.status == TaskStatus.ATIVA, Tarefa.prazo <= fim)
+        )
+        if not self.primeira_carga:
+            consulta = consulta.where(Tarefa.prazo >= agora - self.recarga - FOLGA_FUSO)
+
+        novos = 0
+        fusos = {}
+        for tarefa_id, prazo, lembrete_em, nome_fuso in db.session.execute(consulta.execution_options(yield_per=self.lote)):
+            tz = fusos.setdefault(nome_fuso, streak.fuso(nome_fuso))
+            vence = _instante_utc(prazo, tz)
+            novos += self._agendar(tarefa_id, VENCIMENTO, vence)
+            if lembrete_em is None and vence > agora:
+                novos += self._agendar(tarefa_id, LEMBRETE, vence - self.antecedencia)
+
+        self.primeira_carga = False
+        self.proxima_recarga = agora + self.recarga
+        return novos
+
+    def _agendar(self, tarefa_id, tipo, instante):
+        if (tarefa_id, tipo) in self.agendados:
+            return 0
+        self.agendados.add((tarefa_id, tipo))
+        heapq.heappush(self.fila, (instante, tipo, tarefa_id))
+        return 1
+
+    # --- disparo ---
+
+    def _vencidos(self, agora):
+        """Tira do heap os eventos com instante <= agora, separados por tipo."""
+        saida = {LEMBRETE: [], VENCIMENTO: []}
+        while self.fila and self.fila[0][0] <= agora:
+            _, tipo, tarefa_id = heapq.heappop(self.fila)
+            self.agendados.discard((tarefa_id, tipo))
+            saida[tipo].append(tarefa_id)
+        return saida
+
+    def _enviar_lembretes(self, ids, agora):
+        for i in range(0, len(ids), self.lote):
+            bloco = ids[i:i + self.lote]
+            marcadas = db.session.execute(
+                update(Tarefa)
+                .where(Tarefa.id.in_(bloco), Tarefa.status == TaskStatus.ATIVA,
+                       Tarefa.lembreteEnviadoEm.is_(None))
+                .values(lembreteEnviadoEm=agora)
+                .returning(Tarefa.executor_id, Tarefa.titulo),
+                execution_options={"synchronize_session": False}
+            ).all()
+            executores = self._executores({executor_id for executor_id, _ in marcadas})
+            notificacoes.notificar_usuarios([
+                (executores[executor_id][0], "PRAZO_PROXIMO", f"Falta pouco para o prazo de '{titulo}'!")
+                for executor_id, titulo in marcadas if executor_id in executores
+            ])
+            db.session.commit()
+            self.totais[LEMBRETE] += len(marcadas)
+
+    def _marcar_atrasadas(self, ids):
+        for i in range(0, len(ids), self.lote):
+            bloco = ids[i:i + self.lote]
+            atrasadas = db.session.execute(
+                update(Tarefa)
+                .where(Tarefa.id.in_(bloco), Tarefa.status == TaskStatus.ATIVA)
+                .values(status=TaskStatus.ATRASADA)
+                .returning(Tarefa.executor_id, Tarefa.titulo),
+                execution_options={"synchronize_session": False}
+            ).all()
+            executores = self._executores({executor_id for executor_id, _ in atrasadas})
+            notificacoes.notificar_usuarios([
+                (executores[executor_id][0], "TAREFA_ATRASADA", f"O prazo de '{titulo}' venceu.")
+                for executor_id, titulo in atrasadas if executor_id in executores
+            ])
+            # Pais: um aviso por família com o total, em vez de um por tarefa
+            por_familia = {}
+            for executor_id, _ in atrasadas:
+                if executor_id in executores:
+                    familia_id = executores[executor_id][1]
+                    por_familia[familia_id] = por_familia.get(familia_id, 0) + 1
+            for familia_id, quantidade in por_familia.items():
+                notificacoes.notificar_familia(
+                    familia_id, Role.PARENT,
+                    tipo="TAREFA_ATRASADA",
+                    mensagem=f"{quantidade} tarefa(s) passaram do prazo sem envio."
+                )
+            db.session.commit()
+            self.totais[VENCIMENTO] += len(atrasadas)
+
+    def _executores(self, membro_ids):
+        """{membro_id: (usuario_id, familia_id)} dos filhos afetados."""
+        if not membro_ids:
+            return {}
+        linhas = db.session.execute(
+            select(Membro.id, Membro.usuario_id, Membro.familia_id).where(Membro.id.in_(membro_ids))
+        ).all()
+        return {membro_id: (usuario_id, familia_id) for membro_id, usuario_id, familia_id in linhas}
+
+    def tick(self, agora=None):
+        """Recarrega a janela se for a hora e dispara os eventos vencidos."""
+        agora = agora or datetime.utcnow()
+        if self.proxima_recarga is None or agora >= self.proxima_recarga:
+            self.carregar(agora)
+        eventos = self._vencidos(agora)
+        if eventos[LEMBRETE]:
+            self._enviar_lembretes(eventos[LEMBRETE], agora)
+        if eventos[VENCIMENTO]:
+            self._marcar_atrasadas(eventos[VENCIMENTO])
+        db.session.expunge_all()
+        return eventos
+
+    def segundos_ate_proximo(self, agora=None, maximo=60.0):
+        agora = agora or datetime.utcnow()
+        alvos = [self.proxima_recarga] + ([self.fila[0][0]] if self.fila else [])
+        espera = min((a - agora).total_seconds() for a in alvos if a is not None)
+        return max(0.0, min(espera, maximo))
+
+@click.command("motor-prazos")
+@click.option("--horas-lembrete", type=float, default=None, help="Antecedência do lembrete (padrão: PRAZO_LEMBRETE_HORAS).")
+@click.option("--janela", "janela_horas", type=float, default=None, help="Horas de prazos mantidas no heap (padrão: PRAZO_JANELA_HORAS).")
+@click.option("--recarga", "recarga_minutos", type=float, default=None, help="Minutos entre recargas da janela (padrão: PRAZO_RECARGA_MIN).")
+@click.option("--uma-vez", is_flag=True, help="Processa o que já venceu e sai (para cron).")
+def motor_prazos_command(horas_lembrete, janela_horas, recarga_minutos, uma_vez):
+    """Envia lembretes de prazo e marca tarefas atrasadas."""
+    cfg = current_app.config
+    motor = MotorPrazos(
+        horas_lembrete=horas_lembrete if horas_lembrete is not None else cfg["PRAZO_LEMBRETE_HORAS"],
+        janela_horas=janela_horas if janela_horas is not None else cfg["PRAZO_JANELA_HORAS"],
+        recarga_minutos=recarga_minutos if recarga_minutos is not None else cfg["PRAZO_RECARGA_MIN"],
+    )
+    while True:
+        antes = dict(motor.totais)
+        motor.tick()
+        lembretes = motor.totais[LEMBRETE] - antes[LEMBRETE]
+        atrasadas = motor.totais[VENCIMENTO] - antes[VENCIMENTO]
+        if lembretes or atrasadas or uma_vez:
+            click.echo(
+                f"[{datetime.utcnow():%Y-%m-%d %H:%M}] {lembretes} lembrete(s), "
+                f"{atrasadas} tarefa(s) atrasada(s); {len(motor.fila)} evento(s) no heap."
+            )
+        if uma_vez:
+            break
+        time.sleep(motor.segundos_ate_proximo())
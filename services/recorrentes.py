@@ -0,0 +1,137 @@
+import click
+from datetime import datetime
+from sqlalchemy import select, insert, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from extensions import db
+from models.models import (
+    Familia, Membro, Role, Tarefa, TarefaRecorrente, TaskStatus, generate_uuid
+)
+from services import resumo_familia, notificacoes, streak
+
+# ==========================================================
+# TAREFAS RECORRENTES
+# ==========================================================
+# Cada TarefaRecorrente vira, nos dias que lhe cabem, uma Tarefa por filho
+# do conjunto de executores. O gerador roda fora do horário de pico
+# (`flask gerar-recorrentes`, cron) e trabalha por lotes de definições:
+# um INSERT ... ON CONFLICT DO NOTHING por lote, uma notificação em lote e um
+# ajuste de resumo por família. O índice único (recorrencia_id, executor_id,
+# periodo) torna a geração idempotente: rodar o mesmo dia de novo não cria nada.
+# Sem --dia, o "hoje" de cada família vem do fuso dela (services/streak.py).
+
+def _inserir_sem_repetir(linhas):
+    """INSERT das ocorrências ignorando as que já existem. Retorna [(id, executor_id, titulo)] criadas."""
+    if not linhas:
+        return []
+    tabela = Tarefa.__table__
+    dialeto = db.session.get_bind().dialect.name
+    colunas = (tabela.c.id, tabela.c.executor_id, tabela.c.titulo)
+
+    if dialeto in ("postgresql", "sqlite"):
+        modulo = postgresql if dialeto == "postgresql" else sqlite
+        stmt = modulo.insert(tabela).on_conflict_do_nothing().returning(*colunas)
+        return [tuple(r) for r in db.session.execute(stmt, linhas)]
+
+    # Outros bancos: filtra as chaves já existentes antes do INSERT comum
+    chaves = {(l["recorrencia_id"], l["executor_id"], l["periodo"]) for l in linhas}
+    existentes = set(db.session.execute(
+        select(tabela.c.recorrencia_id, tabela.c.executor_id, tabela.c.periodo)
+        .where(tuple_(tabela.c.recorrencia_id, tabela.c.executor_id, tabela.c.periodo).in_(chaves))
+    ).all())
+    novas = [l for l in linhas if (l["recorrencia_id"], l["executor_id"], l["periodo"]) not in existentes]
+    if novas:
+        db.session.execute(insert(tabela), novas)
+    return [(l["id"], l["executor_id"], l["titulo"]) for l in novas]
+
+def _ocorrencias(definicao, dia, filhos):
+    if dia.weekday() not in definicao.dias_da_semana():
+        return []
+    prazo = datetime.combine(dia, definicao.horaPrazo) if definicao.horaPrazo else None
+    return [
+        dict(
+            id=generate_uuid(),
+            titulo=definicao.titulo,
+            descricao=definicao.descricao,
+            valorBase=definicao.valorBase,
+            status=TaskStatus.ATIVA,
+            exigeFoto=definicao.exigeFoto,
+            prazo=prazo,
+            prioridade=definicao.prioridade,
+            icone=definicao.icone,
+            criador_id=definicao.criador_id,
+            executor_id=executor_id,
+            recorrencia_id=definicao.id,
+            periodo=dia,
+        )
+        # Só filhos que ainda são da família (o conjunto pode ter ficado velho)
+        for executor_id in dict.fromkeys(definicao.executores or [])
+        if filhos.get(executor_id, (None, None))[0] == definicao.familia_id
+    ]
+
+def gerar(dia=None, lote=500, definicao_ids=None, expurgar=False):
+    """
+    Cria as ocorrências do dia (`dia` ou o hoje de cada família) das definições
+    ativas. Commit por lote. Retorna quantas tarefas foram criadas.
+    """
+    agora = datetime.utcnow()
+    total = 0
+    ultimo_id = None
+
+    while True:
+        consulta = (
+            select(TarefaRecorrente, Familia.fusoHorario)
+            .join(Familia, Familia.id == TarefaRecorrente.familia_id)
+            .where(TarefaRecorrente.ativa.is_(True))
+            .order_by(TarefaRecorrente.id)
+            .limit(lote)
+        )
+        if definicao_ids is not None:
+            consulta = consulta.where(TarefaRecorrente.id.in_(definicao_ids))
+        if ultimo_id is not None:
+            consulta = consulta.where(TarefaRecorrente.id > ultimo_id)
+        definicoes = db.session.execute(consulta).all()
+        if not definicoes:
+            return total
+        ultimo_id = definicoes[-1][0].id
+
+        familias = {d.familia_id for d, _ in definicoes}
+        filhos = {
+            membro_id: (familia_id, usuario_id)
+            for membro_id, familia_id, usuario_id in db.session.execute(
+                select(Membro.id, Membro.familia_id, Membro.usuario_id)
+                .where(Membro.familia_id.in_(familias), Membro.role == Role.CHILD)
+            )
+        }
+
+        linhas = []
+        for definicao, nome_fuso in definicoes:
+            dia_def = dia or streak.dia_local(agora, streak.fuso(nome_fuso))
+            linhas.extend(_ocorrencias(definicao, dia_def, filhos))
+
+        criadas = _inserir_sem_repetir(linhas)
+        notificacoes.notificar_usuarios([
+            (filhos[executor_id][1], "NOVA_TAREFA", f"Nova tarefa: {titulo}")
+            for _, executor_id, titulo in criadas
+        ])
+        por_familia = {}
+        for _, executor_id, _ in criadas:
+            familia_id = filhos[executor_id][0]
+            por_familia[familia_id] = por_familia.get(familia_id, 0) + 1
+        for familia_id, quantidade in por_familia.items():
+            resumo_familia.ajustar(familia_id, ativas=quantidade)
+
+        db.session.commit()
+        if expurgar:
+            db.session.expunge_all()
+        total += len(criadas)
+
+@click.command("gerar-recorrentes")
+@click.option("--dia", type=click.DateTime(formats=["%Y-%m-%d"]), default=None,
+              help="Dia a gerar (padrão: o dia de hoje no fuso de cada família).")
+@click.option("--lote", type=int, default=500, show_default=True, help="Definições por lote.")
+def gerar_recorrentes_command(dia, lote):
+    """Cria as tarefas do dia a partir das definições recorrentes (idempotente)."""
+    dia = dia.date() if dia else None
+    n = gerar(dia=dia, lote=lote, expurgar=True)
+    alvo = dia.isoformat() if dia else "o dia atual de cada família"
+    click.echo(f"{n} tarefa(s) recorrente(s) criada(s) para {alvo}.")
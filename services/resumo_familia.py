@@ -0,0 +1,125 @@
+import click
+from decimal import Decimal
+from datetime import datetime
+from sqlalchemy import select, update
+from sqlalchemy.sql import func
+from extensions import db
+from models.models import (
+    ResumoFamilia, Familia, Membro, Role, Carteira, Tarefa, TaskStatus,
+    Submissao, SubmissionStatus, TransactionType
+)
+from services import versao_familia
+
+# ==========================================================
+# RESUMO DA FAMÍLIA (cards do dashboard do pai)
+# ==========================================================
+# O home_parent lê uma única linha de resumo_familia em vez de somar
+# extratos e contar tarefas/submissões a cada acesso. Quem altera esses
+# números chama `ajustar` (deltas atômicos "col = col + :d") na mesma
+# transação da própria alteração. O saldo de cada filho não é copiado para
+# cá: `saldo_a_pagar` soma Carteira.saldo (uma linha por filho, mantida pelo
+# UPDATE atômico do extrato), então dois lançamentos simultâneos não se perdem.
+
+def _calcular(familia_id):
+    """Calcula todos os campos do resumo direto das tabelas de origem."""
+    filhos = select(Membro.id).where(Membro.familia_id == familia_id, Membro.role == Role.CHILD)
+
+    prometido, pago = db.session.execute(
+        select(
+            func.coalesce(func.sum(Carteira.totalTarefas + Carteira.totalMesada), 0),
+            func.coalesce(func.sum(Carteira.totalPago), 0),
+        ).where(Carteira.membro_id.in_(filhos))
+    ).one()
+
+    pendentes = db.session.scalar(
+        select(func.count(Submissao.id)).join(Tarefa).where(
+            Tarefa.executor_id.in_(filhos),
+            Submissao.status == SubmissionStatus.PENDING,
+        )
+    )
+    ativas = db.session.scalar(
+        select(func.count(Tarefa.id)).where(
+            Tarefa.executor_id.in_(filhos),
+            Tarefa.status.in_(TaskStatus.ABERTAS),
+        )
+    )
+    return dict(
+        totalPrometido=Decimal(prometido),
+        totalPago=Decimal(pago),
+        avaliacoesPendentes=pendentes or 0,
+        tarefasAtivas=ativas or 0,
+    )
+
+def recalcular(familia_id):
+    """Recria o resumo da família a partir das tabelas de origem (não faz commit)."""
+    db.session.flush()
+    campos = _calcular(familia_id)
+    resumo = db.session.get(ResumoFamilia, familia_id)
+    if resumo is None:
+        resumo = ResumoFamilia(familia_id=familia_id)
+        db.session.add(resumo)
+    for chave, valor in campos.items():
+        setattr(resumo, chave, valor)
+    resumo.atualizadoEm = datetime.utcnow()
+    versao_familia.tocar(familia_id)
+    return resumo
+
+def obter(familia_id):
+    """Resumo da família; na primeira leitura é calculado e gravado."""
+    resumo = db.session.get(ResumoFamilia, familia_id)
+    if resumo is None:
+        resumo = recalcular(familia_id)
+        db.session.commit()
+    return resumo
+
+def ajustar(familia_id, prometido=0, pago=0, pendentes=0, ativas=0):
+    """Soma deltas aos contadores do resumo (não faz commit)."""
+    if not (prometido or pago or pendentes or ativas):
+        return
+    resultado = db.session.execute(
+        update(ResumoFamilia)
+        .where(ResumoFamilia.familia_id == familia_id)
+        .values(
+            totalPrometido=ResumoFamilia.totalPrometido + Decimal(prometido),
+            totalPago=ResumoFamilia.totalPago + Decimal(pago),
+            avaliacoesPendentes=ResumoFamilia.avaliacoesPendentes + pendentes,
+            tarefasAtivas=ResumoFamilia.tarefasAtivas + ativas,
+            atualizadoEm=datetime.utcnow(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if resultado.rowcount == 0:
+        # Família ainda sem resumo: o cálculo completo já inclui esta alteração.
+        recalcular(familia_id)
+    else:
+        versao_familia.tocar(familia_id)
+
+def registrar_lancamento(carteira, tipo, valor):
+    """Chamado pelo extrato a cada Transacao: reflete o lançamento no resumo da família."""
+    membro = carteira.membro or db.session.get(Membro, carteira.membro_id)
+    if not membro or membro.role != Role.CHILD:
+        return
+    if tipo in (TransactionType.CREDIT_TASK, TransactionType.CREDIT_ALLOWANCE):
+        ajustar(membro.familia_id, prometido=valor)
+    elif tipo == TransactionType.DEBIT_PAYMENT:
+        ajustar(membro.familia_id, pago=valor)
+    else:
+        versao_familia.tocar(membro.familia_id)  # só o saldo mudou: o ETag do dashboard também
+
+def saldo_a_pagar(familia_id):
+    """Soma dos saldos atuais das carteiras dos filhos da família."""
+    total = db.session.scalar(
+        select(func.coalesce(func.sum(Carteira.saldo), 0))
+        .join(Membro, Carteira.membro_id == Membro.id)
+        .where(Membro.familia_id == familia_id, Membro.role == Role.CHILD)
+    )
+    return Decimal(total).quantize(Decimal("0.01"))
+
+@click.command("recalcular-resumos")
+def recalcular_resumos_command():
+    """Recalcula o resumo do dashboard de todas as famílias."""
+    ids = db.session.scalars(select(Familia.id)).all()
+    for familia_id in ids:
+        recalcular(familia_id)
+    db.session.commit()
+    click.echo(f"{len(ids)} resumo(s) de família recalculado(s).")
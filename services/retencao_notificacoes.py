@@ -0,0 +1,239 @@
+import time
+import click
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, delete, insert, update, or_, and_
+from extensions import db
+from models.models import (
+    Notificacao, NotificacaoFamilia, NotificacaoArquivo, LeituraNotificacao, Membro, generate_uuid
+)
+
+# ==========================================================
+# RETENÇÃO DE NOTIFICAÇÕES
+# ==========================================================
+# Roda fora das requisições (cron / `flask limpar-notificacoes --a-cada N`).
+# 1. Pessoais lidas há mais de NOTIF_RETENCAO_DIAS: arquivadas ou apagadas.
+# 2. Pessoais NÃO lidas há mais de NOTIF_RESUMO_DIAS: viram uma única
+#    notificação de resumo por usuário ("N notificações antigas...").
+# 3. Avisos da família há mais de NOTIF_RETENCAO_DIAS: saem; quem ainda não
+#    tinha lido entra no mesmo resumo.
+# Tudo em lotes de NOTIF_LIMPEZA_LOTE com commit por lote, para não segurar
+# locks longos em cima da tabela que as homes leem. O resumo de cada usuário
+# é criado/atualizado no mesmo commit do lote que apagou as linhas dele: se a
+# limpeza parar no meio, nada sai da tabela sem estar contado num resumo.
+
+TIPO_RESUMO = "RESUMO_ANTIGAS"
+
+def _tamanho_estimado(n):
+    """Bytes aproximados de uma linha (conteúdo das colunas, sem overhead de página)."""
+    textos = (n.tipo or "") + (n.mensagem or "")
+    return len(textos.encode("utf-8")) + 2 * 36 + 2 * 8
+
+class Relatorio:
+    def __init__(self):
+        self.pessoais = 0
+        self.avisos = 0
+        self.resumidas = 0
+        self.resumos_criados = 0
+        self.bytes = 0
+        self.lotes = 0
+
+    def linhas(self):
+        return self.pessoais + self.avisos + self.resumidas
+
+class LimpezaNotificacoes:
+    def __init__(self, dias_retencao, dias_resumo, modo="arquivar", lote=500, pausa=0.0, agora=None):
+        agora = agora or datetime.utcnow()
+        self.corte_lidas = agora - timedelta(days=dias_retencao)
+        self.corte_resumo = agora - timedelta(days=dias_resumo)
+        self.modo = modo
+        self.lote = lote
+        self.pausa = pausa
+        self.relatorio = Relatorio()
+        self._resumos = {}  # usuario_id -> quantidade já resumida nesta execução
+        self._ids_resumo = {}  # usuario_id -> id da notificação de resumo desta execução
+        self._lote_resumos = {}  # usuario_id -> quantidade do lote em andamento
+
+    # --- remoção comum ---
+
+    def _retirar(self, modelo, linhas, origem):
+        if not linhas:
+            return
+        if self.modo == "arquivar":
+            db.session.execute(insert(NotificacaoArquivo), [
+                dict(
+                    id=n.id, origem=origem, tipo=n.tipo, mensagem=n.mensagem,
+                    enviadaEm=n.enviadaEm, lidaEm=getattr(n, "lidaEm", None),
+                    usuario_id=getattr(n, "usuario_id", None),
+                    familia_id=getattr(n, "familia_id", None),
+                    publico=getattr(n, "publico", None),
+                )
+                for n in linhas
+            ])
+        db.session.execute(
+            delete(modelo).where(modelo.id.in_([n.id for n in linhas])),
+            execution_options={"synchronize_session": False}
+        )
+        self.relatorio.bytes += sum(_tamanho_estimado(n) for n in linhas)
+
+    def _fechar_lote(self):
+        self._gravar_resumos()
+        db.session.commit()
+        db.session.expunge_all()
+        self.relatorio.lotes += 1
+        if self.pausa:
+            time.sleep(self.pausa)
+
+    def _somar_resumo(self, usuario_id, quantidade):
+        if quantidade > 0:
+            self._lote_resumos[usuario_id] = self._lote_resumos.get(usuario_id, 0) + quantidade
+
+    @staticmethod
+    def _mensagem_resumo(quantidade):
+        return f"{quantidade} notificação(ões) antiga(s) não lida(s) foram arquivadas."
+
+    def _gravar_resumos(self):
+        """Cria ou atualiza o resumo de quem teve linhas no lote (entra no commit do lote)."""
+        for usuario_id, quantidade in self._lote_resumos.items():
+            total = self._resumos.get(usuario_id, 0) + quantidade
+            self._resumos[usuario_id] = total
+            resumo_id = self._ids_resumo.get(usuario_id)
+            if resumo_id:
+                db.session.execute(
+                    update(Notificacao)
+                    .where(Notificacao.id == resumo_id)
+                    .values(mensagem=self._mensagem_resumo(total)),
+                    execution_options={"synchronize_session": False}
+                )
+                continue
+            self._ids_resumo[usuario_id] = generate_uuid()
+            db.session.add(Notificacao(
+                id=self._ids_resumo[usuario_id], tipo=TIPO_RESUMO,
+                mensagem=self._mensagem_resumo(total), usuario_id=usuario_id
+            ))
+            self.relatorio.resumos_criados += 1
+        self._lote_resumos.clear()
+
+    # --- etapas ---
+
+    def pessoais_lidas(self):
+        while True:
+            linhas = db.session.scalars(
+                select(Notificacao)
+                .outerjoin(LeituraNotificacao, LeituraNotificacao.usuario_id == Notificacao.usuario_id)
+                .where(
+                    Notificacao.enviadaEm < self.corte_lidas,
+                    or_(
+                        Notificacao.lidaEm.is_not(None),
+                        Notificacao.enviadaEm <= LeituraNotificacao.lidoAte
+                    )
+                )
+                .limit(self.lote)
+            ).all()
+            if not linhas:
+                return
+            self._retirar(Notificacao, linhas, "PESSOAL")
+            self.relatorio.pessoais += len(linhas)
+            self._fechar_lote()
+
+    def pessoais_nao_lidas(self):
+        while True:
+            linhas = db.session.scalars(
+                select(Notificacao)
+                .outerjoin(LeituraNotificacao, LeituraNotificacao.usuario_id == Notificacao.usuario_id)
+                .where(
+                    Notificacao.enviadaEm < self.corte_resumo,
+                    Notificacao.lidaEm.is_(None),
+                    Notificacao.tipo != TIPO_RESUMO,
+                    or_(
+                        LeituraNotificacao.lidoAte.is_(None),
+                        Notificacao.enviadaEm > LeituraNotificacao.lidoAte
+                    )
+                )
+                .limit(self.lote)
+            ).all()
+            if not linhas:
+                return
+            for n in linhas:
+                self._somar_resumo(n.usuario_id, 1)
+            self._retirar(Notificacao, linhas, "PESSOAL")
+            self.relatorio.resumidas += len(linhas)
+            self._fechar_lote()
+
+    def avisos_familia(self):
+        while True:
+            linhas = db.session.scalars(
+                select(NotificacaoFamilia)
+                .where(NotificacaoFamilia.enviadaEm < self.corte_lidas)
+                .order_by(NotificacaoFamilia.enviadaEm)
+                .limit(self.lote)
+            ).all()
+            if not linhas:
+                return
+
+            # Quem do público ainda não tinha lido (cursor antes do aviso) ganha no resumo
+            grupos = {}
+            for aviso in linhas:
+                grupos.setdefault((aviso.familia_id, aviso.publico), []).append((aviso.enviadaEm, aviso.id))
+            for (familia_id, publico), avisos in grupos.items():
+                destinatarios = db.session.execute(
+                    select(Membro.usuario_id, Membro.entradaEm, LeituraNotificacao.lidoAte, LeituraNotificacao.avisosLidos)
+                    .outerjoin(LeituraNotificacao, LeituraNotificacao.usuario_id == Membro.usuario_id)
+                    .where(and_(Membro.familia_id == familia_id, Membro.role == publico))
+                ).all()
+                for usuario_id, entrada, lido_ate, avisos_lidos in destinatarios:
+                    cursor, lidos = lido_ate or entrada, set(avisos_lidos or ())
+                    self._somar_resumo(usuario_id, sum(1 for d, i in avisos if d > cursor and i not in lidos))
+
+            self._retirar(NotificacaoFamilia, linhas, "FAMILIA")
+            self.relatorio.avisos += len(linhas)
+            self._fechar_lote()
+
+    def executar(self):
+        self.pessoais_lidas()
+        self.pessoais_nao_lidas()
+        self.avisos_familia()
+        return self.relatorio
+
+def _paginas_livres_sqlite():
+    if db.engine.dialect.name != "sqlite":
+        return None
+    with db.engine.connect() as conn:
+        livres = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+        pagina = conn.exec_driver_sql("PRAGMA page_size").scalar()
+    return livres * pagina
+
+@click.command("limpar-notificacoes")
+@click.option("--dias", type=int, default=None, help="Retenção das lidas (padrão: NOTIF_RETENCAO_DIAS).")
+@click.option("--dias-resumo", type=int, default=None, help="Idade das não lidas que viram resumo (padrão: NOTIF_RESUMO_DIAS).")
+@click.option("--modo", type=click.Choice(["arquivar", "apagar"]), default=None)
+@click.option("--lote", type=int, default=None)
+@click.option("--pausa", type=float, default=0.0, help="Segundos de pausa entre lotes.")
+@click.option("--a-cada", "a_cada", type=int, default=0, help="Repete a cada N minutos (0 = roda uma vez).")
+def limpar_notificacoes_command(dias, dias_resumo, modo, lote, pausa, a_cada):
+    """Arquiva/apaga notificações antigas e resume as não lidas."""
+    cfg = current_app.config
+    while True:
+        livres_antes = _paginas_livres_sqlite()
+        inicio = time.perf_counter()
+        rel = LimpezaNotificacoes(
+            dias_retencao=dias if dias is not None else cfg["NOTIF_RETENCAO_DIAS"],
+            dias_resumo=dias_resumo if dias_resumo is not None else cfg["NOTIF_RESUMO_DIAS"],
+            modo=modo or cfg["NOTIF_LIMPEZA_MODO"],
+            lote=lote or cfg["NOTIF_LIMPEZA_LOTE"],
+            pausa=pausa,
+        ).executar()
+        livres_depois = _paginas_livres_sqlite()
+
+        click.echo(
+            f"[{datetime.utcnow():%Y-%m-%d %H:%M}] {rel.linhas()} linha(s) em {rel.lotes} lote(s) "
+            f"({time.perf_counter() - inicio:.1f}s): {rel.pessoais} lidas, {rel.resumidas} não lidas "
+            f"resumidas, {rel.avisos} avisos de família; {rel.resumos_criados} resumo(s) criado(s); "
+            f"~{rel.bytes / 1024:.1f} KiB de dados fora da tabela quente."
+        )
+        if livres_antes is not None:
+            click.echo(f"SQLite: {(livres_depois - livres_antes) / 1024:.1f} KiB de páginas liberadas para reuso.")
+
+        if not a_cada:
+            break
+        time.sleep(a_cada * 60)
@@ -0,0 +1,69 @@
+import click
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import Index, select, delete
+from extensions import db, sess
+
+# ==========================================================
+# BACKEND DA SESSÃO
+# ==========================================================
+# O login guarda só meia dúzia de ids e o nome, então o padrão é o cookie
+# assinado do próprio Flask: nenhuma leitura/escrita no servidor e funciona
+# igual em qualquer worker/host (basta o mesmo SECRET_KEY).
+# Com SESSION_BACKEND="banco" a sessão vai para a tabela `sessao` do
+# Flask-Session: uma busca por session_id (único) por requisição, gravação só
+# quando a sessão muda, e as expiradas saem por `flask purgar-sessoes`.
+
+BACKENDS = ("cookie", "banco", "filesystem")
+
+def configurar_sessao(app):
+    backend = app.config.get("SESSION_BACKEND", "cookie")
+    if backend not in BACKENDS:
+        raise RuntimeError(f"SESSION_BACKEND inválido: {backend!r} (use {', '.join(BACKENDS)})")
+
+    if backend == "cookie":
+        return  # SecureCookieSessionInterface padrão do Flask
+
+    if backend == "filesystem":
+        app.config["SESSION_TYPE"] = "filesystem"
+        sess.init_app(app)
+        return
+
+    app.config["SESSION_TYPE"] = "sqlalchemy"
+    app.config["SESSION_SQLALCHEMY"] = db
+    sess.init_app(app)
+
+    # A tabela só existe com este backend ligado, por isso o índice de
+    # expiração é garantido aqui e não numa migração.
+    tabela = _modelo_sessao(app).__table__
+    indice = Index(f"ix_{tabela.name}_expiry", tabela.c.expiry)
+    with app.app_context():
+        indice.create(db.engine, checkfirst=True)
+
+def _modelo_sessao(app):
+    return getattr(app.session_interface, "sql_session_model", None)
+
+def purgar_expiradas(modelo, lote=1000, agora=None):
+    """Apaga as sessões vencidas em lotes (usa o índice de expiry). Retorna o total."""
+    agora = agora or datetime.utcnow()
+    total = 0
+    while True:
+        ids = db.session.scalars(
+            select(modelo.id).where(modelo.expiry <= agora).limit(lote)
+        ).all()
+        if not ids:
+            return total
+        db.session.execute(delete(modelo).where(modelo.id.in_(ids)))
+        db.session.commit()
+        total += len(ids)
+
+@click.command("purgar-sessoes")
+@click.option("--lote", type=int, default=1000, show_default=True)
+def purgar_sessoes_command(lote):
+    """Remove as sessões expiradas da tabela `sessao` (SESSION_BACKEND=banco)."""
+    modelo = _modelo_sessao(current_app)
+    if modelo is None:
+        click.echo(f"SESSION_BACKEND={current_app.config['SESSION_BACKEND']}: nada para purgar.")
+        return
+    n = purgar_expiradas(modelo, lote=lote)
+    click.echo(f"{n} sessão(ões) expirada(s) removida(s).")
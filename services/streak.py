@@ -0,0 +1,102 @@
+import click
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from sqlalchemy import select, update, bindparam
+from extensions import db
+from models.models import Progresso, Membro, Familia, Tarefa, Submissao, SubmissionStatus
+
+# ==========================================================
+# STREAK (dias seguidos com tarefa aprovada)
+# ==========================================================
+# Definição única usada pelo perfil e pela home do filho:
+# - o "dia" é a data local da aprovação no fuso da família (Familia.fusoHorario);
+# - o streak segue vivo enquanto o último dia ativo for hoje ou ontem.
+# O estado fica no Progresso (streakAtual, melhorStreak, ultimoDiaAtivo) e é
+# atualizado em O(1) a cada aprovação. `flask recalcular-streaks` refaz tudo
+# a partir das submissões aprovadas (dados antigos ou troca de fuso).
+
+FUSO_PADRAO = "America/Sao_Paulo"
+
+def fuso(nome):
+    """ZoneInfo do nome IANA; sem base de fusos (ou nome inválido) cai para UTC."""
+    try:
+        return ZoneInfo(nome or FUSO_PADRAO)
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone.utc
+
+def dia_local(momento, tz):
+    """Data local de um datetime UTC ingênuo (como os gravados pelo app)."""
+    return momento.replace(tzinfo=timezone.utc).astimezone(tz).date()
+
+def registrar_atividade(progresso, momento, tz):
+    """Conta a aprovação em `momento` no streak do progresso (não faz commit)."""
+    dia = dia_local(momento, tz)
+    ultimo = progresso.ultimoDiaAtivo
+
+    if ultimo is not None and dia <= ultimo:
+        return  # mesmo dia (ou aprovação fora de ordem): nada muda
+    if ultimo is not None and dia - ultimo == timedelta(days=1):
+        progresso.streakAtual = (progresso.streakAtual or 0) + 1
+    else:
+        progresso.streakAtual = 1
+
+    progresso.ultimoDiaAtivo = dia
+    progresso.melhorStreak = max(progresso.melhorStreak or 0, progresso.streakAtual)
+
+def streak_vigente(progresso, tz, agora=None):
+    """(ativo, dias): o streak só vale se o último dia ativo for hoje ou ontem."""
+    if not progresso or progresso.ultimoDiaAtivo is None:
+        return False, 0
+    hoje = dia_local(agora or datetime.utcnow(), tz)
+    if hoje - progresso.ultimoDiaAtivo <= timedelta(days=1):
+        return True, progresso.streakAtual or 0
+    return False, 0
+
+# --- Recalcular a partir das submissões ---
+
+def _sequencias(dias):
+    """(atual, melhor, ultimo) de uma lista ordenada de datas distintas."""
+    atual = melhor = 0
+    anterior = None
+    for dia in dias:
+        atual = atual + 1 if anterior and dia - anterior == timedelta(days=1) else 1
+        melhor = max(melhor, atual)
+        anterior = dia
+    return atual, melhor, anterior
+
+def recalcular_streaks(conn):
+    """Reescreve o streak de todos os progressos a partir das aprovações. Retorna quantos."""
+    consulta = (
+        select(Tarefa.executor_id, Submissao.aprovadaEm, Familia.fusoHorario)
+        .join(Submissao, Submissao.tarefa_id == Tarefa.id)
+        .join(Membro, Membro.id == Tarefa.executor_id)
+        .join(Familia, Familia.id == Membro.familia_id)
+        .where(Submissao.status == SubmissionStatus.APPROVED, Submissao.aprovadaEm.is_not(None))
+    )
+    dias_por_membro = {}
+    fusos = {}
+    for membro_id, aprovada_em, nome_fuso in conn.execute(consulta):
+        tz = fusos.setdefault(nome_fuso, fuso(nome_fuso))
+        dias_por_membro.setdefault(membro_id, set()).add(dia_local(aprovada_em, tz))
+
+    tabela = Progresso.__table__
+    linhas = []
+    for (membro_id,) in conn.execute(select(tabela.c.membro_id)):
+        atual, melhor, ultimo = _sequencias(sorted(dias_por_membro.get(membro_id, ())))
+        linhas.append({"_membro": membro_id, "_atual": atual, "_melhor": melhor, "_ultimo": ultimo})
+    if linhas:
+        conn.execute(
+            update(tabela)
+            .where(tabela.c.membro_id == bindparam("_membro"))
+            .values(streakAtual=bindparam("_atual"), melhorStreak=bindparam("_melhor"),
+                    ultimoDiaAtivo=bindparam("_ultimo")),
+            linhas,
+        )
+    return len(linhas)
+
+@click.command("recalcular-streaks")
+def recalcular_streaks_command():
+    """Recalcula o streak de todos os filhos a partir das submissões aprovadas."""
+    with db.engine.begin() as conn:
+        n = recalcular_streaks(conn)
+    click.echo(f"{n} progresso(s) recalculado(s).")
@@ -0,0 +1,38 @@
+from sqlalchemy import select, insert
+from extensions import db
+from models.models import Membro, Role, Tarefa, TaskStatus, generate_uuid
+from services import resumo_familia, notificacoes
+
+# ==========================================================
+# CRIAÇÃO DE TAREFAS EM LOTE
+# ==========================================================
+# Uma tarefa por (modelo, filho): todas as Tarefas num INSERT em lote, as
+# notificações "NOVA_TAREFA" em outro e o resumo ajustado uma vez. O commit
+# fica com a rota, então o formulário e o JSON fecham tudo numa transação só.
+
+def filhos_da_familia(familia_id):
+    """{membro_id: usuario_id} dos filhos da família."""
+    return dict(db.session.execute(
+        select(Membro.id, Membro.usuario_id)
+        .where(Membro.familia_id == familia_id, Membro.role == Role.CHILD)
+    ).all())
+
+def criar_em_lote(pai, itens, filhos):
+    """
+    `itens`: dicts com os campos da Tarefa + executor_id (já validado contra
+    `filhos`). Não faz commit. Retorna os ids criados, na ordem dos itens.
+    """
+    linhas = [
+        dict(item, id=generate_uuid(), status=TaskStatus.ATIVA, criador_id=pai.id)
+        for item in itens
+    ]
+    if not linhas:
+        return []
+
+    db.session.execute(insert(Tarefa), linhas)
+    notificacoes.notificar_usuarios([
+        (filhos[linha["executor_id"]], "NOVA_TAREFA", f"Nova tarefa: {linha['titulo']}")
+        for linha in linhas
+    ])
+    resumo_familia.ajustar(pai.familia_id, ativas=len(linhas))
+    return [linha["id"] for linha in linhas]
@@ -0,0 +1,75 @@
+import hashlib
+from datetime import datetime
+from functools import wraps
+from flask import request, session, g, make_response, current_app
+from sqlalchemy import select, update
+from extensions import db
+from models.models import Familia, Membro
+from services import streak, armazenamento
+
+# ==========================================================
+# VERSÃO DA FAMÍLIA + ETAG DOS DASHBOARDS
+# ==========================================================
+# Familia.versao só cresce: toda escrita que muda o que os pais veem soma 1
+# (resumo_familia e as funções de services/notificacoes.py já chamam
+# `tocar`/`tocar_usuarios`; as demais rotas chamam direto). Os dashboards decorados com `@com_etag` respondem com um
+# ETag = versão + membro + dia local + versão do app (+ janela das URLs
+# assinadas do armazenamento, se houver); num GET condicional
+# com o mesmo ETag voltam 304 sem consultar listas nem renderizar o Jinja.
+# Página com flash pendente nunca vira 304 (a mensagem sumiria).
+
+def tocar(*familia_ids):
+    """Incrementa a versão das famílias (não faz commit)."""
+    ids = {f for f in familia_ids if f}
+    if ids:
+        db.session.execute(
+            update(Familia)
+            .where(Familia.id.in_(ids))
+            .values(versao=Familia.versao + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+def tocar_usuarios(*usuario_ids):
+    """Incrementa a versão das famílias em que os usuários são membros (um UPDATE, sem commit)."""
+    ids = {u for u in usuario_ids if u}
+    if ids:
+        db.session.execute(
+            update(Familia)
+            .where(Familia.id.in_(select(Membro.familia_id).where(Membro.usuario_id.in_(ids))))
+            .values(versao=Familia.versao + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+def atual(familia_id):
+    return db.session.scalar(select(Familia.versao).where(Familia.id == familia_id)) or 0
+
+def _etag(membro):
+    fam = db.session.execute(
+        select(Familia.versao, Familia.fusoHorario).where(Familia.id == membro.familia_id)
+    ).one()
+    hoje = streak.dia_local(datetime.utcnow(), streak.fuso(fam.fusoHorario))
+    base = (
+        f"{current_app.config['ETAG_VERSAO_APP']}:{request.path}:{membro.id}:{fam.versao or 0}:{hoje}"
+        f":{armazenamento.atual().marca_cache()}"
+    )
+    return hashlib.sha1(base.encode()).hexdigest()
+
+def com_etag(view):
+    """GET condicional para telas que só dependem dos dados da família. Use abaixo de @exige_papel."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        membro = g.get("membro")
+        if request.method != "GET" or membro is None or session.get("_flashes"):
+            return view(*args, **kwargs)
+
+        etag = _etag(membro)
+        if request.if_none_match.contains_weak(etag):
+            resposta = make_response("", 304)
+        else:
+            resposta = make_response(view(*args, **kwargs))
+            if resposta.status_code != 200:
+                return resposta
+        resposta.set_etag(etag)
+        resposta.headers["Cache-Control"] = "private, no-cache"
+        return resposta
+    return wrapper
@@ -0,0 +1,31 @@
+// static/js/batch_select.js
+document.addEventListener('DOMContentLoaded', function() {
+
+    const form = document.getElementById('batch-form');
+    const selectAll = document.getElementById('batch-select-all');
+    if (!form || !selectAll) {
+        return;
+    }
+
+    const checks = form.querySelectorAll('.batch-check');
+
+    // 1. "Selecionar todas" marca/desmarca todos os cards
+    selectAll.addEventListener('change', () => {
+        checks.forEach(check => { check.checked = selectAll.checked; });
+    });
+
+    // 2. Mantém o "Selecionar todas" coerente com os cards marcados
+    checks.forEach(check => {
+        check.addEventListener('change', () => {
+            selectAll.checked = Array.from(checks).every(c => c.checked);
+        });
+    });
+
+    // 3. Não envia o lote vazio
+    form.addEventListener('submit', (event) => {
+        if (!Array.from(checks).some(c => c.checked)) {
+            event.preventDefault();
+            alert('Selecione ao menos uma tarefa.');
+        }
+    });
+});
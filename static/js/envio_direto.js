@@ -0,0 +1,45 @@
+// static/js/envio_direto.js
+// Envio direto ao bucket (armazenamento S3): o formulário com
+// data-envio-direto pede um POST pré-assinado, manda o arquivo para lá e
+// segue para o Flask só com a chave (campo chave_envio).
+// Qualquer falha no caminho: o formulário vai do jeito normal, com o arquivo.
+document.addEventListener('DOMContentLoaded', function() {
+
+    document.querySelectorAll('form[data-envio-direto]').forEach(form => {
+        form.addEventListener('submit', async function(evento) {
+            const input = form.querySelector('input[type="file"]');
+            if (!input || input.files.length === 0) {
+                return;
+            }
+            evento.preventDefault();
+
+            try {
+                const resposta = await fetch(form.dataset.envioDireto, { credentials: 'same-origin' });
+                const envio = await resposta.json();
+
+                if (envio.url) {
+                    const dados = new FormData();
+                    Object.entries(envio.campos).forEach(([nome, valor]) => dados.append(nome, valor));
+                    dados.append('file', input.files[0]); // o S3 exige o arquivo por último
+
+                    const upload = await fetch(envio.url, { method: 'POST', body: dados });
+                    if (!upload.ok) {
+                        throw new Error('bucket respondeu ' + upload.status);
+                    }
+
+                    const campo = document.createElement('input');
+                    campo.type = 'hidden';
+                    campo.name = 'chave_envio';
+                    campo.value = envio.chave;
+                    form.appendChild(campo);
+                    input.disabled = true; // o arquivo não passa de novo pelo servidor
+                }
+            } catch (e) {
+                console.error('Envio direto falhou, enviando pelo servidor:', e);
+            }
+
+            // submit() não dispara este evento de novo
+            form.submit();
+        });
+    });
+});
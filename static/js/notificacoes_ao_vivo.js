@@ -0,0 +1,101 @@
+// Notificações ao vivo (Server-Sent Events em /home/eventos).
+// A página liga com <body data-eventos-url="..."> e, se as notificações
+// contam como lidas ao aparecer (home do filho), data-lidas-url="...".
+// - event "contagem":    atualiza todo [data-nao-lidas] (badge);
+// - event "notificacao": mostra um toast no #toast-container.
+// O EventSource reconecta sozinho (Last-Event-ID) quando o servidor fecha.
+document.addEventListener('DOMContentLoaded', () => {
+    const url = document.body.dataset.eventosUrl;
+    if (!url || !window.EventSource) return;
+    const lidasUrl = document.body.dataset.lidasUrl;
+
+    // Mesmo visual do feed renderizado no servidor
+    const ESTILOS = {
+        TAREFA_APROVADA: ['success', 'fa-circle-check', '#22c55e'],
+        RECOMPENSA_ENTREGUE: ['success', 'fa-gift', '#f59e0b'],
+        NOVA_TAREFA: ['info', 'fa-clipboard-list', '#3b82f6'],
+        TAREFA_PENDENTE: ['info', 'fa-camera', '#3b82f6'],
+        TAREFA_REJEITADA: ['danger', 'fa-circle-xmark', '#ef4444'],
+        RECOMPENSA_REJEITADA: ['danger', 'fa-circle-xmark', '#ef4444'],
+        FOTO_RECUSADA: ['danger', 'fa-image', '#ef4444'],
+        TAREFA_ATRASADA: ['warn', 'fa-clock', '#f59e0b'],
+        PRAZO_PROXIMO: ['warn', 'fa-hourglass-half', '#f59e0b'],
+    };
+
+    function container() {
+        let el = document.getElementById('toast-container');
+        if (!el) {
+            el = document.createElement('div');
+            el.id = 'toast-container';
+            document.querySelector('.phone').appendChild(el);
+        }
+        return el;
+    }
+
+    function esconderDepois(toast, ms) {
+        setTimeout(() => {
+            toast.classList.add('hiding');
+            toast.addEventListener('animationend', () => {
+                const pai = toast.parentElement;
+                toast.remove();
+                if (pai && pai.children.length === 0) pai.remove();
+            });
+        }, ms);
+    }
+
+    function mostrar(n) {
+        const [classe, icone, cor] = ESTILOS[n.tipo] || ['info', 'fa-comment-dots', '#64748b'];
+        const toast = document.createElement('div');
+        toast.className = `toast-notification ${classe}`;
+
+        const caixaIcone = document.createElement('div');
+        caixaIcone.className = 'toast-icon';
+        const i = document.createElement('i');
+        i.className = `fa-solid ${icone}`;
+        i.style.color = cor;
+        caixaIcone.appendChild(i);
+
+        const conteudo = document.createElement('div');
+        conteudo.className = 'toast-content';
+        const msg = document.createElement('div');
+        msg.className = 'toast-msg';
+        msg.textContent = n.mensagem;   // texto puro: nada de HTML vindo do servidor
+        const hora = document.createElement('div');
+        hora.className = 'toast-time';
+        hora.textContent = 'Agora';
+        conteudo.append(msg, hora);
+
+        toast.append(caixaIcone, conteudo);
+        container().appendChild(toast);
+        esconderDepois(toast, 8000);
+    }
+
+    function atualizarBadge(total) {
+        document.querySelectorAll('[data-nao-lidas]').forEach(el => {
+            el.textContent = total > 99 ? '99+' : total;
+            el.hidden = total === 0;
+        });
+    }
+
+    // Marca como lidas em lote (uma requisição por rajada de toasts)
+    let lidoAte = null;
+    let agendado = null;
+    function marcarLida(quando) {
+        if (!lidasUrl) return;
+        if (!lidoAte || quando > lidoAte) lidoAte = quando;
+        if (agendado) return;
+        agendado = setTimeout(() => {
+            agendado = null;
+            fetch(lidasUrl, { method: 'POST', body: new URLSearchParams({ ate: lidoAte }), credentials: 'same-origin' });
+        }, 1000);
+    }
+
+    const fonte = new EventSource(url);
+    fonte.addEventListener('contagem', e => atualizarBadge(JSON.parse(e.data).naoLidas));
+    fonte.addEventListener('notificacao', e => {
+        const n = JSON.parse(e.data);
+        mostrar(n);
+        marcarLida(n.enviadaEm);
+    });
+    window.addEventListener('pagehide', () => fonte.close());
+});
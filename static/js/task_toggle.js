@@ -92,8 +92,12 @@ document.addEventListener('DOMContentLoaded', function() {
                         if(cancelBtn) cancelBtn.style.display = 'none';
                     }
 
-                    // 5. Envia o formulário
-                    form.submit();
+                    // 5. Envia o formulário (requestSubmit passa pelo envio direto, se houver)
+                    if (form.requestSubmit) {
+                        form.requestSubmit();
+                    } else {
+                        form.submit();
+                    }
                 }
             }
         });
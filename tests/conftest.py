@@ -0,0 +1,76 @@
+import os
+import tempfile
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+# app.py monta um app ao ser importado: que ele não toque no app.db local
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="taskpay-"), "importacao.db")
+
+from app import create_app
+from config import Config
+from extensions import db
+from services import armazenamento as _armazenamento
+from models.models import Usuario, Familia, Membro, Carteira, Role, Tarefa, Submissao, SubmissionStatus, generate_uuid
+
+# ==========================================================
+# FIXTURES DOS TESTES
+# ==========================================================
+# Cada teste sobe o app num SQLite próprio (tmp_path) com a fila em modo
+# 'worker': nada roda sozinho, o teste chama os jobs quando quiser.
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / 'teste.db'}")
+    monkeypatch.setattr(Config, "UPLOAD_QUARENTENA", str(tmp_path / "quarentena"))
+    monkeypatch.setattr(Config, "UPLOAD_TEMPORARIOS", str(tmp_path / "tmp"))
+    monkeypatch.setattr(Config, "UPLOAD_ENTRADA", str(tmp_path / "entrada"))
+    monkeypatch.setattr(Config, "JOBS_MODO", "worker")
+    monkeypatch.setattr(Config, "EVENTOS_BACKEND", "memoria")
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+@pytest.fixture
+def familia(app):
+    """Uma família com um pai e um filho (com carteira zerada)."""
+    fam = Familia(id=generate_uuid(), nome="Família Teste")
+    pai_u = Usuario(id=generate_uuid(), nome="Pai", email="pai@teste.com")
+    filho_u = Usuario(id=generate_uuid(), nome="Filho", email="filho@teste.com")
+    pai = Membro(id=generate_uuid(), role=Role.PARENT, usuario=pai_u, familia=fam)
+    filho = Membro(id=generate_uuid(), role=Role.CHILD, usuario=filho_u, familia=fam)
+    filho.carteira = Carteira(id=generate_uuid(), saldo=Decimal("0.00"))
+    db.session.add_all([fam, pai_u, filho_u, pai, filho])
+    db.session.commit()
+    return SimpleNamespace(familia=fam, pai=pai, filho=filho)
+
+@pytest.fixture
+def armazenamento(app, tmp_path):
+    """Backend local numa pasta temporária (nada é gravado no static/ do repositório)."""
+    backend = _armazenamento.ArmazenamentoLocal(
+        str(tmp_path / "static"), str(tmp_path / "quarentena"), str(tmp_path / "entrada")
+    )
+    app.extensions["armazenamento"] = backend
+    return backend
+
+def criar_submissao(familia, status=SubmissionStatus.PENDING, valor="5.00", titulo="Lavar a louça"):
+    tarefa = Tarefa(
+        id=generate_uuid(), titulo=titulo, valorBase=Decimal(valor),
+        criador_id=familia.pai.id, executor_id=familia.filho.id,
+    )
+    submissao = Submissao(id=generate_uuid(), tarefa=tarefa, status=status)
+    db.session.add_all([tarefa, submissao])
+    db.session.commit()
+    return submissao
+
+def logar(cliente, membro):
+    with cliente.session_transaction() as sessao:
+        sessao["user_id"] = membro.usuario_id
+        sessao["membro_id"] = membro.id
+        sessao["role"] = membro.role
+        sessao["familia_id"] = membro.familia_id
+    return cliente
@@ -0,0 +1,38 @@
+import io
+import os
+
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+
+from services import armazenamento as _armazenamento, ingestao_fotos
+
+def _foto():
+    buf = io.BytesIO()
+    Image.new("RGB", (8, 8), "red").save(buf, "PNG")
+    buf.seek(0)
+    return FileStorage(buf, filename="a.png")
+
+def test_entrada_bruta_fica_fora_de_static(familia, armazenamento):
+    chave = ingestao_fotos.receber(_foto(), None, familia.filho.id, 1024 * 1024)
+
+    assert chave.startswith(f"{_armazenamento.PASTA_ENTRADA}/{familia.filho.id}/")
+    assert not os.path.exists(os.path.join(armazenamento.raiz, chave))
+    assert os.path.isfile(os.path.join(armazenamento.pasta_entrada, chave.split("/", 2)[2]))
+    assert armazenamento.existe(chave)
+    assert [c for c, _, _ in armazenamento.listar(_armazenamento.PASTA_ENTRADA + "/")] == [chave]
+
+    armazenamento.remover(chave)
+    assert not armazenamento.existe(chave)
+
+def test_entrada_antiga_em_static_ainda_e_lida_e_listada(armazenamento):
+    chave = f"{_armazenamento.PASTA_ENTRADA}/m/antiga.png"
+    antigo = os.path.join(armazenamento.raiz, chave)
+    os.makedirs(os.path.dirname(antigo))
+    with open(antigo, "wb") as f:
+        f.write(b"x")
+
+    with armazenamento.abrir(chave) as f:
+        assert f.read() == b"x"
+    assert [c for c, _, _ in armazenamento.listar("uploads/")] == [chave]
+    armazenamento.remover(chave)
+    assert not os.path.exists(antigo)
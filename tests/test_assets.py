@@ -0,0 +1,71 @@
+import json
+import os
+import re
+import shutil
+import subprocess
+
+import pytest
+
+from services import assets
+from services.assets import construir, minificar_css, minificar_js
+
+STATIC = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static")
+
+
+@pytest.fixture
+def pasta_static(tmp_path):
+    """Cópia dos CSS/JS reais, para o build não escrever no static/ do repo."""
+    for sub in ("css", "js"):
+        shutil.copytree(os.path.join(STATIC, sub), tmp_path / sub)
+    return str(tmp_path)
+
+
+def test_css_mantem_strings_e_url():
+    css = 'a  {  content: "a  b ; }" ;  background: url( "x  y.png" ) ; } /* fora */ .b :hover , .c{x:1;}'
+    assert minificar_css(css) == 'a{content:"a  b ; }";background:url( "x  y.png" )}.b :hover,.c{x:1}'
+
+
+def test_js_mantem_template_strings_e_regex():
+    js = (
+        "// topo\n"
+        "const t = `linha\n"
+        "// não é comentário\n"
+        "   indentado ${ {a: 1}.a } fim`;\n"
+        "    const r = /[/\"`]+/g;  // some\n"
+        "const s = 'a  // b', d = x / 2 / y;\n"
+    )
+    saida = minificar_js(js)
+    assert "`linha\n// não é comentário\n   indentado ${ {a: 1}.a } fim`" in saida
+    assert '/[/"`]+/g;' in saida
+    assert "'a  // b'" in saida
+    assert "x / 2 / y" in saida
+    assert "topo" not in saida and "some" not in saida
+
+
+def test_build_dos_arquivos_reais(pasta_static):
+    manifest = construir(pasta_static)
+    dist = os.path.join(pasta_static, assets.PASTA_DIST)
+    assert set(assets.PACOTES) <= set(manifest)
+
+    for logico, gerado in manifest.items():
+        caminho = os.path.join(dist, gerado)
+        assert os.path.isfile(caminho) and os.path.isfile(caminho + ".gz")
+        with open(caminho, encoding="utf-8") as f:
+            saida = f.read()
+        if logico.endswith(".css"):
+            # toda string do fonte sobrevive igual no gerado
+            fontes = assets.PACOTES.get(logico, [logico])
+            for fonte in fontes:
+                with open(os.path.join(pasta_static, fonte), encoding="utf-8") as f:
+                    sem_comentarios = re.sub(r"/\*.*?\*/", "", f.read(), flags=re.S)
+                    for texto in re.findall(r'"[^"\n]*"|\'[^\'\n]*\'', sem_comentarios):
+                        assert texto in saida, (logico, texto)
+        elif shutil.which("node"):
+            # o JS gerado ainda é JS válido
+            resultado = subprocess.run(["node", "--check", caminho], capture_output=True, text=True)
+            assert resultado.returncode == 0, (logico, resultado.stderr)
+
+    # mesmo fonte, mesmo nome: rodar de novo não muda o manifest
+    assert construir(pasta_static) == manifest
+    with open(os.path.join(dist, assets.MANIFEST), encoding="utf-8") as f:
+        assert json.load(f) == manifest
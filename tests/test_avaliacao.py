@@ -0,0 +1,159 @@
+from decimal import Decimal
+from types import SimpleNamespace
+
+from conftest import criar_submissao, logar
+from controllers.taskssubmission_controller import LOTE_MAXIMO
+from extensions import db
+from models.models import (
+    Carteira, Familia, Membro, Notificacao, ResumoFamilia, Role, Submissao, SubmissionStatus,
+    TaskStatus, Transacao, TransactionType, Usuario, generate_uuid,
+)
+from services import avaliacao, resumo_familia
+
+def test_submissao_em_processamento_nao_e_aprovada(familia):
+    submissao = criar_submissao(familia, status=SubmissionStatus.PROCESSING)
+
+    resultado, = avaliacao.avaliar(familia.pai, [submissao.id], avaliacao.APROVAR)
+    db.session.commit()
+
+    assert resultado["codigo"] == "processando"
+    assert not resultado["ok"]
+    assert db.session.get(type(submissao), submissao.id).status == SubmissionStatus.PROCESSING
+    assert db.session.get(Carteira, familia.filho.carteira.id).saldo == Decimal("0.00")
+
+def test_lote_ignora_processando_e_aprova_pendente(app, familia):
+    resumo_familia.obter(familia.familia.id)
+    pendente = criar_submissao(familia, titulo="Arrumar a cama")
+    processando = criar_submissao(familia, status=SubmissionStatus.PROCESSING, titulo="Foto do quarto")
+    resumo_familia.ajustar(familia.familia.id, pendentes=1)
+    db.session.commit()
+
+    cliente = logar(app.test_client(), familia.pai)
+    resposta = cliente.post("/submission/batch", json={"ids": [pendente.id, processando.id], "acao": "aprovar"})
+
+    assert resposta.status_code == 200
+    codigos = {r["id"]: r["codigo"] for r in resposta.json["resultados"]}
+    assert codigos == {pendente.id: "ok", processando.id: "processando"}
+    db.session.expire_all()
+    assert db.session.get(type(processando), processando.id).status == SubmissionStatus.PROCESSING
+    assert db.session.get(ResumoFamilia, familia.familia.id).avaliacoesPendentes == 0
+
+def test_reavaliacao_de_rejeitada(familia):
+    submissao = criar_submissao(familia, status=SubmissionStatus.REJECTED)
+
+    resultado, = avaliacao.avaliar(familia.pai, [submissao.id], avaliacao.APROVAR)
+
+    assert resultado["codigo"] == "ok"
+    assert submissao.status == SubmissionStatus.APPROVED
+
+def test_aguardando_nova_foto_nao_e_aprovada(familia):
+    submissao = criar_submissao(familia, status=SubmissionStatus.NEEDS_REVISION)
+
+    resultado, = avaliacao.avaliar(familia.pai, [submissao.id], avaliacao.APROVAR)
+
+    assert resultado["codigo"] == "indisponivel"
+    assert submissao.status == SubmissionStatus.NEEDS_REVISION
+
+def test_contador_de_pendentes_bate_com_o_recalculo(familia):
+    familia_id = familia.familia.id
+    resumo_familia.obter(familia_id)
+    pendentes = [criar_submissao(familia, titulo=f"Tarefa {i}") for i in range(3)]
+    rejeitada = criar_submissao(familia, status=SubmissionStatus.REJECTED, titulo="Reavaliada")
+    processando = criar_submissao(familia, status=SubmissionStatus.PROCESSING, titulo="Com foto")
+    resumo_familia.recalcular(familia_id)
+    db.session.commit()
+
+    avaliacao.avaliar(familia.pai, [pendentes[0].id, rejeitada.id, processando.id], avaliacao.APROVAR)
+    avaliacao.avaliar(familia.pai, [pendentes[1].id, pendentes[0].id], avaliacao.REJEITAR)
+    db.session.commit()
+
+    contador = db.session.get(ResumoFamilia, familia_id).avaliacoesPendentes
+    assert contador == 1
+    assert contador == resumo_familia.recalcular(familia_id).avaliacoesPendentes
+
+# --- /submission/batch ---
+
+def _outra_familia():
+    fam = Familia(id=generate_uuid(), nome="Vizinhos")
+    pai_u = Usuario(id=generate_uuid(), nome="Outro Pai", email="outro@teste.com")
+    filho_u = Usuario(id=generate_uuid(), nome="Outro Filho", email="outrofilho@teste.com")
+    pai = Membro(id=generate_uuid(), role=Role.PARENT, usuario=pai_u, familia=fam)
+    filho = Membro(id=generate_uuid(), role=Role.CHILD, usuario=filho_u, familia=fam)
+    db.session.add_all([fam, pai_u, filho_u, pai, filho])
+    db.session.commit()
+    return SimpleNamespace(familia=fam, pai=pai, filho=filho)
+
+def test_lote_responde_um_codigo_por_item(app, familia):
+    pendente = criar_submissao(familia, titulo="Pendente")
+    processando = criar_submissao(familia, status=SubmissionStatus.PROCESSING, titulo="Com foto")
+    aprovada = criar_submissao(familia, status=SubmissionStatus.APPROVED, titulo="Já aprovada")
+    revisao = criar_submissao(familia, status=SubmissionStatus.NEEDS_REVISION, titulo="Nova foto")
+    alheia = criar_submissao(_outra_familia(), titulo="De outra família")
+    ids = [pendente.id, processando.id, aprovada.id, revisao.id, alheia.id, "nao-existe", pendente.id]
+
+    cliente = logar(app.test_client(), familia.pai)
+    resposta = cliente.post("/submission/batch", json={"ids": ids, "acao": "aprovar"})
+
+    assert resposta.status_code == 200
+    assert resposta.json["aplicadas"] == 1
+    assert [(r["id"], r["codigo"]) for r in resposta.json["resultados"]] == [
+        (pendente.id, "ok"), (processando.id, "processando"), (aprovada.id, "repetida"),
+        (revisao.id, "indisponivel"), (alheia.id, "negado"), ("nao-existe", "inexistente"),
+    ]
+    db.session.expire_all()
+    assert db.session.get(Submissao, alheia.id).status == SubmissionStatus.PENDING
+    assert db.session.get(Submissao, revisao.id).status == SubmissionStatus.NEEDS_REVISION
+
+def test_lote_aprovado_lanca_um_credito_por_tarefa_e_soma_na_carteira(app, familia):
+    subs = [criar_submissao(familia, valor=v, titulo=f"Tarefa {v}") for v in ("5.00", "2.50", "10.00")]
+    resumo_familia.recalcular(familia.familia.id)
+    db.session.commit()
+
+    cliente = logar(app.test_client(), familia.pai)
+    resposta = cliente.post("/submission/batch", json={"ids": [s.id for s in subs], "acao": "aprovar"})
+
+    assert resposta.json["aplicadas"] == 3
+    db.session.expire_all()
+    carteira = db.session.get(Carteira, familia.filho.carteira.id)
+    creditos = Transacao.query.filter_by(carteira_id=carteira.id, tipo=TransactionType.CREDIT_TASK).all()
+    assert sorted(t.valor for t in creditos) == [Decimal("2.50"), Decimal("5.00"), Decimal("10.00")]
+    assert carteira.saldo == carteira.totalTarefas == Decimal("17.50")
+    assert db.session.get(Membro, familia.filho.id).saldoXP == 3 * avaliacao.XP_POR_TAREFA
+    assert Notificacao.query.filter_by(usuario_id=familia.filho.usuario_id, tipo="TAREFA_APROVADA").count() == 3
+    assert db.session.get(ResumoFamilia, familia.familia.id).avaliacoesPendentes == 0
+
+def test_lote_rejeitado_inativa_as_tarefas_sem_lancar_nada(app, familia):
+    subs = [criar_submissao(familia, titulo=f"Tarefa {i}") for i in range(2)]
+
+    cliente = logar(app.test_client(), familia.pai)
+    cliente.post("/submission/batch", data={"ids": [s.id for s in subs], "acao": "rejeitar"})
+
+    db.session.expire_all()
+    for s in subs:
+        sub = db.session.get(Submissao, s.id)
+        assert sub.status == SubmissionStatus.REJECTED and sub.tarefa.status == TaskStatus.INATIVA
+    assert Transacao.query.count() == 0
+    with cliente.session_transaction() as sessao:
+        assert ("success", "2 tarefa(s) rejeitada(s).") in sessao["_flashes"]
+
+def test_lote_acima_do_maximo_e_recusado_inteiro(app, familia):
+    pendente = criar_submissao(familia)
+    ids = [pendente.id] + [f"id-{i}" for i in range(LOTE_MAXIMO)]
+
+    cliente = logar(app.test_client(), familia.pai)
+    resposta = cliente.post("/submission/batch", json={"ids": ids, "acao": "aprovar"})
+
+    assert resposta.status_code == 400
+    assert resposta.json == {"erro": f"Máximo de {LOTE_MAXIMO} tarefas por vez."}
+    db.session.expire_all()
+    assert db.session.get(Submissao, pendente.id).status == SubmissionStatus.PENDING
+
+def test_lote_so_para_pais(app, familia):
+    pendente = criar_submissao(familia)
+
+    cliente = logar(app.test_client(), familia.filho)
+    resposta = cliente.post("/submission/batch", json={"ids": [pendente.id], "acao": "aprovar"})
+
+    assert resposta.status_code != 200
+    db.session.expire_all()
+    assert db.session.get(Submissao, pendente.id).status == SubmissionStatus.PENDING
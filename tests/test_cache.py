@@ -0,0 +1,58 @@
+import threading
+
+from services.cache import CacheLRU
+
+def test_guarda_o_valor_carregado():
+    cache = CacheLRU(maximo=10, ttl=60)
+    cargas = []
+
+    assert cache.obter("a", lambda: cargas.append(1) or "v1") == "v1"
+    assert cache.obter("a", lambda: cargas.append(1) or "v2") == "v1"
+    assert len(cargas) == 1
+
+def test_invalidar_durante_a_carga_nao_guarda_o_valor_antigo():
+    cache = CacheLRU(maximo=10, ttl=60)
+
+    def carregar_e_ser_invalidado():
+        cache.invalidar("a")   # a escrita que invalida chega no meio da carga
+        return "antigo"
+
+    assert cache.obter("a", carregar_e_ser_invalidado) == "antigo"
+    assert cache.obter("a", lambda: "novo") == "novo"
+    assert cache.obter("a", lambda: "outro") == "novo"
+
+def test_carga_concorrente_iniciada_depois_da_invalidacao_e_guardada():
+    cache = CacheLRU(maximo=10, ttl=60)
+    dentro, liberar = threading.Event(), threading.Event()
+
+    def carga_lenta():
+        dentro.set()
+        liberar.wait(5)
+        return "antigo"
+
+    lenta = threading.Thread(target=lambda: cache.obter("a", carga_lenta))
+    lenta.start()
+    dentro.wait(5)
+    cache.invalidar("a")
+
+    def carga_nova():
+        liberar.set()
+        lenta.join(5)      # a carga antiga termina antes, sem guardar nada
+        return "novo"
+
+    assert cache.obter("a", carga_nova) == "novo"
+    assert cache.obter("a", lambda: "outro") == "novo"
+    assert cache._carregando == {} and cache._geracoes == {}
+
+def test_erro_na_carga_nao_deixa_estado_para_tras():
+    cache = CacheLRU(maximo=10, ttl=60)
+
+    def falhar():
+        raise RuntimeError("banco fora")
+
+    try:
+        cache.obter("a", falhar)
+    except RuntimeError:
+        pass
+    assert cache._carregando == {} and cache._geracoes == {}
+    assert cache.obter("a", lambda: "v") == "v"
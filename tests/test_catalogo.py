@@ -0,0 +1,27 @@
+from extensions import db
+from models.models import Recompensa, ResgateRecompensa, ResgateStatus, generate_uuid
+from services import catalogo
+
+def _recompensa(familia, titulo):
+    recompensa = Recompensa(
+        id=generate_uuid(), titulo=titulo, custoXP=100,
+        familia_id=familia.familia.id, criador_id=familia.pai.id,
+    )
+    db.session.add(recompensa)
+    db.session.commit()
+    return recompensa
+
+def test_resgate_rejeitado_continua_fora_do_catalogo(familia):
+    sorvete = _recompensa(familia, "Sorvete")
+    cinema = _recompensa(familia, "Cinema")
+    _recompensa(familia, "Parque")
+    db.session.add_all([
+        ResgateRecompensa(recompensa_id=sorvete.id, membro_id=familia.filho.id, status=ResgateStatus.PENDING),
+        ResgateRecompensa(recompensa_id=cinema.id, membro_id=familia.filho.id, status=ResgateStatus.REJECTED),
+    ])
+    db.session.commit()
+
+    titulos = {r["titulo"] for r in catalogo.disponiveis(familia.familia.id)}
+
+    assert titulos == {"Parque"}
+    assert catalogo.ja_resgatada(cinema.id)
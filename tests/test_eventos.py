@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import logar
+from extensions import db
+from models.models import Notificacao, generate_uuid
+from services import eventos, notificacoes_ao_vivo
+
+def _reconfigurar(app, **cfg):
+    app.config.update(cfg)
+    eventos.configurar_eventos(app)
+    return app.extensions["eventos"]
+
+def test_ao_vivo_desligado_por_padrao(app, familia):
+    cliente = logar(app.test_client(), familia.pai)
+
+    assert cliente.get("/home/eventos").status_code == 404
+    assert b"data-eventos-url" not in cliente.get("/home/parent").data
+
+def test_ao_vivo_ligado_abre_o_stream(app, familia):
+    _reconfigurar(app, EVENTOS_AO_VIVO=True, EVENTOS_DURACAO_MAX=0, JOBS_MODO="sincrono")
+    cliente = logar(app.test_client(), familia.filho)
+
+    assert b"data-eventos-url" in cliente.get("/home/child").data
+    resposta = cliente.get("/home/eventos")
+    assert resposta.mimetype == "text/event-stream"
+    assert b'event: contagem\ndata: {"naoLidas": 0}' in resposta.data
+
+def test_lote_maior_que_uma_pagina_sai_inteiro_no_mesmo_aviso(app, familia):
+    _reconfigurar(app, EVENTOS_AO_VIVO=True, EVENTOS_DURACAO_MAX=0, JOBS_MODO="sincrono")
+    agora = datetime.utcnow()
+    total = notificacoes_ao_vivo.LIMITE_POR_AVISO * 2 + 5
+    # Aprovação em lote: todas com o mesmo enviadaEm
+    db.session.add_all([
+        Notificacao(id=generate_uuid(), usuario_id=familia.filho.usuario_id, tipo="TAREFA_APROVADA",
+                    mensagem=f"Tarefa {i}", enviadaEm=agora)
+        for i in range(total)
+    ])
+    db.session.commit()
+    cliente = logar(app.test_client(), familia.filho)
+
+    resposta = cliente.get("/home/eventos", headers={"Last-Event-ID": (agora - timedelta(seconds=1)).isoformat()})
+
+    corpo = resposta.get_data(as_text=True)
+    assert corpo.count("event: notificacao") == total
+    assert len({f"Tarefa {i}\"" for i in range(total) if f"Tarefa {i}\"" in corpo}) == total
+    assert f'"naoLidas": {total}' in corpo
+
+def test_auto_fora_do_postgres_so_fica_em_memoria_com_um_processo(app):
+    cfg = dict(EVENTOS_BACKEND="auto", SQLALCHEMY_DATABASE_URI="sqlite:///x.db")
+
+    assert type(_reconfigurar(app, **cfg, WEB_PROCESSOS=1, JOBS_MODO="sincrono")) is eventos.EventosMemoria
+    assert type(_reconfigurar(app, **cfg, WEB_PROCESSOS=1, JOBS_MODO="worker")) is eventos.EventosBanco
+    assert type(_reconfigurar(app, **cfg, WEB_PROCESSOS=4, JOBS_MODO="embutido")) is eventos.EventosBanco
+
+def test_memoria_com_varios_processos_e_recusada(app):
+    with pytest.raises(RuntimeError, match="memoria"):
+        _reconfigurar(app, EVENTOS_BACKEND="memoria", EVENTOS_AO_VIVO=True, WEB_PROCESSOS=2, JOBS_MODO="embutido")
+    # Sem o stream ligado ninguém assina: memoria não faz mal
+    assert type(_reconfigurar(app, EVENTOS_AO_VIVO=False)) is eventos.EventosMemoria
+
+def test_backend_com_escuta_exige_o_laco(app):
+    with pytest.raises(TypeError):
+        eventos._ComEscuta(app)
@@ -0,0 +1,64 @@
+from decimal import Decimal
+
+from sqlalchemy import update
+
+from extensions import db
+from models.models import Carteira, Membro, Role, Transacao, TransactionType, Usuario, generate_uuid
+from services import extrato
+
+def _carteira(familia):
+    return db.session.get(Carteira, familia.filho.carteira.id)
+
+def test_totais_batem_com_o_recalculo_do_extrato(familia):
+    carteira = _carteira(familia)
+    extrato.lancar(carteira, TransactionType.CREDIT_TASK, "5.00", "Louça")
+    extrato.lancar_lote(carteira, TransactionType.CREDIT_TASK, [("2.50", "Cama"), ("1.25", "Lixo")])
+    extrato.lancar(carteira, TransactionType.CREDIT_ALLOWANCE, "20.00", "Mesada")
+    extrato.lancar(carteira, TransactionType.DEBIT_PAYMENT, "10.00", "Pago em dinheiro")
+    extrato.lancar(carteira, TransactionType.DEBIT_REWARD, "3.00", "Sorvete")
+    # Carteira nova, criada na mesma ação (ainda fora do banco)
+    usuario = Usuario(id=generate_uuid(), nome="Filha", email="filha@teste.com")
+    filha = Membro(id=generate_uuid(), role=Role.CHILD, usuario=usuario, familia=familia.familia)
+    filha.carteira = Carteira(id=generate_uuid(), saldo=Decimal("0.00"))
+    db.session.add_all([usuario, filha])
+    extrato.lancar_lote(filha.carteira, TransactionType.CREDIT_TASK, [("4.00", "Plantas")])
+    db.session.commit()
+
+    db.session.expire_all()
+    carteira = _carteira(familia)
+    assert (carteira.totalTarefas, carteira.totalMesada, carteira.totalPago) == (
+        Decimal("8.75"), Decimal("20.00"), Decimal("10.00")
+    )
+    assert carteira.saldo == Decimal("15.75")
+    assert db.session.get(Carteira, filha.carteira.id).totalTarefas == Decimal("4.00")
+    with db.engine.connect() as conn:
+        assert extrato.divergencias(conn) == []
+    assert Transacao.query.count() == 7
+
+def test_lancamento_soma_no_banco_e_nao_sobre_o_valor_lido(familia):
+    carteira = _carteira(familia)
+    assert carteira.saldo == Decimal("0.00")   # lido antes do lançamento concorrente
+    # Outra requisição credita e faz commit enquanto esta segura o objeto velho
+    with db.engine.begin() as conn:
+        conn.execute(update(Carteira).where(Carteira.id == carteira.id).values(
+            saldo=Carteira.saldo + 7, totalTarefas=Carteira.totalTarefas + 7,
+        ))
+
+    extrato.lancar(carteira, TransactionType.CREDIT_TASK, "5.00")
+    db.session.commit()
+
+    db.session.expire_all()
+    carteira = _carteira(familia)
+    assert carteira.saldo == carteira.totalTarefas == Decimal("12.00")
+
+def test_recalcular_corrige_total_divergente(familia):
+    carteira = _carteira(familia)
+    extrato.lancar(carteira, TransactionType.CREDIT_TASK, "5.00")
+    db.session.commit()
+    with db.engine.begin() as conn:
+        conn.execute(update(Carteira).values(totalTarefas=99))
+        assert [(c, g, e) for _, c, g, e in extrato.divergencias(conn)] == [
+            ("totalTarefas", Decimal("99.00"), Decimal("5.00"))
+        ]
+        extrato.recalcular_totais(conn)
+        assert extrato.divergencias(conn) == []
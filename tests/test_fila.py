@@ -0,0 +1,143 @@
+from datetime import datetime, timedelta
+
+from conftest import criar_submissao
+from extensions import db
+from models.models import Job, JobStatus, ResumoFamilia, SubmissionStatus, TaskStatus
+from services import fila, ingestao_fotos, resumo_familia
+
+chamadas = []
+
+@fila.tarefa("teste_ok", fila="testes")
+def _ok(valor):
+    chamadas.append(("ok", valor))
+
+@fila.tarefa("teste_falha", fila="testes", tentativas=2, ao_esgotar=lambda valor: chamadas.append(("esgotou", valor)))
+def _falha(valor):
+    chamadas.append(("falha", valor))
+    raise RuntimeError("fora do ar")
+
+def _enfileirado(tipo, **carga):
+    job = fila.enfileirar(tipo, **carga)
+    db.session.commit()
+    return job.id
+
+def _job(job_id):
+    db.session.expire_all()
+    return db.session.get(Job, job_id)
+
+# --- reserva ---
+
+def test_reserva_marca_executando_e_nao_entrega_duas_vezes(app):
+    job_id = _enfileirado("teste_ok", valor=1)
+
+    job = fila._reservar(["testes"], "w1")
+    assert job.id == job_id and job.status == JobStatus.EXECUTANDO
+    assert job.tentativas == 1 and job.travadoPor == "w1"
+    assert fila._reservar(["testes"], "w2") is None
+
+def test_reserva_ignora_agendado_e_outras_filas(app):
+    _enfileirado("teste_ok", valor=1)
+    futuro = fila.enfileirar("teste_ok", atraso=60, valor=2)
+    db.session.commit()
+
+    assert fila._reservar(["outra"], "w1") is None
+    assert fila._reservar(["testes"], "w1").carga == '{"valor": 1}'
+    assert fila._reservar(["testes"], "w1") is None
+    assert _job(futuro.id).status == JobStatus.PRONTO
+
+def test_reserva_por_id_pega_so_o_job_pedido(app):
+    _enfileirado("teste_ok", valor=1)
+    job_id = _enfileirado("teste_ok", valor=2)
+
+    assert fila._reservar(None, "w1", job_id=job_id).id == job_id
+    assert fila._reservar(None, "w2", job_id=job_id) is None
+
+# --- execução, nova tentativa e dead-letter ---
+
+def test_job_ok_fica_feito(app):
+    chamadas.clear()
+    job_id = _enfileirado("teste_ok", valor=7)
+
+    assert fila._executar(fila._reservar(["testes"], "w1")) == fila.OK
+
+    job = _job(job_id)
+    assert job.status == JobStatus.FEITO and job.concluidoEm and job.travadoPor is None
+    assert chamadas == [("ok", 7)]
+
+def test_falha_reagenda_com_backoff_e_depois_morre(app):
+    chamadas.clear()
+    job_id = _enfileirado("teste_falha", valor=3)
+
+    assert fila._executar(fila._reservar(["testes"], "w1")) == fila.NOVA_TENTATIVA
+    job = _job(job_id)
+    espera = (job.disponivelEm - datetime.utcnow()).total_seconds()
+    base = app.config["JOBS_BACKOFF_BASE"]
+    assert job.status == JobStatus.PRONTO and job.tentativas == 1
+    assert 0.7 * base < espera <= 1.2 * base
+    assert "fora do ar" in job.erro
+    assert fila._reservar(["testes"], "w1") is None   # ainda esperando o backoff
+
+    job.disponivelEm = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    assert fila._executar(fila._reservar(["testes"], "w1")) == fila.MORTO
+
+    job = _job(job_id)
+    assert job.status == JobStatus.MORTO and job.tentativas == 2
+    assert chamadas == [("falha", 3), ("falha", 3), ("esgotou", 3)]
+
+def test_travado_volta_para_a_fila_ou_morre(app):
+    chamadas.clear()
+    volta = _enfileirado("teste_ok", valor=1)
+    morre = _enfileirado("teste_falha", valor=2)
+    for job_id in (volta, morre):
+        fila._reservar(None, "w1", job_id=job_id)
+    antigo = datetime.utcnow() - timedelta(hours=1)
+    db.session.query(Job).update({"travadoEm": antigo}, synchronize_session=False)
+    db.session.query(Job).filter_by(id=morre).update({"tentativas": 2}, synchronize_session=False)
+    db.session.commit()
+
+    assert fila.recuperar_travados(timeout=60) == (1, 1)
+    assert _job(volta).status == JobStatus.PRONTO
+    assert _job(morre).status == JobStatus.MORTO
+    assert chamadas == [("esgotou", 2)]
+
+# --- fim condicional da ingestão ---
+
+def test_finalizar_so_vale_para_a_mesma_entrada_em_processing(familia):
+    familia_id = familia.familia.id
+    sub = criar_submissao(familia, status=SubmissionStatus.PROCESSING)
+    sub.fotoEntrada = "uploads/entrada/x/nova.jpg"
+    resumo_familia.recalcular(familia_id)
+    db.session.commit()
+    blob = type("BlobFalso", (), {"caminho": "uploads/blobs/aa/bb/foto.jpg", "sha256": "a" * 64})()
+
+    # Reenvio no meio do caminho: o job da entrada antiga não conclui
+    assert ingestao_fotos._finalizar(sub, "uploads/entrada/x/antiga.jpg", erro="x") is False
+    db.session.rollback()
+
+    assert ingestao_fotos._finalizar(sub, sub.fotoEntrada, erro="formato não suportado") is True
+    db.session.commit()
+    db.session.expire_all()
+    assert sub.status == SubmissionStatus.NEEDS_REVISION and sub.fotoEntrada is None
+    assert sub.tarefa.status == TaskStatus.ATIVA
+
+    # Job repetido depois do fim: nada muda (nem o resumo)
+    antes = db.session.get(ResumoFamilia, familia_id).tarefasAtivas
+    assert ingestao_fotos._finalizar(sub, "uploads/entrada/x/nova.jpg", blob=blob) is False
+    db.session.rollback()
+    assert db.session.get(ResumoFamilia, familia_id).tarefasAtivas == antes
+
+# --- modo 'worker' sem worker no ar ---
+
+def test_job_parado_sem_worker_vira_erro_no_log(app, monkeypatch, caplog):
+    monkeypatch.setitem(fila._alerta, "proxima", 0.0)
+    job = fila.enfileirar("teste_ok", valor=1)
+    job.disponivelEm = datetime.utcnow() - timedelta(seconds=app.config["JOBS_ALERTA_SEG"] + 60)
+    db.session.commit()
+
+    app.test_client().get("/")
+    assert any("flask --app app worker" in r.getMessage() for r in caplog.records if r.levelname == "ERROR")
+
+    caplog.clear()
+    app.test_client().get("/")   # uma vez por minuto, não a cada requisição
+    assert not caplog.records
@@ -0,0 +1,94 @@
+import io
+import os
+import time
+
+from PIL import Image
+
+from conftest import logar
+from extensions import db
+from models.models import Blob, ReferenciaBlob, Usuario
+from services import blobs, ingestao_fotos
+from services.coleta_uploads import ColetaUploads
+
+def _entrada(armazenamento, membro, cor):
+    buf = io.BytesIO()
+    Image.new("RGB", (16, 16), cor).save(buf, "PNG")
+    chave = f"uploads/entrada/{membro.id}/{cor}.png"
+    caminho = armazenamento._caminho(chave)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, "wb") as f:
+        f.write(buf.getvalue())
+    return chave
+
+def test_job_aplica_o_avatar_e_apaga_a_entrada(familia, armazenamento):
+    usuario = familia.filho.usuario
+    chave = _entrada(armazenamento, familia.filho, "green")
+    usuario.avatarEntrada = chave
+    db.session.commit()
+
+    assert ingestao_fotos.processar_avatar(usuario.id) is True
+
+    db.session.expire_all()
+    usuario = db.session.get(Usuario, usuario.id)
+    assert usuario.avatarUrl.startswith(blobs.PASTA + "/") and usuario.avatarEntrada is None
+    assert armazenamento.existe(usuario.avatarUrl) and not armazenamento.existe(chave)
+    assert db.session.query(ReferenciaBlob).filter_by(donoTipo=blobs.AVATAR, dono_id=usuario.id).count() == 1
+
+def test_job_de_entrada_antiga_nao_sobrescreve_a_nova(familia, armazenamento):
+    usuario = familia.filho.usuario
+    antiga = _entrada(armazenamento, familia.filho, "red")
+    usuario.avatarEntrada = _entrada(armazenamento, familia.filho, "blue")
+    db.session.commit()
+
+    # O job da entrada antiga chega depois da troca: o UPDATE condicional não casa
+    assert ingestao_fotos._concluir(
+        lambda: ingestao_fotos._finalizar_avatar(usuario, antiga), blobs.Lote(), antiga
+    ) is False
+    assert db.session.get(Usuario, usuario.id).avatarEntrada.endswith("blue.png")
+
+def test_avatar_recusado_invalida_o_etag_do_dashboard(app, familia, armazenamento):
+    usuario = familia.pai.usuario
+    usuario.avatarEntrada = "uploads/entrada/x/sumiu.png"   # o job não acha o arquivo
+    db.session.commit()
+    cliente = logar(app.test_client(), familia.pai)
+    cliente.get("/home/parent")   # a 1ª visita cria o resumo da família (e sobe a versão)
+    etag = cliente.get("/home/parent").headers["ETag"]
+    assert cliente.get("/home/parent", headers={"If-None-Match": etag}).status_code == 304
+
+    assert ingestao_fotos.processar_avatar(usuario.id) is True
+
+    resposta = cliente.get("/home/parent", headers={"If-None-Match": etag})
+    assert resposta.status_code == 200
+    assert b'data-nao-lidas >1</span>' in resposta.data   # a recusa conta no badge
+
+def test_coleta_decide_pelas_referencias_e_nao_pelo_mtime(familia, armazenamento):
+    usuario = familia.filho.usuario
+    usuario.avatarEntrada = _entrada(armazenamento, familia.filho, "green")
+    db.session.commit()
+    ingestao_fotos.processar_avatar(usuario.id)
+    caminho = db.session.get(Usuario, usuario.id).avatarUrl
+
+    # Arquivo "velho" (nunca regravado) mas referenciado: fica
+    rel = ColetaUploads(0, agora=time.time() + 60).executar()
+    assert rel.blobs == 0 and armazenamento.existe(caminho)
+
+    # Sem a referência, sai
+    blobs.desreferenciar(blobs.AVATAR, usuario.id)
+    db.session.commit()
+    rel = ColetaUploads(0, agora=time.time() + 60).executar()
+    assert rel.blobs == 1 and not armazenamento.existe(caminho)
+    assert db.session.query(Blob).count() == 0
+
+def test_blob_reaproveitado_volta_se_o_arquivo_sumiu(app, armazenamento):
+    lote = blobs.Lote()
+    blob = blobs.guardar_bytes(lote, b"\x89PNG\r\n\x1a\n conteudo", "png")
+    db.session.commit()
+    lote.publicar()
+    armazenamento.remover(blob.caminho)   # a coleta levou o arquivo entre a consulta e o commit
+
+    lote = blobs.Lote()
+    blobs.guardar_bytes(lote, b"\x89PNG\r\n\x1a\n conteudo", "png")
+    db.session.commit()
+    lote.publicar()
+
+    assert armazenamento.existe(blob.caminho)
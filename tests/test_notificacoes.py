@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from extensions import db
+from models.models import Notificacao, NotificacaoFamilia, Role
+from services import notificacoes
+
+def _pessoal(membro, atras=timedelta(0)):
+    notif = Notificacao(tipo="T", mensagem="m", usuario_id=membro.usuario_id, enviadaEm=datetime.utcnow() - atras)
+    db.session.add(notif)
+    return notif
+
+def _aviso(membro, atras=timedelta(0)):
+    aviso = NotificacaoFamilia(
+        familia_id=membro.familia_id, publico=membro.role, tipo="T", mensagem="m",
+        enviadaEm=datetime.utcnow() - atras,
+    )
+    db.session.add(aviso)
+    return aviso
+
+@pytest.fixture(autouse=True)
+def _membros_antigos(familia):
+    # Avisos anteriores à entrada na família não contam: todos entraram ontem
+    for membro in (familia.pai, familia.filho):
+        membro.entradaEm = datetime.utcnow() - timedelta(days=1)
+    db.session.commit()
+
+def test_marcar_todas_zera_inclusive_o_que_acabou_de_chegar(app, familia):
+    _pessoal(familia.filho, timedelta(hours=1))
+    _aviso(familia.filho, timedelta(hours=1))
+    _pessoal(familia.filho)
+    _aviso(familia.filho)
+    db.session.commit()
+    assert notificacoes.contar_nao_lidas(familia.filho) == 4
+
+    notificacoes.marcar_lidas_ate(familia.filho.usuario_id)
+    db.session.commit()
+    assert notificacoes.contar_nao_lidas(familia.filho) == 0
+    assert notificacoes.nao_lidas(familia.filho) == []
+
+def test_commit_atrasado_nao_fica_escondido_atras_do_cursor(app, familia):
+    # Linhas com enviadaEm de 1 s atrás que só commitam depois do "marcar todas"
+    notificacoes.marcar_lidas_ate(familia.filho.usuario_id)
+    db.session.commit()
+    pessoal = _pessoal(familia.filho, timedelta(seconds=1))
+    aviso = _aviso(familia.filho, timedelta(seconds=1))
+    db.session.commit()
+
+    assert {n.id for n in notificacoes.nao_lidas(familia.filho)} == {pessoal.id, aviso.id}
+    assert notificacoes.contar_nao_lidas(familia.filho) == 2
+
+def test_cursor_nao_volta_e_avisos_lidos_continuam_lidos(app, familia):
+    antigo = _aviso(familia.filho, timedelta(minutes=5))
+    _aviso(familia.filho)
+    db.session.commit()
+    notificacoes.marcar_lidas_ate(familia.filho.usuario_id)
+    db.session.commit()
+    cursor = notificacoes.lido_ate(familia.filho)
+    assert cursor > antigo.enviadaEm
+
+    # Marcar até um ponto anterior (home_child com o feed antigo) não desfaz nada
+    notificacoes.marcar_lidas_ate(familia.filho.usuario_id, antigo.enviadaEm)
+    db.session.commit()
+    assert notificacoes.lido_ate(familia.filho) == cursor
+    assert notificacoes.contar_nao_lidas(familia.filho) == 0
+
+def test_aviso_lido_por_um_nao_conta_para_o_outro_publico(app, familia):
+    _aviso(familia.filho)
+    db.session.commit()
+    assert familia.pai.role == Role.PARENT
+    notificacoes.marcar_lidas_ate(familia.pai.usuario_id)
+    db.session.commit()
+    assert notificacoes.contar_nao_lidas(familia.filho) == 1
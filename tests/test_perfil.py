@@ -0,0 +1,47 @@
+import io
+import os
+
+from PIL import Image
+
+from conftest import logar
+from extensions import db
+from models.models import Usuario
+from services import blobs
+
+def _png():
+    buf = io.BytesIO()
+    Image.new("RGB", (8, 8), "red").save(buf, "PNG")
+    buf.seek(0)
+    return buf
+
+def test_temporario_fica_fora_de_static(app):
+    recebido = blobs.receber(_png(), 1024 * 1024)
+    try:
+        pasta = os.path.dirname(recebido.temporario)
+        assert pasta == app.config["UPLOAD_TEMPORARIOS"]
+        assert not os.path.abspath(pasta).startswith(os.path.abspath(app.static_folder))
+    finally:
+        recebido.descartar()
+
+def test_falha_no_commit_do_perfil_desfaz_e_avisa(app, familia, monkeypatch):
+    cliente = logar(app.test_client(), familia.filho)
+    usuario_id = familia.filho.usuario_id
+
+    def commit_falha():
+        raise RuntimeError("banco indisponível")
+    monkeypatch.setattr(db.session, "commit", commit_falha)
+
+    resposta = cliente.post(
+        "/wallet/edit", data={"nome": "Outro Nome", "foto_perfil": (_png(), "a.png")},
+        content_type="multipart/form-data",
+    )
+    monkeypatch.undo()
+
+    assert resposta.status_code == 302
+    assert resposta.headers["Location"].endswith("/wallet/edit")
+    with cliente.session_transaction() as sessao:
+        assert ("error", "Erro ao salvar o perfil: banco indisponível") in sessao["_flashes"]
+        assert all(categoria != "success" for categoria, _ in sessao["_flashes"])
+    usuario = db.session.get(Usuario, usuario_id)
+    assert usuario.nome == "Filho" and usuario.avatarUrl is None
+    assert os.listdir(app.config["UPLOAD_TEMPORARIOS"]) == []
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from extensions import db
+from models.models import Notificacao, NotificacaoFamilia, Tarefa, TaskStatus, generate_uuid
+from services import prazos
+
+AGORA = datetime(2026, 10, 17, 12, 0)   # UTC
+
+def _tarefa(familia, prazo_local, status=TaskStatus.ATIVA):
+    tarefa = Tarefa(
+        id=generate_uuid(), titulo="Dever de casa", valorBase=Decimal("1.00"), status=status,
+        prazo=prazo_local, criador_id=familia.pai.id, executor_id=familia.filho.id,
+    )
+    db.session.add(tarefa)
+    db.session.commit()
+    return tarefa.id   # tick() expurga a sessão: os testes guardam só o id
+
+def _fuso(familia, nome):
+    familia.familia.fusoHorario = nome
+    db.session.commit()
+
+def _status(tarefa_id):
+    db.session.expire_all()
+    return db.session.get(Tarefa, tarefa_id).status
+
+def test_vencimento_segue_o_fuso_da_familia(familia):
+    _fuso(familia, "Asia/Tokyo")   # UTC+9: 21:30 local = 12:30 UTC
+    tarefa = _tarefa(familia, datetime(2026, 10, 17, 21, 30))
+    motor = prazos.MotorPrazos(horas_lembrete=2)
+
+    motor.tick(AGORA)
+    assert _status(tarefa) == TaskStatus.ATIVA      # o prazo "ingênuo" (21:30) parece longe, mas...
+    motor.tick(AGORA + timedelta(minutes=29))
+    assert _status(tarefa) == TaskStatus.ATIVA
+    motor.tick(AGORA + timedelta(minutes=31))
+    assert _status(tarefa) == TaskStatus.ATRASADA   # ...vence às 12:30 UTC
+
+def test_janela_alcanca_prazo_local_alem_dela_pela_folga_de_fuso(familia):
+    # UTC+14: prazo local 13 h "à frente" do relógio UTC vence daqui a 1 h de verdade,
+    # fora de agora + lembrete + janela (8 h) se a consulta não tivesse a folga
+    _fuso(familia, "Pacific/Kiritimati")
+    tarefa = _tarefa(familia, AGORA + timedelta(hours=15))
+    motor = prazos.MotorPrazos(horas_lembrete=2, janela_horas=6)
+
+    motor.tick(AGORA)
+
+    db.session.expire_all()
+    assert db.session.get(Tarefa, tarefa).lembreteEnviadoEm == AGORA
+    assert Notificacao.query.filter_by(tipo="PRAZO_PROXIMO").count() == 1
+
+def test_dois_motores_nao_duplicam_lembrete_nem_atraso(familia):
+    _fuso(familia, "UTC")
+    tarefa = _tarefa(familia, AGORA + timedelta(hours=1))
+    motores = [prazos.MotorPrazos(horas_lembrete=2) for _ in range(2)]
+
+    for motor in motores:
+        motor.tick(AGORA)
+    for motor in motores:
+        motor.tick(AGORA + timedelta(hours=1, minutes=1))
+
+    assert _status(tarefa) == TaskStatus.ATRASADA
+    assert Notificacao.query.filter_by(tipo="PRAZO_PROXIMO").count() == 1
+    assert Notificacao.query.filter_by(tipo="TAREFA_ATRASADA").count() == 1
+    aviso, = NotificacaoFamilia.query.filter_by(tipo="TAREFA_ATRASADA").all()
+    assert aviso.mensagem.startswith("1 tarefa(s)")
+    assert sum(m.totais[prazos.VENCIMENTO] for m in motores) == 1
+
+def test_tarefa_que_saiu_de_ativa_nao_vira_atrasada(familia):
+    _fuso(familia, "UTC")
+    tarefa = _tarefa(familia, AGORA + timedelta(minutes=30))
+    motor = prazos.MotorPrazos()
+    motor.tick(AGORA)
+
+    # Enviada (ou apagada) depois de entrar no heap: o evento velho não faz nada
+    db.session.get(Tarefa, tarefa).status = TaskStatus.INATIVA
+    db.session.commit()
+    motor.tick(AGORA + timedelta(hours=1))
+
+    assert _status(tarefa) == TaskStatus.INATIVA
+    assert Notificacao.query.filter_by(tipo="TAREFA_ATRASADA").count() == 0
+    assert motor.totais[prazos.VENCIMENTO] == 0
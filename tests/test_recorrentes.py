@@ -0,0 +1,82 @@
+from datetime import date, datetime, time
+
+from extensions import db
+from models.models import (
+    Membro, Notificacao, Recorrencia, ResumoFamilia, Role, Tarefa, TarefaRecorrente, Usuario, generate_uuid,
+)
+from services import recorrentes, resumo_familia, streak
+
+SEGUNDA = date(2026, 10, 12)
+
+def _segundo_filho(familia):
+    usuario = Usuario(id=generate_uuid(), nome="Filha", email="filha@teste.com")
+    filha = Membro(id=generate_uuid(), role=Role.CHILD, usuario=usuario, familia=familia.familia)
+    db.session.add_all([usuario, filha])
+    db.session.commit()
+    return filha
+
+def _definicao(familia, executores, **campos):
+    definicao = TarefaRecorrente(
+        id=generate_uuid(), titulo="Arrumar a cama", familia_id=familia.familia.id,
+        criador_id=familia.pai.id, executores=list(executores), **campos,
+    )
+    db.session.add(definicao)
+    db.session.commit()
+    return definicao
+
+def test_gerar_o_mesmo_dia_duas_vezes_nao_duplica(familia):
+    filha = _segundo_filho(familia)
+    definicao = _definicao(familia, [familia.filho.id, filha.id], horaPrazo=time(18, 0))
+    resumo_familia.recalcular(familia.familia.id)
+    db.session.commit()
+
+    assert recorrentes.gerar(dia=SEGUNDA) == 2
+    assert recorrentes.gerar(dia=SEGUNDA) == 0
+
+    tarefas = Tarefa.query.filter_by(recorrencia_id=definicao.id).all()
+    assert {t.executor_id for t in tarefas} == {familia.filho.id, filha.id}
+    assert {(t.periodo, t.prazo) for t in tarefas} == {(SEGUNDA, datetime(2026, 10, 12, 18, 0))}
+    assert Notificacao.query.filter_by(tipo="NOVA_TAREFA").count() == 2
+    assert db.session.get(ResumoFamilia, familia.familia.id).tarefasAtivas == 2
+
+    # O dia seguinte é outro período
+    assert recorrentes.gerar(dia=date(2026, 10, 13)) == 2
+
+def test_lote_misturado_so_insere_as_que_faltam(familia):
+    filha = _segundo_filho(familia)
+    _definicao(familia, [familia.filho.id])
+    recorrentes.gerar(dia=SEGUNDA)
+    # A definição ganha outro executor: o INSERT do lote leva as duas linhas, só uma é nova
+    definicao = TarefaRecorrente.query.one()
+    definicao.executores = [familia.filho.id, filha.id]
+    db.session.commit()
+
+    assert recorrentes.gerar(dia=SEGUNDA) == 1
+    assert Tarefa.query.count() == 2
+
+def test_dias_da_semana_e_filho_fora_da_familia(familia):
+    semanal = _definicao(familia, [familia.filho.id], frequencia=Recorrencia.DIAS, diasSemana="2,4")
+    estranho = _definicao(familia, [familia.filho.id, generate_uuid()])
+
+    assert recorrentes.gerar(dia=SEGUNDA) == 1          # só a diária, e só para o filho da família
+    assert recorrentes.gerar(dia=date(2026, 10, 14)) == 2   # quarta: as duas
+    assert Tarefa.query.filter_by(recorrencia_id=semanal.id).one().periodo == date(2026, 10, 14)
+    assert Tarefa.query.filter_by(recorrencia_id=estranho.id).count() == 2
+
+def test_sem_dia_usa_o_hoje_do_fuso_da_familia(familia):
+    familia.familia.fusoHorario = "Pacific/Kiritimati"   # UTC+14: já é "amanhã" na maior parte do dia UTC
+    _definicao(familia, [familia.filho.id])
+    esperado = streak.dia_local(datetime.utcnow(), streak.fuso("Pacific/Kiritimati"))
+
+    recorrentes.gerar()
+
+    assert Tarefa.query.one().periodo == esperado
+
+def test_bancos_sem_on_conflict_filtram_antes_do_insert(familia, monkeypatch):
+    _definicao(familia, [familia.filho.id])
+    recorrentes.gerar(dia=SEGUNDA)
+    monkeypatch.setattr(db.session.get_bind().dialect, "name", "mysql")
+
+    assert recorrentes.gerar(dia=SEGUNDA) == 0
+    assert recorrentes.gerar(dia=date(2026, 10, 13)) == 1
+    assert Tarefa.query.count() == 2
@@ -0,0 +1,56 @@
+from decimal import Decimal
+
+from sqlalchemy import update
+
+from conftest import criar_submissao
+from extensions import db
+from models.models import Carteira, ResumoFamilia, TransactionType
+from services import avaliacao, extrato, resumo_familia
+
+CAMPOS = ("totalPrometido", "totalPago", "avaliacoesPendentes", "tarefasAtivas")
+
+def _gravado(familia_id):
+    db.session.expire_all()
+    resumo = db.session.get(ResumoFamilia, familia_id)
+    return {c: getattr(resumo, c) for c in CAMPOS}
+
+def test_deltas_batem_com_o_recalculo(familia):
+    familia_id = familia.familia.id
+    subs = [criar_submissao(familia, valor=v, titulo=f"Tarefa {v}") for v in ("5.00", "3.00", "2.00")]
+    resumo_familia.obter(familia_id)
+
+    avaliacao.avaliar(familia.pai, [subs[0].id, subs[1].id], avaliacao.APROVAR)
+    avaliacao.avaliar(familia.pai, [subs[2].id], avaliacao.REJEITAR)
+    carteira = db.session.get(Carteira, familia.filho.carteira.id)
+    extrato.lancar(carteira, TransactionType.CREDIT_ALLOWANCE, "10.00", "Mesada")
+    extrato.lancar(carteira, TransactionType.DEBIT_PAYMENT, "6.00", "Pago")
+    extrato.lancar(carteira, TransactionType.DEBIT_REWARD, "1.50", "Figurinhas")
+    db.session.commit()
+
+    gravado = _gravado(familia_id)
+    assert gravado["totalPrometido"] == Decimal("18.00") and gravado["totalPago"] == Decimal("6.00")
+    assert gravado == resumo_familia._calcular(familia_id)
+    assert resumo_familia.saldo_a_pagar(familia_id) == Decimal("10.50")
+
+def test_ajuste_soma_no_banco_e_nao_sobre_o_valor_lido(familia):
+    familia_id = familia.familia.id
+    resumo = resumo_familia.obter(familia_id)
+    assert resumo.avaliacoesPendentes == 0   # objeto lido antes do ajuste concorrente
+    with db.engine.begin() as conn:
+        conn.execute(update(ResumoFamilia).where(ResumoFamilia.familia_id == familia_id)
+                     .values(avaliacoesPendentes=ResumoFamilia.avaliacoesPendentes + 2))
+
+    resumo_familia.ajustar(familia_id, pendentes=1, prometido="4.00")
+    db.session.commit()
+
+    gravado = _gravado(familia_id)
+    assert gravado["avaliacoesPendentes"] == 3 and gravado["totalPrometido"] == Decimal("4.00")
+
+def test_primeiro_ajuste_sem_resumo_recalcula_tudo(familia):
+    familia_id = familia.familia.id
+    criar_submissao(familia)
+
+    resumo_familia.ajustar(familia_id, pendentes=1)   # o recálculo já vê a submissão: não soma de novo
+    db.session.commit()
+
+    assert _gravado(familia_id)["avaliacoesPendentes"] == 1
@@ -0,0 +1,62 @@
+from conftest import criar_submissao, logar
+from extensions import db
+from models.models import Membro, Role, Usuario, generate_uuid
+from services import notificacoes, versao_familia
+
+def _etag_estavel(cliente, rota="/home/parent"):
+    cliente.get(rota)   # a 1ª visita cria o resumo da família (e sobe a versão)
+    return cliente.get(rota).headers["ETag"]
+
+def test_familia_sem_mudanca_responde_304(app, familia):
+    cliente = logar(app.test_client(), familia.pai)
+    etag = _etag_estavel(cliente)
+
+    resposta = cliente.get("/home/parent", headers={"If-None-Match": etag})
+
+    assert resposta.status_code == 304 and resposta.data == b""
+    assert resposta.headers["ETag"] == etag
+    assert resposta.headers["Cache-Control"] == "private, no-cache"
+
+def test_escrita_na_familia_sobe_a_versao_e_volta_200(app, familia):
+    cliente = logar(app.test_client(), familia.pai)
+    etag = _etag_estavel(cliente)
+    versao = versao_familia.atual(familia.familia.id)
+
+    notificacoes.notificar_familia(familia.familia.id, Role.PARENT, "TAREFA_PENDENTE", "Nova foto")
+    db.session.commit()
+
+    assert versao_familia.atual(familia.familia.id) == versao + 1
+    resposta = cliente.get("/home/parent", headers={"If-None-Match": etag})
+    assert resposta.status_code == 200 and resposta.headers["ETag"] != etag
+
+def test_avaliacao_pela_rota_invalida_a_fila_de_avaliacao(app, familia):
+    submissao = criar_submissao(familia)
+    cliente = logar(app.test_client(), familia.pai)
+    etag = _etag_estavel(cliente, "/submission/parent/tasks")
+
+    cliente.post("/submission/batch", json={"ids": [submissao.id], "acao": "aprovar"})
+    cliente.get("/home/parent")   # consome o flash, se houver
+
+    resposta = cliente.get("/submission/parent/tasks", headers={"If-None-Match": etag})
+    assert resposta.status_code == 200
+
+def test_flash_pendente_nunca_vira_304(app, familia):
+    cliente = logar(app.test_client(), familia.pai)
+    etag = _etag_estavel(cliente)
+    with cliente.session_transaction() as sessao:
+        sessao["_flashes"] = [("success", "Tarefa aprovada.")]
+
+    resposta = cliente.get("/home/parent", headers={"If-None-Match": etag})
+
+    assert resposta.status_code == 200 and b"Tarefa aprovada." in resposta.data
+
+def test_etag_e_por_membro(app, familia):
+    usuario = Usuario(id=generate_uuid(), nome="Mãe", email="mae@teste.com")
+    mae = Membro(id=generate_uuid(), role=Role.PARENT, usuario=usuario, familia=familia.familia)
+    db.session.add_all([usuario, mae])
+    db.session.commit()
+    etag_pai = _etag_estavel(logar(app.test_client(), familia.pai))
+
+    resposta = logar(app.test_client(), mae).get("/home/parent", headers={"If-None-Match": etag_pai})
+
+    assert resposta.status_code == 200 and resposta.headers["ETag"] != etag_pai